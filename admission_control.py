@@ -0,0 +1,223 @@
+"""
+Admission control for upstream model calls.
+
+Every call to the model first takes a slot from the process-wide controller:
+
+- a token bucket caps the request rate across all sessions,
+- each session may hold only a few slots or queue positions at once,
+- callers wait in a bounded priority queue, interactive chat ahead of the
+  background answer warmer and batch jobs,
+- the number of concurrent calls adapts to the upstream (AIMD): it grows
+  slowly while calls are fast and succeed, and is cut back on throttling,
+  slow responses or a rising error rate.
+
+When a caller cannot be admitted in time it gets Overloaded instead of
+queueing forever, and the bot sheds to a stored or locally built answer.
+Retries back off exponentially with jitter and honour the upstream's
+Retry-After.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE, BACKGROUND = 0, 1
+
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "10"))            # requests per second
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "20"))
+MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "16"))
+MIN_CONCURRENCY = 1
+INITIAL_CONCURRENCY = 4
+ADMISSION_QUEUE_LIMIT = int(os.getenv("ADMISSION_QUEUE_LIMIT", "64"))
+SESSION_SLOT_LIMIT = 2          # calls in flight or queued per session
+ADMISSION_MAX_WAIT_SEC = float(os.getenv("ADMISSION_MAX_WAIT_SEC", "15"))
+TARGET_LATENCY_SEC = float(os.getenv("UPSTREAM_TARGET_LATENCY_SEC", "8"))
+DECREASE_FACTOR = 0.7
+ERROR_RATE_LIMIT = 0.3          # EWMA of failed calls above which concurrency is cut
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_CAP_SEC = 8.0           # a longer Retry-After sheds instead of waiting
+
+
+class Overloaded(Exception):
+    """Raised when a call cannot be admitted; callers should shed to a cached or local answer."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def try_take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    def __init__(self, rate: float = UPSTREAM_RATE, burst: int = UPSTREAM_BURST,
+                 max_concurrency: int = MAX_CONCURRENCY, initial_concurrency: int = INITIAL_CONCURRENCY,
+                 queue_limit: int = ADMISSION_QUEUE_LIMIT, session_limit: int = SESSION_SLOT_LIMIT,
+                 max_wait: float = ADMISSION_MAX_WAIT_SEC, target_latency: float = TARGET_LATENCY_SEC):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.queue_limit = queue_limit
+        self.session_limit = session_limit
+        self.max_wait = max_wait
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.error_rate = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.counters = Counter()
+        self._waiting = []      # heap of [priority, seq, state]
+        self._sessions = Counter()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: int = INTERACTIVE, session_id: Optional[str] = None):
+        """Block until a call may start; raise Overloaded when it should be shed instead."""
+        with self._cond:
+            if session_id and self._sessions[session_id] >= self.session_limit:
+                self._shed("session limit")
+            if len(self._waiting) >= self.queue_limit:
+                self._displace(priority)
+
+            entry = [priority, next(self._seq), "waiting"]
+            heapq.heappush(self._waiting, entry)
+            if session_id:
+                self._sessions[session_id] += 1
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while True:
+                    if entry[2] == "displaced":
+                        self._shed("displaced by higher-priority calls")
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        self._remove(entry)
+                        self._shed(f"waited {self.max_wait:.0f}s")
+                    if self._waiting[0] is entry and self.in_flight < int(self.limit):
+                        token_wait = self.bucket.try_take()
+                        if token_wait == 0:
+                            heapq.heappop(self._waiting)
+                            self.in_flight += 1
+                            self.counters["admitted"] += 1
+                            # Let the next waiter check for a free slot
+                            self._cond.notify_all()
+                            return
+                        timeout = min(timeout, token_wait)
+                    self._cond.wait(timeout)
+            except Overloaded:
+                if session_id:
+                    self._release_session(session_id)
+                raise
+
+    def release(self, session_id: Optional[str], latency: float, outcome: str):
+        """Return a slot and adapt the concurrency limit; outcome is 'ok', 'throttled' or 'error'."""
+        with self._cond:
+            self.in_flight -= 1
+            if session_id:
+                self._release_session(session_id)
+            self.counters[outcome] += 1
+            self.error_rate = 0.9 * self.error_rate + 0.1 * (outcome != "ok")
+            if outcome != "throttled":
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+            previous = int(self.limit)
+            if outcome == "throttled" or latency > self.target_latency or self.error_rate > ERROR_RATE_LIMIT:
+                self.limit = max(MIN_CONCURRENCY, self.limit * DECREASE_FACTOR)
+            elif outcome == "ok":
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if int(self.limit) != previous:
+                logger.info("Upstream concurrency limit %d -> %d (%s, %.1fs)", previous, int(self.limit), outcome, latency)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": len(self._waiting),
+                "error_rate": round(self.error_rate, 3),
+                "latency_ewma_sec": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+                **self.counters,
+            }
+
+    def _shed(self, reason: str):
+        self.counters["shed"] += 1
+        raise Overloaded(reason)
+
+    def _displace(self, priority: int):
+        # A full queue makes room for a more important call by dropping the least important waiter
+        worst = max(self._waiting)
+        if worst[0] <= priority:
+            self._shed("queue full")
+        worst[2] = "displaced"
+        self._remove(worst)
+
+    def _remove(self, entry):
+        self._waiting.remove(entry)
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def _release_session(self, session_id: str):
+        self._sessions[session_id] -= 1
+        if self._sessions[session_id] <= 0:
+            del self._sessions[session_id]
+
+
+def is_throttled(error: BaseException) -> bool:
+    return getattr(error, "code", None) == 429 or "429" in str(error)[:40]
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Delay requested by the upstream, from a Retry-After header or a RetryInfo detail."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    match = re.search(r"retry_?delay\W+(?:seconds\W+)?(\d+(?:\.\d+)?)", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt: int, error: BaseException) -> float:
+    """Seconds to wait before retry `attempt` + 1; Overloaded if the upstream asks for longer than we wait."""
+    requested = retry_after(error)
+    if requested is not None:
+        if requested > BACKOFF_CAP_SEC:
+            raise Overloaded(f"upstream asked to retry after {requested:.0f}s")
+        return requested
+    # Full jitter keeps retries from many sessions from arriving together
+    return random.uniform(0, min(BACKOFF_CAP_SEC, BACKOFF_BASE_SEC * 2 ** attempt))
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller shared by every session's bot."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
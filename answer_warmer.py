@@ -0,0 +1,235 @@
+"""
+Precomputed answers for the "Daily Reflection" and "Random Verse" quick actions.
+
+Every user gets the same daily reflection question on a given weekday and the
+random verse action draws from ~640 verses, so a background warmer generates
+these answers ahead of time: one per (weekday, theme, mood) for the daily
+reflection, and a rolling pool of random verses for each (theme, mood) asked
+for in the last hour. Quick actions are served from the pool for the user's
+theme and mood, so a warmed answer matches a live one, and only fall back to
+a live model call when that pool is empty.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import metrics
+from admission_control import BACKGROUND
+from explanation_store import is_plain_verse_question
+from verse_refs import chapter_number
+
+logger = logging.getLogger(__name__)
+
+WARMER_ENABLED = os.getenv("WARMER_ENABLED", "1") == "1"
+WARM_INTERVAL_SEC = float(os.getenv("WARM_INTERVAL_SEC", "5"))   # pause between model calls
+RANDOM_POOL_TARGET = int(os.getenv("RANDOM_POOL_TARGET", "20"))
+RANDOM_ANSWER_TTL_SEC = 6 * 3600
+IDLE_PAUSE_SEC = 3600   # stop warming when nobody used a quick action for this long
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MOODS = ["Seeking Wisdom", "Feeling Confused", "Need Motivation", "Seeking Peace",
+         "Facing Challenges", "Grateful", "Contemplative"]
+
+
+def daily_reflection_question(weekday: str) -> str:
+    return f"What guidance does the Bhagavad Gita offer for {weekday}? Please provide a verse for daily reflection and contemplation."
+
+
+def random_verse_question(verses_db: Dict, rng=random) -> str:
+    random_chapter = rng.choice(list(verses_db.keys()))
+    random_verse = rng.choice(list(verses_db[random_chapter]["verses"].keys()))
+    return f"Please share the wisdom from Chapter {chapter_number(random_chapter)}, Verse {random_verse} and its practical application."
+
+
+_DAILY_REFLECTION_QUESTIONS = frozenset(daily_reflection_question(day).casefold() for day in WEEKDAYS)
+
+
+def is_quick_action_question(question: str) -> bool:
+    """True for the quick actions' fixed questions, whose answers do not depend on the conversation."""
+    return question.strip().casefold() in _DAILY_REFLECTION_QUESTIONS or is_plain_verse_question(question)
+
+
+class AnswerWarmer:
+    def __init__(self, bot):
+        self.bot = bot
+        self.daily: Dict[tuple, Dict] = {}   # (weekday, theme, mood) -> {"question", "answer", "created_at"}
+        self.random_pools: Dict[tuple, deque] = {}    # (theme, mood) -> warmed answers, oldest first
+        self.random_demand: Dict[tuple, float] = {}   # (theme, mood) -> last request, for the pools kept warm
+        self.hits = {"daily_reflection": 0, "random_verse": 0}
+        self.misses = {"daily_reflection": 0, "random_verse": 0}
+        self.last_demand = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._warm_loop, name="answer-warmer", daemon=True)
+
+    def start(self):
+        if WARMER_ENABLED and not self._thread.is_alive():
+            self._thread.start()
+            logger.info("Answer warmer started")
+
+    def stop(self):
+        self._stop.set()
+
+    # Serving
+
+    def take_daily_reflection(self, theme: str, mood: str) -> Optional[Dict]:
+        """Today's warmed reflection for this theme and mood, or None."""
+        key = (datetime.now().strftime("%A"), theme, mood)
+        with self._lock:
+            self.last_demand = time.time()
+            entry = self.daily.get(key)
+            if entry is None:
+                self.misses["daily_reflection"] += 1
+                metrics.inc("wisdom_warm_pool_total", action="daily_reflection", outcome="miss")
+                return None
+            self.hits["daily_reflection"] += 1
+            metrics.inc("wisdom_warm_pool_total", action="daily_reflection", outcome="hit")
+            return {"question": entry["question"], "answer": dict(entry["answer"])}
+
+    def take_random_verse(self, theme: str, mood: str) -> Optional[Dict]:
+        """Pop a random-verse answer warmed for this theme and mood, or None when that pool is empty.
+
+        The request also keeps the (theme, mood) pool warm for the next hour.
+        """
+        key = (theme, mood)
+        with self._lock:
+            self.last_demand = self.random_demand[key] = time.time()
+            self._expire_random()
+            pool = self.random_pools.get(key)
+            if not pool:
+                self.misses["random_verse"] += 1
+                metrics.inc("wisdom_warm_pool_total", action="random_verse", outcome="miss")
+                return None
+            self.hits["random_verse"] += 1
+            metrics.inc("wisdom_warm_pool_total", action="random_verse", outcome="hit")
+            return pool.popleft()
+
+    def random_ready(self, theme: str, mood: str) -> int:
+        """Random-verse answers warmed for this theme and mood."""
+        with self._lock:
+            return len(self.random_pools.get((theme, mood), ()))
+
+    def stats(self) -> Dict:
+        """Pool fill levels, freshness and hit counts."""
+        now = time.time()
+        weekday = datetime.now().strftime("%A")
+        with self._lock:
+            today = [e for (day, _, _), e in self.daily.items() if day == weekday]
+            return {
+                "daily_reflection": {
+                    "filled": len(today),
+                    "total": len(self.bot.themes) * len(MOODS),
+                    "oldest_age_sec": round(now - min((e["created_at"] for e in today), default=now)),
+                },
+                "random_verse": {
+                    "filled": sum(len(pool) for pool in self.random_pools.values()),
+                    "target": RANDOM_POOL_TARGET * len(self.random_demand),
+                    "pools": len(self.random_demand),
+                    "oldest_age_sec": round(now - min((e["created_at"] for pool in self.random_pools.values()
+                                                       for e in pool), default=now)),
+                },
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "running": self._thread.is_alive(),
+            }
+
+    # Warming
+
+    def _expire_random(self):
+        now = time.time()
+        # Stop warming pools nobody has asked for lately
+        for key in [k for k, last in self.random_demand.items() if now - last > IDLE_PAUSE_SEC]:
+            del self.random_demand[key]
+            self.random_pools.pop(key, None)
+        cutoff = now - RANDOM_ANSWER_TTL_SEC
+        for pool in self.random_pools.values():
+            while pool and pool[0]["created_at"] < cutoff:
+                pool.popleft()
+
+    def _random_to_fill(self, target: int) -> Optional[Tuple[str, str]]:
+        """The requested (theme, mood) with the fewest warmed random verses, if it has fewer than target."""
+        key = min(self.random_demand, key=lambda k: len(self.random_pools.get(k, ())), default=None)
+        if key is None or len(self.random_pools.get(key, ())) >= target:
+            return None
+        return key
+
+    def _next_task(self):
+        """Pick the next answer to generate: keep random verses topped up, then fill today's reflections."""
+        weekday = datetime.now().strftime("%A")
+        with self._lock:
+            # Reflections from previous days are stale
+            for key in [k for k in self.daily if k[0] != weekday]:
+                del self.daily[key]
+            self._expire_random()
+
+            key = self._random_to_fill(RANDOM_POOL_TARGET // 2)
+            if key is not None:
+                return "random_verse", key
+            for theme in self.bot.themes:
+                for mood in MOODS:
+                    if (weekday, theme, mood) not in self.daily:
+                        return "daily_reflection", (weekday, theme, mood)
+            key = self._random_to_fill(RANDOM_POOL_TARGET)
+            if key is not None:
+                return "random_verse", key
+        return None, None
+
+    def _generate(self, question: str, theme: Optional[str], mood: Optional[str]) -> Optional[Dict]:
+        answer = asyncio.run(self.bot.get_response(question, theme, mood, None, priority=BACKGROUND))
+        # Failed or shed calls come back as local answers; only pool model answers
+        if answer.get("error") or answer.get("source") == "offline":
+            return None
+        return answer
+
+    def _warm_loop(self):
+        while not self._stop.is_set():
+            if time.time() - self.last_demand > IDLE_PAUSE_SEC:
+                self._stop.wait(60)
+                continue
+
+            kind, key = self._next_task()
+            if kind is None:
+                self._stop.wait(60)
+                continue
+
+            try:
+                if kind == "random_verse":
+                    theme, mood = key
+                    question = random_verse_question(self.bot.verses_db)
+                    answer = self._generate(question, theme, mood)
+                    with self._lock:
+                        if answer and key in self.random_demand:
+                            self.random_pools.setdefault(key, deque()).append(
+                                {"question": question, "answer": answer, "created_at": time.time()})
+                else:
+                    weekday, theme, mood = key
+                    question = daily_reflection_question(weekday)
+                    answer = self._generate(question, theme, mood)
+                    if answer:
+                        with self._lock:
+                            self.daily[key] = {"question": question, "answer": answer, "created_at": time.time()}
+            except Exception as e:
+                logger.warning("Answer warming failed: %s", e)
+
+            self._stop.wait(WARM_INTERVAL_SEC)
+
+
+_warmer: Optional[AnswerWarmer] = None
+_warmer_lock = threading.Lock()
+
+
+def get_answer_warmer(bot) -> AnswerWarmer:
+    """Process-wide warmer, started with the first session's bot."""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = AnswerWarmer(bot)
+            _warmer.start()
+        return _warmer
@@ -1,52 +1,69 @@
 
 import requests
-import pandas as pd
 import streamlit as st
 import os
-import google.generativeai as genai
-from typing import Dict, List
-import json
-import asyncio
-from PIL import Image
 import time
 from datetime import datetime
-import re
+import logging
 from dotenv import load_dotenv
 import cv2
 import numpy as np
 from streamlit_webrtc import webrtc_streamer, VideoTransformerBase, RTCConfiguration
 from collections import Counter, deque
+from functools import partial
 
 # Import the advanced emotion detector
 from emotion_advanced import AdvancedEmotionDetector
+from gita_bot import GitaGeminiBot
+from capture_profiles import CAPTURE_PROFILES, DEFAULT_PROFILE, get_controller, release_controller
+from verse_browser import render_verse_browser
+from chat_view import (all_messages, append_message, history_signature, init_chat_state, persist_message,
+                       render_chat_history, render_concept_filter, render_history_search, reset_chat_state)
+from session_store import get_session_id, remember_user
+from admission_control import INTERACTIVE
+from chat_export import render_export_controls
+from job_queue import DONE, QueueLimitError, get_job_queue
+from answer_warmer import MOODS, daily_reflection_question, get_answer_warmer, random_verse_question
+from asset_pipeline import derivative_path, image_derivatives, pick_derivative, picture_html
+import metrics
+from profiling import profile, profile_requested
+from translation_store import DEFAULT_LANGUAGE, get_translation_store, localize_response
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(name)s %(levelname)s %(message)s"
+)
+logger = logging.getLogger(__name__)
+
 # Constants
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_API_KEY")
-GITA_CSV_PATH = "bhagavad_gita_verses.csv"
 IMAGE_PATH = "Public/Images/WhatsApp Image 2024-11-18 at 11.40.34_076eab8e.jpg"
+GEMINI_MODE = "🧠 Gemini"
+OFFLINE_MODE = "⚡ Instant (offline)"
 
 def initialize_session_state():
     """Initialize Streamlit session state variables with better defaults."""
     default_states = {
-        'messages': [],
         'bot': None,
         'selected_theme': 'Life Guidance',
-        'question_history': [],
-        'favorite_verses': [],
         'current_mood': 'Seeking Wisdom',
         'emotional_state': 'Neutral',
-        'language_preference': 'English',
+        'language_preference': DEFAULT_LANGUAGE,
         'webcam_enabled': False,
         'emotion_detector': None,
         'emotion_log': deque(maxlen=300),
-        'last_detected_emotion': None
+        'last_detected_emotion': None,
+        'capture_profile': DEFAULT_PROFILE,
+        'answer_mode': GEMINI_MODE,
+        'pending_jobs': {}
     }
     
     for key, default_value in default_states.items():
         if key not in st.session_state:
             st.session_state[key] = default_value
+    init_chat_state()
 
     # Initialize bot if not already done
     if st.session_state.bot is None:
@@ -55,6 +72,9 @@ def initialize_session_state():
             st.stop()
         st.session_state.bot = GitaGeminiBot(GEMINI_API_KEY)
 
+    # Shared background warmer for the quick-action answer pools
+    get_answer_warmer(st.session_state.bot)
+
     # Initialize emotion detector once
     if st.session_state.emotion_detector is None:
         st.session_state.emotion_detector = AdvancedEmotionDetector()
@@ -79,46 +99,66 @@ def dominant_emotion(window_sec: int = 5) -> str:
 class EmotionTransformer(VideoTransformerBase):
     """WebRTC video transformer for emotion detection."""
     
-    def __init__(self):
+    def __init__(self, capture_controller=None):
         # One detector per peer‑connection
         self.detector = AdvancedEmotionDetector()
         # Ring‑buffer of (timestamp, emotion) tuples – 5 s at 30 fps ≈ 150
         self.emotion_history: deque = deque(maxlen=150)
+        # Adapts resolution and analysis rate to server load
+        self.capture_controller = capture_controller
+        self.last_faces = []
     
     def recv(self, frame):
         """Process each frame for emotion detection."""
         try:
+            started = time.perf_counter()
+
             # Convert frame to numpy array
             img = frame.to_ndarray(format="bgr24")
+
+            # Downscale frames larger than the session's capture profile
+            if self.capture_controller is not None:
+                target_size = self.capture_controller.target_size(img.shape[1], img.shape[0])
+                if target_size:
+                    img = cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)
             
             # Flip frame horizontally for mirror effect
             img = cv2.flip(img, 1)
             
             # Only proceed if detector is available
             if self.detector is not None:
-                # Detect faces
-                faces = self.detector.detect_faces_optimized(img)
-                
-                if len(faces) > 0:
-                    # Process only the best face
-                    x, y, w, h = faces[0]
-                    padding = 30
-                    y1 = max(0, y - padding)
-                    y2 = min(img.shape[0], y + h + padding)
-                    x1 = max(0, x - padding)
-                    x2 = min(img.shape[1], x + w + padding)
-                    face_roi = img[y1:y2, x1:x2]
-                    
-                    if face_roi.size > 0:
-                        self.detector.update_emotion_async(face_roi)
-                        # Save latest emotion for the GUI thread
-                        if hasattr(self.detector, "current_emotion") and self.detector.current_emotion:
-                            self.emotion_history.append(
-                                (time.time(), self.detector.current_emotion)
-                            )
+                # Detect faces at the profile's analysis rate, reuse the last result in between
+                if self.capture_controller is None or self.capture_controller.should_analyze():
+                    with metrics.timer("wisdom_face_detection_seconds"):
+                        faces = self.detector.detect_faces_optimized(img)
+                    self.last_faces = faces
                     
+                    if len(faces) > 0:
+                        # Process only the best face
+                        x, y, w, h = faces[0]
+                        padding = 30
+                        y1 = max(0, y - padding)
+                        y2 = min(img.shape[0], y + h + padding)
+                        x1 = max(0, x - padding)
+                        x2 = min(img.shape[1], x + w + padding)
+                        face_roi = img[y1:y2, x1:x2]
+                        
+                        if face_roi.size > 0:
+                            self.detector.update_emotion_async(face_roi)
+                            # Save latest emotion for the GUI thread
+                            if hasattr(self.detector, "current_emotion") and self.detector.current_emotion:
+                                self.emotion_history.append(
+                                    (time.time(), self.detector.current_emotion)
+                                )
+                
+                if len(self.last_faces) > 0:
                     # Draw results on frame
-                    self.detector.draw_advanced_results(img, faces)
+                    self.detector.draw_advanced_results(img, self.last_faces)
+
+            frame_seconds = time.perf_counter() - started
+            metrics.observe("wisdom_frame_seconds", frame_seconds)
+            if self.capture_controller is not None:
+                self.capture_controller.record_frame(frame_seconds)
             
             # Try different VideoFrame import approaches
             try:
@@ -135,277 +175,11 @@ class EmotionTransformer(VideoTransformerBase):
                     return frame
             
         except Exception as e:
-            print(f"Error in emotion detection: {e}")
+            logger.warning("Error in emotion detection: %s", e)
+            metrics.inc("wisdom_errors_total", stage="video_frame")
             # Return original frame on error
             return frame
 
-class GitaGeminiBot:
-    def __init__(self, api_key: str):
-        """Initialize the Gita bot with Gemini API and enhanced features."""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        self.verses_db = self.load_gita_database()
-        self.themes = {
-            'Life Guidance': 'guidance for life decisions and personal growth',
-            'Dharma & Ethics': 'understanding of duty, righteousness, and moral conduct',
-            'Spiritual Growth': 'spiritual development and self-realization',
-            'Relationships': 'wisdom for interpersonal relationships and social harmony',
-            'Work & Career': 'guidance for professional life and service',
-            'Inner Peace': 'achieving mental tranquility and emotional balance',
-            'Devotion & Love': 'understanding devotion, love, and surrender'
-        }
-
-    @st.cache_data
-    def load_gita_database(_self) -> Dict:
-        """Load the Bhagavad Gita dataset with caching for better performance."""
-        try:
-            verses_df = pd.read_csv(GITA_CSV_PATH)
-        except FileNotFoundError:
-            st.error(f"Gita database file '{GITA_CSV_PATH}' not found. Please ensure the file is in the correct location.")
-            st.stop()
-        except Exception as e:
-            st.error(f"Error loading Gita database: {str(e)}")
-            st.stop()
-
-        verses_db = {}
-        for _, row in verses_df.iterrows():
-            chapter = f"chapter_{row['chapter_number']}"
-            if chapter not in verses_db:
-                verses_db[chapter] = {
-                    "title": row['chapter_title'],
-                    "verses": {},
-                    "summary": _self._get_chapter_summary(row['chapter_number'])
-                }
-            verse_num = str(row['chapter_verse'])
-            verses_db[chapter]["verses"][verse_num] = {
-                "translation": row['translation']
-            }
-        return verses_db
-
-    def format_response(self, raw_text: str) -> Dict:
-        """Enhanced response formatting with better error handling."""
-        try:
-            # Try JSON parsing first
-            if raw_text.strip().startswith('{') and raw_text.strip().endswith('}'):
-                try:
-                    return json.loads(raw_text)
-                except json.JSONDecodeError:
-                    pass
-
-            # Enhanced text parsing
-            response = {
-                "verse_reference": "",
-                "sanskrit": "",
-                "translation": "",
-                "explanation": "",
-                "application": "",
-                "keywords": []
-            }
-
-            lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
-            current_section = None
-            
-            for line in lines:
-                line_lower = line.lower()
-                
-                # Better pattern matching
-                if re.search(r'chapter\s+\d+.*verse\s+\d+', line_lower):
-                    response["verse_reference"] = line
-                elif line_lower.startswith(('sanskrit:', 'verse:')):
-                    response["sanskrit"] = re.sub(r'^(sanskrit:|verse:)\s*', '', line, flags=re.IGNORECASE)
-                elif line_lower.startswith('translation:'):
-                    response["translation"] = re.sub(r'^translation:\s*', '', line, flags=re.IGNORECASE)
-                elif line_lower.startswith(('explanation:', 'meaning:')):
-                    current_section = "explanation"
-                    response["explanation"] = re.sub(r'^(explanation:|meaning:)\s*', '', line, flags=re.IGNORECASE)
-                elif line_lower.startswith(('application:', 'practical:')):
-                    current_section = "application"
-                    response["application"] = re.sub(r'^(application:|practical:)\s*', '', line, flags=re.IGNORECASE)
-                elif current_section and line:
-                    response[current_section] += " " + line
-
-            # Extract keywords for better searchability
-            text_content = f"{response['translation']} {response['explanation']} {response['application']}"
-            response["keywords"] = self._extract_keywords(text_content)
-
-            return response
-
-        except Exception as e:
-            st.error(f"Error formatting response: {str(e)}")
-            return {
-                "verse_reference": "Error in parsing",
-                "sanskrit": "",
-                "translation": raw_text[:500] + "..." if len(raw_text) > 500 else raw_text,
-                "explanation": "Please try rephrasing your question.",
-                "application": "",
-                "keywords": []
-            }
-
-    def _get_chapter_summary(self, chapter_num: int) -> str:
-        """Get a brief summary for each chapter."""
-        summaries = {
-            1: "Arjuna's moral dilemma and the beginning of Krishna's counsel",
-            2: "The fundamental teachings on the soul, duty, and the path of knowledge",
-            3: "The path of selfless action and karma yoga",
-            4: "Divine knowledge, incarnation, and the evolution of dharma",
-            5: "The harmony between action and renunciation",
-            6: "The practice of meditation and self-control",
-            7: "Knowledge of the Absolute and devotion to the Divine",
-            8: "The imperishable Brahman and the path at the time of death",
-            9: "Royal knowledge and the most confidential wisdom",
-            10: "Divine manifestations and infinite glories",
-            11: "The cosmic vision of the universal form",
-            12: "The path of devotion and love",
-            13: "The field of activity and the knower of the field",
-            14: "The three modes of material nature",
-            15: "The supreme person and the cosmic tree",
-            16: "Divine and demonic natures in human beings",
-            17: "The three divisions of faith and their characteristics",
-            18: "The perfection of renunciation and complete surrender"
-        }
-        return summaries.get(chapter_num, "Eternal wisdom and guidance")
-
-    def format_response(self, raw_text: str) -> Dict:
-        """Enhanced response formatting with better error handling."""
-        try:
-            # Try JSON parsing first
-            if raw_text.strip().startswith('{') and raw_text.strip().endswith('}'):
-                try:
-                    return json.loads(raw_text)
-                except json.JSONDecodeError:
-                    pass
-
-            # Enhanced text parsing
-            response = {
-                "verse_reference": "",
-                "sanskrit": "",
-                "translation": "",
-                "explanation": "",
-                "application": "",
-                "keywords": []
-            }
-
-            lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
-            current_section = None
-            
-            for line in lines:
-                line_lower = line.lower()
-                
-                # Better pattern matching
-                if re.search(r'chapter\s+\d+.*verse\s+\d+', line_lower):
-                    response["verse_reference"] = line
-                elif line_lower.startswith(('sanskrit:', 'verse:')):
-                    response["sanskrit"] = re.sub(r'^(sanskrit:|verse:)\s*', '', line, flags=re.IGNORECASE)
-                elif line_lower.startswith('translation:'):
-                    response["translation"] = re.sub(r'^translation:\s*', '', line, flags=re.IGNORECASE)
-                elif line_lower.startswith(('explanation:', 'meaning:')):
-                    current_section = "explanation"
-                    response["explanation"] = re.sub(r'^(explanation:|meaning:)\s*', '', line, flags=re.IGNORECASE)
-                elif line_lower.startswith(('application:', 'practical:')):
-                    current_section = "application"
-                    response["application"] = re.sub(r'^(application:|practical:)\s*', '', line, flags=re.IGNORECASE)
-                elif current_section and line:
-                    response[current_section] += " " + line
-
-            # Extract keywords for better searchability
-            text_content = f"{response['translation']} {response['explanation']} {response['application']}"
-            response["keywords"] = self._extract_keywords(text_content)
-
-            return response
-
-        except Exception as e:
-            st.error(f"Error formatting response: {str(e)}")
-            return {
-                "verse_reference": "Error in parsing",
-                "sanskrit": "",
-                "translation": raw_text[:500] + "..." if len(raw_text) > 500 else raw_text,
-                "explanation": "Please try rephrasing your question.",
-                "application": "",
-                "keywords": []
-            }
-
-    def _extract_keywords(self, text: str) -> List[str]:
-        """Extract relevant keywords from the response text."""
-        common_gita_keywords = [
-            'dharma', 'karma', 'moksha', 'yoga', 'devotion', 'meditation', 'duty', 
-            'righteousness', 'soul', 'divine', 'surrender', 'detachment', 'wisdom',
-            'knowledge', 'action', 'service', 'love', 'peace', 'truth'
-        ]
-        
-        text_lower = text.lower()
-        found_keywords = [keyword for keyword in common_gita_keywords if keyword in text_lower]
-        return found_keywords[:5]  # Return top 5 relevant keywords
-
-    async def get_response(self, question: str, theme: str = None, mood: str = None, emotional_state: str = None) -> Dict:
-        """Enhanced response generation with theme, mood, and emotional state context."""
-        try:
-            # Build context-aware prompt
-            theme_context = ""
-            if theme and theme in self.themes:
-                theme_context = f"Focus on {self.themes[theme]}. "
-            
-            mood_context = ""
-            if mood:
-                mood_context = f"The user is currently {mood.lower()}. "
-
-            emotional_context = ""
-            if emotional_state:
-                emotional_context = f"The user's emotional state is {emotional_state.lower()}. Please provide guidance that acknowledges and addresses this emotional state. "
-
-            prompt = f"""
-            {theme_context}{mood_context}{emotional_context}Based on the Bhagavad Gita's teachings, provide guidance for this question:
-            {question}
-
-            Please format your response exactly like this:
-            Chapter X, Verse Y
-            Sanskrit: [Sanskrit verse if available]
-            Translation: [Clear English translation]
-            Explanation: [Detailed explanation of the verse's meaning and context, considering the user's emotional state]
-            Application: [Practical guidance for applying this wisdom in modern life, tailored to the user's current emotional state]
-
-            Make the response comprehensive but accessible to modern readers, with special attention to providing comfort and guidance appropriate for someone who is {emotional_state.lower() if emotional_state else 'seeking wisdom'}.
-            """
-
-            # Add retry logic for API calls
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = self.model.generate_content(prompt)
-                    if response.text:
-                        break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise e
-                    time.sleep(1)  # Brief pause before retry
-
-            if not response.text:
-                raise ValueError("Empty response received from the model")
-
-            formatted_response = self.format_response(response.text)
-            
-            # Add metadata
-            formatted_response["timestamp"] = datetime.now().isoformat()
-            formatted_response["theme"] = theme
-            formatted_response["mood"] = mood
-            formatted_response["emotional_state"] = emotional_state
-            
-            return formatted_response
-
-        except Exception as e:
-            st.error(f"Error getting response: {str(e)}")
-            return {
-                "verse_reference": "Service Temporarily Unavailable",
-                "sanskrit": "",
-                "translation": "We're experiencing technical difficulties. Please try again in a moment.",
-                "explanation": "The wisdom of the Gita teaches us patience in times of difficulty.",
-                "application": "Take this moment to practice patience and try your question again.",
-                "keywords": ["patience", "perseverance"],
-                "timestamp": datetime.now().isoformat(),
-                "theme": theme,
-                "mood": mood,
-                "emotional_state": emotional_state
-            }
-
 def render_additional_options():
     """Render additional options below the image, including webcam with emotion detection."""
     
@@ -425,8 +199,7 @@ def render_additional_options():
     with col1:
         st.selectbox(
             "🎭 Current Mood",
-            ["Seeking Wisdom", "Feeling Confused", "Need Motivation", "Seeking Peace", 
-             "Facing Challenges", "Grateful", "Contemplative"],
+            MOODS,
             key="current_mood",
             help="Your current state of mind helps tailor the guidance"
         )
@@ -455,6 +228,14 @@ def render_additional_options():
             help="Your current emotional state for personalized guidance"
         )
 
+    st.radio(
+        "Answer Mode",
+        [GEMINI_MODE, OFFLINE_MODE],
+        key="answer_mode",
+        horizontal=True,
+        help="Instant answers are assembled locally from the verse collection in milliseconds"
+    )
+
     # Webcam Section
     st.markdown("### 📹 Spiritual Presence & Emotion Detection")
     webcam_col1, webcam_col2 = st.columns([1, 3])
@@ -465,13 +246,30 @@ def render_additional_options():
             help="Enable webcam and emotion detection for mindful presence"
         )
 
+    with webcam_col2:
+        st.selectbox(
+            "📶 Video Quality",
+            [profile.name for profile in CAPTURE_PROFILES],
+            key="capture_profile",
+            help="Capture resolution and frame rate. Lowered automatically when the server is busy."
+        )
+
     if webcam_enabled:
         # WebRTC Configuration for better connectivity
         rtc_configuration = RTCConfiguration({
             "iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]
         })
+
+        # Per-session capture profile, stepped down automatically under load
+        capture_controller = get_controller(get_session_id(), st.session_state.capture_profile)
+        capture_controller.set_ceiling(st.session_state.capture_profile)
+        profile = capture_controller.profile
         
         st.info("🎥 Webcam with emotion detection is now active. You can continue chatting while the camera runs!")
+        if capture_controller.is_degraded:
+            st.caption(f"📉 Capture profile lowered to **{profile.name}** ({profile.width}×{profile.height} @ {profile.frame_rate} fps) to keep the server responsive.")
+        else:
+            st.caption(f"📶 Capture profile: **{profile.name}** ({profile.width}×{profile.height} @ {profile.frame_rate} fps)")
         
         # Create a smaller container for the webcam feed
         webcam_container = st.container()
@@ -479,27 +277,29 @@ def render_additional_options():
             # Use columns to control the width - making it smaller
             cam_col1, cam_col2, cam_col3 = st.columns([1, 2, 1])
             with cam_col2:
-                # Start WebRTC streamer with emotion detection and higher resolution
+                # Start WebRTC streamer with emotion detection at the session's capture profile
                 ctx = webrtc_streamer(
                     key="gita_webcam",
-                    video_transformer_factory=EmotionTransformer,
+                    video_transformer_factory=partial(EmotionTransformer, capture_controller),
                     rtc_configuration=rtc_configuration,
-                    media_stream_constraints={
-                        "video": {
-                            "width": {"ideal": 1280, "min": 640, "max": 1920},
-                            "height": {"ideal": 720, "min": 480, "max": 1080},
-                            "frameRate": {"ideal": 30, "min": 15, "max": 60}
-                        }, 
-                        "audio": False
-                    },
+                    media_stream_constraints=profile.media_stream_constraints(),
                     async_processing=True
                 )
                 # Expose ctx so the main thread can read the emotion history
                 if ctx:
                     st.session_state["webrtc_ctx"] = ctx
-    
+    else:
+        release_controller(get_session_id())
+
     # Quick action buttons
     st.markdown("### ⚡ Quick Actions")
+    warmer = get_answer_warmer(st.session_state.bot)
+    warm_stats = warmer.stats()
+    random_ready = warmer.random_ready(st.session_state.selected_theme, st.session_state.current_mood)
+    st.caption(
+        f"⚡ Instant answers ready: {random_ready} random verses · "
+        f"{warm_stats['daily_reflection']['filled']}/{warm_stats['daily_reflection']['total']} daily reflections"
+    )
     
     action_col1, action_col2, action_col3, action_col4 = st.columns(4)
     
@@ -521,24 +321,30 @@ def render_additional_options():
 
     return None
 
+def serve_warmed_answer(action_type) -> bool:
+    """Answer a quick action from the warm pools; False when it needs a live model call."""
+    warmer = get_answer_warmer(st.session_state.bot)
+    if action_type == "daily_reflection":
+        warmed = warmer.take_daily_reflection(st.session_state.selected_theme, st.session_state.current_mood)
+    elif action_type == "random_verse":
+        warmed = warmer.take_random_verse(st.session_state.selected_theme, st.session_state.current_mood)
+    else:
+        return False
+
+    if warmed is None:
+        return False
+    append_message({"role": "user", "content": warmed["question"]})
+    append_message({"role": "assistant", **localize_response(warmed["answer"], st.session_state.language_preference)})
+    return True
+
 def handle_quick_actions(action_type):
     """Handle quick action button clicks."""
     if action_type == "random_verse":
         # Get random verse
-        import random
-        chapters = list(st.session_state.bot.verses_db.keys())
-        random_chapter = random.choice(chapters)
-        verses = list(st.session_state.bot.verses_db[random_chapter]["verses"].keys())
-        random_verse = random.choice(verses)
-        
-        chapter_num = random_chapter.split('_')[1]
-        question = f"Please share the wisdom from Chapter {chapter_num}, Verse {random_verse} and its practical application."
-        return question
+        return random_verse_question(st.session_state.bot.verses_db)
     
     elif action_type == "daily_reflection":
-        today = datetime.now().strftime("%A")
-        question = f"What guidance does the Bhagavad Gita offer for {today}? Please provide a verse for daily reflection and contemplation."
-        return question
+        return daily_reflection_question(datetime.now().strftime("%A"))
     
     elif action_type == "verse_search":
         st.session_state.show_search = True
@@ -551,61 +357,46 @@ def handle_quick_actions(action_type):
     return None
 
 def render_enhanced_sidebar():
-    """Enhanced sidebar with better organization - showing ALL verses."""
+    """Enhanced sidebar with better organization and a paginated verse browser."""
     st.sidebar.title("📖 Browse Sacred Texts")
     
-    # Chapter browser with enhanced info
-    chapters = list(st.session_state.bot.verses_db.keys())
-    selected_chapter = st.sidebar.selectbox(
-        "Select Chapter",
-        chapters,
-        format_func=lambda x: f"Ch. {x.split('_')[1]}: {st.session_state.bot.verses_db[x]['title']}"
+    # Languages with a translation pack built by batch_translate.py
+    languages = get_translation_store().languages()
+    if st.session_state.language_preference not in languages:
+        st.session_state.language_preference = DEFAULT_LANGUAGE
+    st.sidebar.selectbox(
+        "🌐 Verse Language",
+        languages,
+        key="language_preference",
+        help="Verse text is shown in this language from precomputed translations"
     )
 
-    if selected_chapter:
-        chapter_data = st.session_state.bot.verses_db[selected_chapter]
-        st.sidebar.markdown(f"### {chapter_data['title']}")
-        st.sidebar.markdown(f"*{chapter_data.get('summary', '')}*")
-        
-        # Show verse count
-        verse_count = len(chapter_data['verses'])
-        st.sidebar.info(f"📊 {verse_count} verses in this chapter")
-        
-        # Show ALL verses instead of just top 5
-        verses = chapter_data['verses']
-        st.sidebar.markdown("#### All Verses:")
-        
-        # Create a scrollable container for all verses
-        for verse_num, verse_data in verses.items():
-            with st.sidebar.expander(f"Verse {verse_num}"):
-                # Show full translation for shorter verses, truncate longer ones
-                translation = verse_data['translation']
-                if len(translation) > 200:
-                    st.markdown(translation[:200] + "...")
-                else:
-                    st.markdown(translation)
-                
-                # Add a button to use this verse for questioning
-                if st.button(f"Ask about this verse", key=f"ask_verse_{selected_chapter}_{verse_num}"):
-                    chapter_num = selected_chapter.split('_')[1]
-                    question = f"Please explain Chapter {chapter_num}, Verse {verse_num} and its practical application in modern life."
-                    st.session_state.auto_question = question
+    # Verse browser runs as a fragment so browsing does not rerun the chat
+    with st.sidebar:
+        render_verse_browser(st.session_state.bot.verses_db)
 
     # Enhanced question history
     st.sidebar.markdown("---")
     st.sidebar.title("💭 Your Spiritual Journey")
     
-    user_questions = [msg["content"] for msg in st.session_state.messages if msg["role"] == "user"]
-    if user_questions:
-        st.sidebar.markdown(f"**Questions Asked:** {len(user_questions)}")
+    question_count = st.session_state.question_count
+    if question_count:
+        st.sidebar.markdown(f"**Questions Asked:** {question_count}")
+        with st.sidebar:
+            render_history_search()
         
-        # Show recent questions with timestamps
-        for i, q in enumerate(user_questions[-5:], 1):  # Show last 5 questions
-            with st.sidebar.expander(f"Question {len(user_questions) - 5 + i}"):
+        # Show recent questions, kept across reloads by the session store
+        recent_questions = st.session_state.question_history
+        for i, q in enumerate(recent_questions, 1):  # Show last 5 questions
+            with st.sidebar.expander(f"Question {question_count - len(recent_questions) + i}"):
                 st.markdown(f"*{q}*")
     else:
         st.sidebar.info("🌱 Begin your journey by asking a question")
 
+    # Concept index over the user's messages and the verses
+    with st.sidebar:
+        render_concept_filter(st.session_state.bot.verses_db)
+
     # Favorites section (placeholder for future enhancement)
     st.sidebar.markdown("---")
     st.sidebar.title("⭐ Favorite Verses")
@@ -664,31 +455,120 @@ def render_enhanced_sidebar():
     with col2:
         st.markdown(f'<a href="/pwa.html" target="_blank" style="text-decoration: none;"><button style="background: #4CAF50; color: white; border: none; padding: 8px 12px; border-radius: 5px; cursor: pointer;">🌐 PWA Page</button></a>', unsafe_allow_html=True)
 
-def create_downloadable_content(chat_history: List[Dict]) -> str:
-    """Formats the chat history into a readable string for download."""
-    content = f"--- Wisdom Weaver Chat History - {datetime.now().strftime('%Y-%m-%d %H:%M')} ---\n\n"
-    for message in chat_history:
-        role = message["role"]
-        
-        if role == "user":
-            content += f"User: {message['content']}\n\n"
+@st.cache_data(show_spinner=False)
+def _read_asset(path: str) -> bytes:
+    """Read a built asset once per process."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+def render_header_image():
+    """Show the header image without decoding or resizing it on every rerun."""
+    caption = "Bhagavad Gita - Eternal Wisdom"
+    col_img1, col_img2, col_img3 = st.columns([2, 1, 2])
+    with col_img2:
+        if image_derivatives('header'):
+            if st.get_option("server.enableStaticServing"):
+                # Let the browser pick the width bucket and format; hashed URLs cache forever
+                st.markdown(
+                    picture_html('header', 'app/static/build/images', "Bhagavad Gita", sizes="(max-width: 768px) 90vw, 25vw", caption=caption),
+                    unsafe_allow_html=True
+                )
+            else:
+                derivative = pick_derivative('header', 640, 'jpeg')
+                st.image(_read_asset(str(derivative_path(derivative))), use_container_width=True, caption=caption)
+        elif os.path.exists(IMAGE_PATH):
+            # Assets not built yet: hand the original file over as-is
+            st.image(IMAGE_PATH, use_container_width=True, caption=caption)
         else:
-            # Handle the structured AI response
-            content += f"Wisdom Weaver: "
-            if message.get("verse_reference"):
-                content += f"📖 {message['verse_reference']}\n"
-            if message.get("sanskrit"):
-                content += f"Sanskrit: {message['sanskrit']}\n"
-            if message.get("translation"):
-                content += f"Translation: {message['translation']}\n"
-            if message.get("explanation"):
-                content += f"Explanation: {message['explanation']}\n"
-            if message.get("application"):
-                content += f"Modern Application: {message['application']}\n"
-            content += "\n"
-            
-    content += "--- End of Chat History ---"
-    return content
+            st.warning("Image file not found. Please ensure the image is in the correct location.")
+
+def submit_question(question: str) -> bool:
+    """Queue a question for the model and add an answer placeholder to the chat."""
+    if st.session_state.answer_mode == OFFLINE_MODE:
+        # Local answers take milliseconds, no need for the job queue
+        append_message({"role": "user", "content": question})
+        append_message({"role": "assistant", **st.session_state.bot.local_response(
+            question,
+            st.session_state.selected_theme,
+            st.session_state.current_mood,
+            dominant_emotion(),
+            st.session_state.language_preference
+        )})
+        return True
+
+    try:
+        job_id = get_job_queue().submit(
+            get_session_id(),
+            st.session_state.bot.get_response,
+            question,
+            st.session_state.selected_theme,
+            st.session_state.current_mood,
+            dominant_emotion(),
+            # Snapshot of the recent window for the prompt's conversation context
+            list(st.session_state.messages),
+            INTERACTIVE,
+            get_session_id(),
+            st.session_state.language_preference,
+            label=question
+        )
+    except QueueLimitError as e:
+        st.warning(f"⏳ Please wait for your current questions to be answered ({e}).")
+        return False
+
+    append_message({"role": "user", "content": question})
+    placeholder = {"role": "assistant", "pending_job": job_id}
+    append_message(placeholder)
+    st.session_state.pending_jobs[job_id] = placeholder
+    return True
+
+def cancel_question(job_id: str):
+    """Cancel an in-flight question and drop its answer placeholder."""
+    get_job_queue().cancel(job_id)
+    get_job_queue().forget(job_id)
+    placeholder = st.session_state.pending_jobs.pop(job_id, None)
+    if placeholder in st.session_state.messages:
+        st.session_state.messages.remove(placeholder)
+
+@st.fragment(run_every=1.0)
+def render_pending_answers():
+    """Poll in-flight questions, fill finished answers in and offer cancellation."""
+    jobs = get_job_queue()
+    answered = False
+    for job_id, placeholder in list(st.session_state.pending_jobs.items()):
+        job = jobs.get(job_id)
+        if job is not None and not job.finished:
+            pending_col1, pending_col2 = st.columns([4, 1])
+            with pending_col1:
+                st.caption(f"🧘 Contemplating *{job.label[:80]}* … {time.time() - job.submitted_at:.0f}s")
+            with pending_col2:
+                st.button("✖ Cancel", key=f"cancel_{job_id}", on_click=cancel_question, args=(job_id,))
+            continue
+
+        placeholder.pop("pending_job", None)
+        placeholder.pop("_markdown", None)
+        if job is not None and job.status == DONE:
+            placeholder.update(job.result)
+            # Errors raised on the job queue are shown here, on the script thread
+            error = placeholder.pop("_error", None)
+            if error:
+                st.session_state.setdefault("answer_errors", []).append(error)
+        else:
+            placeholder.update({
+                "verse_reference": "Service Temporarily Unavailable",
+                "translation": "We're experiencing technical difficulties. Please try again in a moment.",
+                "explanation": "The wisdom of the Gita teaches us patience in times of difficulty.",
+                "application": "Take this moment to practice patience and try your question again.",
+                "keywords": ["patience", "perseverance"],
+                "timestamp": datetime.now().isoformat()
+            })
+        persist_message(placeholder)
+        del st.session_state.pending_jobs[job_id]
+        jobs.forget(job_id)
+        answered = True
+
+    if answered:
+        # Redraw the transcript and sidebar with the new answer
+        st.rerun()
 
 def main():
     """Enhanced main Streamlit application."""
@@ -760,71 +640,34 @@ def main():
 
     # Initialize session state first, before any other operations
     initialize_session_state()
+    remember_user()
 
-    # Load and display image with reduced width
-    if os.path.exists(IMAGE_PATH):
-        try:
-            image = Image.open(IMAGE_PATH)
-            # Increased max_width from 500 to 850 for larger image
-            max_width = 1800
-            aspect_ratio = image.height / image.width
-            resized_image = image.resize((max_width, int(max_width * aspect_ratio)))
-            
-            # Center the image by using columns with better proportions
-            col_img1, col_img2, col_img3 = st.columns([2, 1, 2])
-            with col_img2:
-                st.image(resized_image, use_container_width=True, caption="Bhagavad Gita - Eternal Wisdom")
-        except Exception as e:
-            st.error(f"Error loading image: {str(e)}")
-    else:
-        st.warning("Image file not found. Please ensure the image is in the correct location.")
+    # Display the header image from pre-built derivatives (see asset_pipeline.py)
+    render_header_image()
 
     # Check for auto question from sidebar verse buttons
     if hasattr(st.session_state, 'auto_question'):
-        st.session_state.messages.append({"role": "user", "content": st.session_state.auto_question})
-        with st.spinner("Contemplating your question..."):
-            response = asyncio.run(st.session_state.bot.get_response(
-                st.session_state.auto_question, 
-                st.session_state.selected_theme,
-                st.session_state.current_mood,
-                dominant_emotion()
-            ))
-            st.session_state.messages.append({
-                "role": "assistant",
-                **response
-            })
-            del st.session_state.auto_question  # Clear the auto question
-            st.rerun()
+        submit_question(st.session_state.auto_question)
+        del st.session_state.auto_question  # Clear the auto question
 
     # Render additional options below image
     quick_action = render_additional_options()
     
     # Handle quick actions
-    if quick_action:
+    if quick_action and not serve_warmed_answer(quick_action):
         auto_question = handle_quick_actions(quick_action)
         if auto_question:
-            st.session_state.messages.append({"role": "user", "content": auto_question})
-            with st.spinner("Contemplating your question..."):
-                response = asyncio.run(st.session_state.bot.get_response(
-                    auto_question, 
-                    st.session_state.selected_theme,
-                    st.session_state.current_mood,
-                    dominant_emotion()
-                ))
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    **response
-                })
-                st.rerun()
+            submit_question(auto_question)
 
     # Main content area - adjusted column widths: wider sidebar, narrower main content
     col1, col2 = st.columns([3, 2])
 
     with col1:
         if st.button("🔄 Reset Chat", help="Clear all chat history and start fresh"):
-            for key in ['messages', 'question_history']:
-                if key in st.session_state:
-                    st.session_state[key] = []
+            for job_id in st.session_state.pending_jobs:
+                get_job_queue().cancel(job_id)
+            st.session_state.pending_jobs = {}
+            reset_chat_state()
             st.rerun()
 
         st.title("🕉️ Bhagavad Gita Wisdom")
@@ -834,72 +677,22 @@ def main():
         *Personalize your experience using the options above.*
         """)
 
-        # Enhanced message display
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                if message["role"] == "user":
-                    st.markdown(message["content"])
-                else:
-                    # Enhanced assistant message display
-                    if message.get("verse_reference"):
-                        st.markdown(f"**📖 {message['verse_reference']}**")
-                    
-                    if message.get('sanskrit'):
-                        st.markdown(f"*Sanskrit:* {message['sanskrit']}")
-                    
-                    if message.get('translation'):
-                        st.markdown(f"**Translation:** {message['translation']}")
-                    
-                    if message.get('explanation'):
-                        st.markdown("### 🧠 Understanding")
-                        st.markdown(message["explanation"])
-                    
-                    if message.get('application'):
-                        st.markdown("### 🌟 Modern Application")
-                        st.markdown(message["application"])
-                    
-                    # Show keywords if available
-                    if message.get('keywords'):
-                        st.markdown("**Key Concepts:** " + " • ".join([f"`{kw}`" for kw in message['keywords']]))
-                    
-                    # Show context values that were passed to LLM
-                    context_parts = []
-                    if message.get('theme'):
-                        context_parts.append(f"🎯 {message['theme']}")
-                    if message.get('mood'):
-                        context_parts.append(f"🎭 {message['mood']}")
-                    if message.get('emotional_state'):
-                        context_parts.append(f"💭 {message['emotional_state']}")
-                    
-                    if context_parts:
-                        st.markdown("**Response Context:** " + " • ".join(context_parts))
+        # Recent messages in full, older ones in a collapsed archive
+        render_chat_history()
 
-        # Add the download button after the chat messages
+        # Export controls; the file is generated only when requested
         if st.session_state.messages:
-            chat_content = create_downloadable_content(st.session_state.messages)
-            st.download_button(
-                label="📥 Download Chat History",
-                data=chat_content,
-                file_name=f"WisdomWeaver_Chat_History_{datetime.now().strftime('%Y-%m-%d')}.txt",
-                mime="text/plain",
-                help="Download your entire chat conversation as a text file"
-            )
+            render_export_controls(all_messages, history_signature)
+
+        # Answers still being generated in the background, and errors from ones that finished
+        for error in st.session_state.pop("answer_errors", []):
+            st.error(f"Error getting response: {error}")
+        if st.session_state.pending_jobs:
+            render_pending_answers()
 
         # Enhanced chat input
         if question := st.chat_input("Ask your question here..."):
-            st.session_state.messages.append({"role": "user", "content": question})
-
-            with st.spinner("🧘 Contemplating your question..."):
-                response = asyncio.run(st.session_state.bot.get_response(
-                    question,
-                    st.session_state.selected_theme,
-                    st.session_state.current_mood,
-                    dominant_emotion()
-                ))
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    **response
-                })
+            if submit_question(question):
                 st.rerun()
 
         with col2:
@@ -937,4 +730,7 @@ In every era, humanity has faced the same questions: Who am I? What is my purpos
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Streamlit executes this script on every rerun
+    metrics.start_snapshots()
+    with metrics.timer("wisdom_rerun_seconds"), profile("rerun", force=profile_requested(st.query_params.get("profile"))):
+        main() 
\ No newline at end of file
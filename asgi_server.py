@@ -0,0 +1,495 @@
+"""
+ASGI variant of pwa_server.py, with answers streamed as server-sent events.
+
+Serves the same routes from the same precompressed asset cache and verse
+index, plus /api/ask, which answers a question with GitaGeminiBot and
+streams the answer to the client as server-sent events:
+
+    event: accepted      right away, with the stream's place in the queue
+    : keepalive          comments every ASGI_HEARTBEAT_SEC while waiting
+    event: verse         verse_reference, sanskrit, translation
+    event: explanation
+    event: application
+    event: done          keywords, source, timestamp
+
+An open stream waiting for its answer is a coroutine, not a thread. Bot
+calls block, so they run on a pool of ASGI_ASK_CONCURRENCY threads; streams
+beyond that wait for a slot. Connections beyond ASGI_MAX_STREAMS get a 503
+with Retry-After. Each event is sent with the server's flow control, so a
+client that stops reading holds up only its own stream, and it is dropped
+after ASGI_SEND_TIMEOUT_SEC. A client that disconnects while queued never
+reaches the model.
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000 --workers 4
+    python asgi_server.py --port 5000
+    curl -N 'http://localhost:5000/api/ask?q=How+do+I+find+peace&theme=Inner+Peace'
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qs
+
+import metrics
+from asset_cache import NO_CACHE, SHORT_CACHE, select_variant
+from asset_pipeline import MIME_TYPES, VERSES_DIR, derivative_path, pick_derivative
+from pwa_server import BASE_DIR, PRELOAD_ASSETS, assets, service_worker_parts
+from verse_index import DEFAULT_PAGE_SIZE, DEFAULT_SEARCH_SIZE, JSON_MIMETYPE, APIError, dumps, get_verse_index, page_args
+
+logger = logging.getLogger(__name__)
+
+MAX_STREAMS = int(os.getenv("ASGI_MAX_STREAMS", "2000"))         # open /api/ask streams per process
+ASK_CONCURRENCY = int(os.getenv("ASGI_ASK_CONCURRENCY", "16"))   # bot calls in flight per process
+HEARTBEAT_SEC = float(os.getenv("ASGI_HEARTBEAT_SEC", "15"))
+SEND_TIMEOUT_SEC = float(os.getenv("ASGI_SEND_TIMEOUT_SEC", "30"))
+RETRY_AFTER_SEC = 5
+STREAM_RETRY_MS = 3000          # EventSource reconnect delay
+MAX_BODY_BYTES = 16 * 1024
+MAX_QUESTION_CHARS = 2000
+FILE_CHUNK_BYTES = 256 * 1024
+
+ANSWER_SECTIONS = (
+    ("verse", ("verse_reference", "sanskrit", "translation")),
+    ("explanation", ("explanation",)),
+    ("application", ("application",)),
+)
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "receive")
+
+    def __init__(self, scope: Dict, receive):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = {k: v[-1] for k, v in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.receive = receive
+
+    def arg_int(self, name: str) -> Optional[int]:
+        try:
+            return int(self.query[name])
+        except (KeyError, ValueError):
+            return None
+
+    async def body(self, limit: int = MAX_BODY_BYTES) -> bytes:
+        chunks, size = [], 0
+        while True:
+            message = await self.receive()
+            if message["type"] == "http.disconnect":
+                raise APIError(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise APIError(413, f"Request body is limited to {limit} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+
+async def respond(request: Request, send, status: int, body: bytes = b"", content_type: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None):
+    raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()]
+    if content_type and status != 304:
+        raw_headers.append((b"content-type", content_type.encode("latin-1")))
+    raw_headers.append((b"content-length", str(len(body)).encode("ascii")))
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": b"" if request.method == "HEAD" else body})
+
+
+async def respond_variants(request: Request, send, variants, mimetype: str, cache_control: str, vary: Iterable[str] = ()):
+    """Send encode_variants() output, or a 304 when the client's ETag matches."""
+    status, headers, body = select_variant(variants, request.headers.get("accept-encoding", ""),
+                                           request.headers.get("if-none-match"), cache_control, vary)
+    await respond(request, send, status, body, mimetype, headers)
+
+
+async def serve_asset(request: Request, send, parts, missing_message: str, mimetype: Optional[str] = None,
+                      cache_control: Optional[str] = None, vary: Iterable[str] = ()):
+    """Serve a file from the precompressed asset cache, or 404"""
+    asset = assets.get(*parts, mimetype=mimetype)
+    if asset is not None:
+        await respond_variants(request, send, asset.variants, mimetype or asset.mimetype,
+                               cache_control or asset.cache_control, vary)
+        return
+    path = assets.resolve(*parts)
+    if path is None or not path.is_file():
+        await respond(request, send, 404, missing_message.encode("utf-8"), "text/plain; charset=utf-8")
+        return
+    # Too large to keep in memory: stream it from disk without blocking the event loop
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", (mimetype or "application/octet-stream").encode("latin-1")),
+        (b"content-length", str(path.stat().st_size).encode("ascii")),
+        (b"cache-control", b"no-cache"),
+    ]})
+    if request.method == "HEAD":
+        await send({"type": "http.response.body", "body": b""})
+        return
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, FILE_CHUNK_BYTES)
+            await send({"type": "http.response.body", "body": chunk, "more_body": bool(chunk)})
+            if not chunk:
+                break
+
+
+def _verses_dir() -> str:
+    return os.path.relpath(VERSES_DIR, BASE_DIR)
+
+
+async def serve_manifest(request, send):
+    await serve_asset(request, send, ["manifest.json"], "Manifest file not found", mimetype="application/json")
+
+
+async def serve_service_worker(request, send):
+    await serve_asset(request, send, service_worker_parts(), "Service worker not found",
+                      mimetype="application/javascript", cache_control=NO_CACHE)
+
+
+async def serve_static(request, send, filename):
+    await serve_asset(request, send, ["static", *filename.split("/")], "File not found")
+
+
+async def serve_responsive_image(request, send, name):
+    width = request.arg_int("w") or 640
+    fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    derivative = pick_derivative(name, width, fmt)
+    if derivative is None:
+        await respond(request, send, 404, b"Image not built - run asset_pipeline.py", "text/plain; charset=utf-8")
+        return
+    relative_path = os.path.relpath(derivative_path(derivative), BASE_DIR)
+    await serve_asset(request, send, relative_path.split(os.sep), "Image not found", mimetype=MIME_TYPES[fmt],
+                      cache_control=SHORT_CACHE, vary=("Accept",))
+
+
+async def serve_pwa_page(request, send):
+    await serve_asset(request, send, ["pwa.html"], "PWA page not found", mimetype="text/html")
+
+
+async def serve_csv(request, send):
+    await serve_asset(request, send, ["bhagavad_gita_verses.csv"], "CSV file not found", mimetype="text/csv")
+
+
+async def serve_verse_index(request, send):
+    await serve_asset(request, send, [_verses_dir(), "index.json"], "Verse index not built - run asset_pipeline.py",
+                      mimetype="application/json")
+
+
+async def serve_verse_shard(request, send, filename):
+    await serve_asset(request, send, [_verses_dir(), filename], "Chapter shard not found", mimetype="application/json")
+
+
+async def serve_images(request, send, filename):
+    await serve_asset(request, send, ["Public/Images", *filename.split("/")], "Image not found")
+
+
+async def api_chapters(request, send):
+    await respond_variants(request, send, get_verse_index().chapter_list, JSON_MIMETYPE, NO_CACHE)
+
+
+async def api_chapter(request, send, chapter):
+    page, per_page = page_args(request.query.get("page"), request.query.get("per_page"), DEFAULT_PAGE_SIZE)
+    await respond_variants(request, send, get_verse_index().chapter_page(int(chapter), page, per_page),
+                           JSON_MIMETYPE, NO_CACHE)
+
+
+async def api_verse(request, send, reference):
+    await respond_variants(request, send, get_verse_index().verse(reference), JSON_MIMETYPE, NO_CACHE)
+
+
+async def api_search(request, send):
+    page, per_page = page_args(request.query.get("page"), request.query.get("per_page"), DEFAULT_SEARCH_SIZE)
+    await respond_variants(request, send, get_verse_index().search(request.query.get("q", ""), page, per_page),
+                           JSON_MIMETYPE, NO_CACHE)
+
+
+async def serve_metrics(request, send):
+    if not metrics.scrape_allowed(request.headers.get("authorization")):
+        await respond(request, send, 404, b"Not found", "text/plain; charset=utf-8")
+        return
+    text = await asyncio.to_thread(lambda: metrics.render_prometheus(metrics.collect()))
+    await respond(request, send, 200, text.encode("utf-8"), "text/plain; version=0.0.4", {"Cache-Control": "no-store"})
+
+
+_bot = None
+_bot_lock = threading.Lock()
+
+
+def get_bot():
+    """Process-wide bot, created on first question (imports the model client only when asked)."""
+    global _bot
+    with _bot_lock:
+        if _bot is None:
+            from gita_bot import GitaGeminiBot
+            _bot = GitaGeminiBot(os.getenv("GEMINI_API_KEY", ""))
+        return _bot
+
+
+def answer_question(question: Dict) -> Dict:
+    """Blocking bot call, run on the ask pool."""
+    return asyncio.run(get_bot().get_response(
+        question["question"], question["theme"], question["mood"], question["emotional_state"],
+        session_id=question["session_id"]
+    ))
+
+
+class ClientGone(Exception):
+    """The client disconnected or stopped reading."""
+
+
+class AnswerStreams:
+    """Open /api/ask streams in this process: the connection limit and the pool that runs bot calls."""
+
+    def __init__(self, max_streams: int = MAX_STREAMS, concurrency: int = ASK_CONCURRENCY):
+        self.max_streams = max_streams
+        self.open = 0
+        self.waiting = 0
+        self.slots = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ask")
+
+    def stats(self) -> Dict:
+        return {"open": self.open, "waiting": self.waiting, "max_streams": self.max_streams}
+
+
+_streams: Optional[AnswerStreams] = None
+
+
+def answer_streams() -> AnswerStreams:
+    global _streams
+    if _streams is None:
+        _streams = AnswerStreams()
+    return _streams
+
+
+class EventStream:
+    """A server-sent event response that notices when its client leaves."""
+
+    def __init__(self, request: Request, send):
+        self.send = send
+        self.gone = asyncio.Event()
+        self._watcher = asyncio.ensure_future(self._watch(request.receive))
+
+    async def _watch(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        self.gone.set()
+
+    async def start(self):
+        await self.send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),     # no proxy buffering, events must arrive as sent
+        ]})
+        await self._write(f"retry: {STREAM_RETRY_MS}\n\n".encode("ascii"))
+
+    async def event(self, name: str, data: Dict):
+        await self._write(b"event: " + name.encode("ascii") + b"\ndata: " + dumps(data) + b"\n\n")
+
+    async def _write(self, body: bytes, more_body: bool = True):
+        if self.gone.is_set():
+            raise ClientGone("disconnected")
+        try:
+            # send() waits while the transport's buffer is full
+            await asyncio.wait_for(self.send({"type": "http.response.body", "body": body, "more_body": more_body}),
+                                   SEND_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            raise ClientGone("slow client") from None
+
+    async def until(self, awaitable):
+        """Await a future, sending keepalives meanwhile; cancels it and raises ClientGone if the client leaves first."""
+        task = asyncio.ensure_future(awaitable)
+        gone = asyncio.ensure_future(self.gone.wait())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task, gone}, timeout=HEARTBEAT_SEC, return_when=asyncio.FIRST_COMPLETED)
+                if task in done:
+                    return task.result()
+                if gone in done:
+                    task.cancel()
+                    raise ClientGone("disconnected")
+                await self._write(b": keepalive\n\n")
+        finally:
+            gone.cancel()
+            if not task.done():
+                task.cancel()
+
+    async def close(self):
+        if not self.gone.is_set():
+            await self._write(b"", more_body=False)
+
+    def stop(self):
+        self._watcher.cancel()
+
+
+async def ask_params(request: Request) -> Dict:
+    """The question from ?q=&theme=&mood=&emotion= (EventSource) or a JSON body (fetch)."""
+    if request.method == "POST":
+        try:
+            data = json.loads(await request.body() or b"{}")
+        except json.JSONDecodeError:
+            raise APIError(400, "Request body must be JSON") from None
+        if not isinstance(data, dict):
+            raise APIError(400, "Request body must be a JSON object")
+    else:
+        data = {**request.query, "question": request.query.get("q", request.query.get("question")),
+                "emotional_state": request.query.get("emotion")}
+    question = str(data.get("question") or "").strip()
+    if not question:
+        raise APIError(400, "Missing question")
+    if len(question) > MAX_QUESTION_CHARS:
+        raise APIError(413, f"Questions are limited to {MAX_QUESTION_CHARS} characters")
+    return {
+        "question": question,
+        "theme": data.get("theme") or None,
+        "mood": data.get("mood") or None,
+        "emotional_state": data.get("emotional_state") or None,
+        "session_id": data.get("session_id") or None,
+    }
+
+
+async def api_ask(request, send):
+    question = await ask_params(request)
+    streams = answer_streams()
+    if streams.open >= streams.max_streams:
+        metrics.inc("wisdom_answer_streams_total", outcome="rejected")
+        await respond(request, send, 503, dumps({"error": "Too many open answer streams"}), JSON_MIMETYPE,
+                      {"Retry-After": str(RETRY_AFTER_SEC)})
+        return
+
+    started = time.monotonic()
+    streams.open += 1
+    stream = EventStream(request, send)
+    outcome = "completed"
+    try:
+        await stream.start()
+        await stream.event("accepted", {"waiting": streams.waiting})
+
+        streams.waiting += 1
+        try:
+            await stream.until(streams.slots.acquire())
+        finally:
+            streams.waiting -= 1
+        # The slot is freed when the call returns, even if this stream has gone by then
+        loop = asyncio.get_running_loop()
+        call = streams.executor.submit(answer_question, question)
+        call.add_done_callback(lambda _: loop.call_soon_threadsafe(streams.slots.release))
+        answer = await stream.until(asyncio.wrap_future(call))
+
+        for name, keys in ANSWER_SECTIONS:
+            await stream.event(name, {key: answer.get(key, "") for key in keys})
+        await stream.event("done", {
+            "keywords": answer.get("keywords", []),
+            "source": answer.get("source", "model"),
+            "timestamp": answer.get("timestamp") or datetime.now().isoformat(),
+            "error": bool(answer.get("error")),
+        })
+        await stream.close()
+    except ClientGone as e:
+        outcome = "slow_client" if str(e) == "slow client" else "disconnected"
+        logger.debug("Answer stream ended early: %s", e)
+    except Exception:
+        outcome = "error"
+        logger.exception("Answer stream failed")
+        if not stream.gone.is_set():
+            try:
+                await stream.event("error", {"error": "Could not answer the question"})
+                await stream.close()
+            except ClientGone:
+                pass
+    finally:
+        streams.open -= 1
+        stream.stop()
+        metrics.inc("wisdom_answer_streams_total", outcome=outcome)
+        metrics.observe("wisdom_answer_stream_seconds", time.monotonic() - started, outcome=outcome)
+
+
+async def api_ask_stats(request, send):
+    await respond(request, send, 200, dumps(answer_streams().stats()), JSON_MIMETYPE, {"Cache-Control": "no-store"})
+
+
+GET = ("GET", "HEAD")
+ROUTES = [(methods, re.compile(pattern), handler) for methods, pattern, handler in (
+    (GET, r"/manifest\.json", serve_manifest),
+    (GET, r"/sw\.js", serve_service_worker),
+    (GET, r"/static/(?P<filename>.+)", serve_static),
+    (GET, r"/images/(?P<name>[^/]+)", serve_responsive_image),
+    (GET, r"/pwa\.html", serve_pwa_page),
+    (GET, r"/bhagavad_gita_verses\.csv", serve_csv),
+    (GET, r"/verses/index\.json", serve_verse_index),
+    (GET, r"/verses/(?P<filename>[^/]+)", serve_verse_shard),
+    (GET, r"/api/chapters", api_chapters),
+    (GET, r"/api/chapters/(?P<chapter>\d+)", api_chapter),
+    (GET, r"/api/verses/(?P<reference>[^/]+)", api_verse),
+    (GET, r"/api/search", api_search),
+    (("GET", "POST"), r"/api/ask", api_ask),
+    (GET, r"/api/ask/stats", api_ask_stats),
+    (GET, r"/Public/Images/(?P<filename>.+)", serve_images),
+    (GET, r"/metrics", serve_metrics),
+    (GET, r"/", serve_pwa_page),
+)]
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Compress assets and build the verse index before the first request
+            await asyncio.to_thread(assets.preload, PRELOAD_ASSETS)
+            await asyncio.to_thread(get_verse_index)
+            metrics.start_snapshots()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _streams is not None:
+                _streams.executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    request = Request(scope, receive)
+    for methods, pattern, handler in ROUTES:
+        match = pattern.fullmatch(request.path)
+        if match is None:
+            continue
+        if request.method not in methods:
+            await respond(request, send, 405, b"Method not allowed", "text/plain; charset=utf-8",
+                          {"Allow": ", ".join(methods)})
+            return
+        try:
+            await handler(request, send, **match.groupdict())
+        except APIError as error:
+            await respond(request, send, error.status, dumps({"error": error.message}), JSON_MIMETYPE)
+        return
+    await respond(request, send, 404, b"Not found", "text/plain; charset=utf-8")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WisdomWeaver ASGI server with streamed answers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is not installed - pip install uvicorn, or run pwa_server.py")
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    print(f"🕉️  WisdomWeaver ASGI server on port {args.port}: PWA files, /api/*, streamed answers at /api/ask")
+    uvicorn.run("asgi_server:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_keep_alive=30, log_level="info")
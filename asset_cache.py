@@ -0,0 +1,190 @@
+"""
+In-memory, precompressed static assets for the PWA server.
+
+Each file is read once and kept with gzip and (when the optional brotli
+package is installed) brotli variants, so requests are answered from memory
+without compressing per request. Responses carry a strong ETag per encoding,
+a Cache-Control policy by path (immutable for content-hashed build output,
+no-cache for the service worker and the pages that reference it) and
+Vary: Accept-Encoding; If-None-Match is answered with 304.
+
+Files are re-read when their mtime or size changes, so assets rebuilt while
+the server runs (asset_pipeline.py, setup_pwa.py) are picked up.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:     # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/manifest+json', 'image/svg+xml')
+MIN_COMPRESS_BYTES = 256
+MAX_CACHED_BYTES = 8 * 1024 * 1024     # larger files are streamed from disk
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+NO_CACHE = 'no-cache'       # always revalidate; a matching ETag costs a 304
+SHORT_CACHE = 'public, max-age=86400'
+
+
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{8,}\.\w+$')     # name.<content hash>.ext
+
+
+def cache_policy(relative_path: str) -> str:
+    """Cache-Control for a file, by its path relative to the app directory."""
+    if FINGERPRINTED.search(relative_path):
+        return IMMUTABLE        # a changed file gets a new name
+    if relative_path.endswith(('.js', '.html', '.json', '.csv')):
+        return NO_CACHE         # sw.js must never be served stale; pages and data revalidate
+    return SHORT_CACHE
+
+
+def encode_variants(data: bytes, mimetype: str, compresslevel: int = 9) -> Dict[str, Tuple[bytes, str]]:
+    """encoding -> (body, etag) for data: identity plus gzip/brotli when they are smaller."""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    variants = {'identity': (data, f'"{digest}"')}
+    if len(data) >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES):
+        compressed = gzip.compress(data, compresslevel=compresslevel, mtime=0)
+        if len(compressed) < len(data):
+            variants['gzip'] = (compressed, f'"{digest}-gz"')
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=min(compresslevel + 2, 11))
+            if len(compressed) < len(data):
+                variants['br'] = (compressed, f'"{digest}-br"')
+    return variants
+
+
+def choose_encoding(variants: Dict[str, Tuple[bytes, str]], accept_encoding: str) -> str:
+    """Smallest variant the client accepts."""
+    accepted = {token.split(';')[0].strip().lower() for token in accept_encoding.split(',')}
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and encoding in accepted:
+            return encoding
+    return 'identity'
+
+
+class Asset:
+    __slots__ = ('path', 'stat_key', 'mimetype', 'cache_control', 'variants')
+
+    def __init__(self, path: Path, stat_key: Tuple[int, int], mimetype: str, cache_control: str, data: bytes):
+        self.path = path
+        self.stat_key = stat_key
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.variants = encode_variants(data, mimetype)
+
+    def choose(self, accept_encoding: str) -> str:
+        return choose_encoding(self.variants, accept_encoding)
+
+
+def _etags(header: str) -> List[str]:
+    # Compare weakly: intermediaries may turn a strong ETag into W/"..."
+    return [t.strip().removeprefix('W/') for t in header.split(',')]
+
+
+class AssetCache:
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self._assets: Dict[Path, Asset] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, *parts: str) -> Optional[Path]:
+        """base_dir/parts..., or None when a part escapes its directory (e.g. a '..' in a URL)."""
+        joined = safe_join(str(self.base_dir), *parts)
+        return Path(joined) if joined is not None else None
+
+    def get(self, *parts: str, mimetype: Optional[str] = None) -> Optional[Asset]:
+        """The cached asset for base_dir/parts..., (re)loading it when the file changed."""
+        path = self.resolve(*parts)
+        if path is None:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if not path.is_file() or stat.st_size > MAX_CACHED_BYTES:
+            return None
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        asset = self._assets.get(path)
+        if asset is None or asset.stat_key != stat_key:
+            with self._lock:
+                asset = self._assets.get(path)
+                if asset is None or asset.stat_key != stat_key:
+                    mimetype = mimetype or mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+                    policy = cache_policy(path.relative_to(self.base_dir).as_posix())
+                    asset = Asset(path, stat_key, mimetype, policy, path.read_bytes())
+                    self._assets[path] = asset
+        return asset
+
+    def preload(self, relative_paths: Iterable[str]) -> List[Asset]:
+        """Load and compress files up front, e.g. at server start before workers fork."""
+        assets = [a for a in (self.get(*p.split('/')) for p in relative_paths) if a is not None]
+        logger.info(
+            "Preloaded %d assets: %d bytes, %d gzip, %d brotli", len(assets),
+            sum(len(a.variants['identity'][0]) for a in assets),
+            sum(len(a.variants.get('gzip', a.variants['identity'])[0]) for a in assets),
+            sum(len(a.variants.get('br', a.variants.get('gzip', a.variants['identity']))[0]) for a in assets)
+        )
+        return assets
+
+    def respond(self, *parts: str, mimetype: Optional[str] = None,
+                cache_control: Optional[str] = None, vary: Iterable[str] = ()) -> Optional[Response]:
+        """
+        A response to the current request for base_dir/parts..., or None when there is no such file.
+
+        Pass untrusted path segments (URL parameters) as separate parts so they cannot leave their directory.
+        """
+        asset = self.get(*parts, mimetype=mimetype)
+        if asset is None:
+            path = self.resolve(*parts)
+            if path is None or not path.is_file():
+                return None
+            # Too large to keep in memory
+            return send_file(path, mimetype=mimetype, max_age=0, conditional=True)
+        return variants_response(asset.variants, mimetype or asset.mimetype,
+                                 cache_control or asset.cache_control, vary)
+
+
+def select_variant(variants: Dict[str, Tuple[bytes, str]], accept_encoding: str, if_none_match: Optional[str],
+                   cache_control: str, vary: Iterable[str] = ()) -> Tuple[int, Dict[str, str], bytes]:
+    """(status, headers, body) for a request with these headers: the variant to send, or a 304."""
+    encoding = choose_encoding(variants, accept_encoding)
+    body, etag = variants[encoding]
+    headers = {
+        'ETag': etag,
+        'Cache-Control': cache_control,
+    }
+    if len(variants) > 1:
+        headers['Vary'] = ', '.join(['Accept-Encoding', *vary])
+    elif vary:
+        headers['Vary'] = ', '.join(vary)
+
+    if if_none_match and (if_none_match.strip() == '*' or etag in _etags(if_none_match)):
+        return 304, headers, b''
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return 200, headers, body
+
+
+def variants_response(variants: Dict[str, Tuple[bytes, str]], mimetype: str, cache_control: str,
+                      vary: Iterable[str] = ()) -> Response:
+    """A Flask response to the current request from encode_variants() output, or a 304 when its ETag matches."""
+    status, headers, body = select_variant(variants, request.headers.get('Accept-Encoding', ''),
+                                           request.headers.get('If-None-Match'), cache_control, vary)
+    if status == 304:
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype=mimetype, headers=headers)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Asset build step for WisdomWeaver.
+
+Generates width-bucketed WebP and JPEG derivatives of the header image once,
+names them by content hash and records them in a manifest, so the app and
+the PWA server can serve a ready-made file instead of decoding and resizing
+the original on every Streamlit rerun.
+
+Also splits the verses CSV into one content-hashed JSON shard per chapter
+plus a small index, so offline PWA clients fetch and cache only the
+chapters they open and re-download just the shards whose data changed,
+and builds the related-verses graph (related_verses.py).
+
+    python asset_pipeline.py          # build (skips work when the source is unchanged)
+    python asset_pipeline.py --force  # rebuild everything
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASE_DIR = Path(__file__).parent
+BUILD_DIR = BASE_DIR / 'static' / 'build'
+IMAGES_DIR = BUILD_DIR / 'images'
+IMAGE_MANIFEST = IMAGES_DIR / 'manifest.json'
+
+# sw.js with the precache list generated by `setup_pwa.py build`; the checked-in sw.js has an empty one
+SERVICE_WORKER = BUILD_DIR / 'sw.js'
+
+VERSES_DIR = BUILD_DIR / 'verses'
+VERSE_INDEX = VERSES_DIR / 'index.json'
+VERSES_URL = '/verses'
+
+HEADER_IMAGE = 'Public/Images/WhatsApp Image 2024-11-18 at 11.40.34_076eab8e.jpg'
+VERSES_CSV = 'bhagavad_gita_verses.csv'
+WIDTH_BUCKETS = (320, 640, 1024)
+IMAGE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+MIME_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+def content_hash(data: bytes, length: int = 10) -> str:
+    """Short sha256 digest used to fingerprint built files."""
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def _load_manifest() -> Dict:
+    try:
+        with open(IMAGE_MANIFEST, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def build_image_derivatives(name: str, source: str, force: bool = False) -> Dict:
+    """Write resized derivatives of `source` and return its manifest entry."""
+    from PIL import Image
+
+    source_bytes = (BASE_DIR / source).read_bytes()
+    source_hash = content_hash(source_bytes)
+
+    manifest = _load_manifest()
+    entry = manifest.get(name)
+    if (
+        not force and entry and entry.get('source_hash') == source_hash
+        and all((IMAGES_DIR / d['file']).exists() for d in entry['derivatives'])
+    ):
+        print(f"✅ {name}: up to date")
+        return entry
+
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    image = Image.open(io.BytesIO(source_bytes)).convert('RGB')
+
+    derivatives = []
+    # Never upscale: buckets wider than the source collapse to the source width
+    widths = sorted({min(width, image.width) for width in WIDTH_BUCKETS})
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for ext, options in IMAGE_FORMATS.items():
+            if resized is image and ext == 'jpeg' and source.lower().endswith(('.jpg', '.jpeg')):
+                # Full-width JPEG: the original is already the best candidate
+                data = source_bytes
+            else:
+                buffer = io.BytesIO()
+                resized.save(buffer, **options)
+                data = buffer.getvalue()
+            filename = f"{name}-{width}.{content_hash(data)}.{ext}"
+            (IMAGES_DIR / filename).write_bytes(data)
+            derivatives.append({
+                'width': width,
+                'height': height,
+                'format': ext,
+                'file': filename,
+                'bytes': len(data),
+            })
+            print(f"   {filename} ({len(data) / 1024:.1f} KB)")
+
+    # Remove derivatives from previous builds of this image
+    current = {d['file'] for d in derivatives}
+    for old in (entry or {}).get('derivatives', []):
+        if old['file'] not in current:
+            (IMAGES_DIR / old['file']).unlink(missing_ok=True)
+
+    entry = {
+        'source': source,
+        'source_hash': source_hash,
+        'width': image.width,
+        'height': image.height,
+        'derivatives': derivatives,
+    }
+    manifest[name] = entry
+    with open(IMAGE_MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ {name}: built {len(derivatives)} derivatives")
+    return entry
+
+
+def _load_verse_index() -> Dict:
+    try:
+        with open(VERSE_INDEX, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def build_verse_shards(source: str = VERSES_CSV, force: bool = False) -> Dict:
+    """Write one JSON shard per chapter and the index that lists them; returns the index."""
+    source_bytes = (BASE_DIR / source).read_bytes()
+    source_hash = content_hash(source_bytes)
+
+    index = _load_verse_index()
+    if (
+        not force and index.get('source_hash') == source_hash
+        and all((VERSES_DIR / c['file']).exists() for c in index['chapters'])
+    ):
+        print("✅ verses: up to date")
+        return index
+
+    chapters: Dict[int, Dict] = {}
+    rows = csv.DictReader(io.StringIO(source_bytes.decode('utf-8')))
+    for row in rows:
+        number = int(row['chapter_number'].split()[-1])
+        chapter = chapters.setdefault(number, {'chapter': number, 'title': row['chapter_title'], 'verses': []})
+        chapter['verses'].append({'verse': row['chapter_verse'], 'translation': row['translation']})
+
+    VERSES_DIR.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for number in sorted(chapters):
+        data = json.dumps(chapters[number], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = content_hash(data)
+        filename = f"chapter-{number}.{digest}.json"
+        (VERSES_DIR / filename).write_bytes(data)
+        entries.append({
+            'chapter': number,
+            'title': chapters[number]['title'],
+            'verses': len(chapters[number]['verses']),
+            'file': filename,
+            'url': f"{VERSES_URL}/{filename}",
+            'hash': digest,
+            'bytes': len(data),
+        })
+
+    # Remove shards from previous builds
+    current = {e['file'] for e in entries}
+    for old in VERSES_DIR.glob('chapter-*.json'):
+        if old.name not in current:
+            old.unlink()
+
+    index = {
+        'source_hash': source_hash,
+        'version': content_hash(''.join(e['hash'] for e in entries).encode('ascii')),
+        'chapters': entries,
+    }
+    with open(VERSE_INDEX, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"✅ verses: {len(entries)} chapter shards, {sum(e['bytes'] for e in entries) / 1024:.1f} KB "
+          f"(index {VERSE_INDEX.stat().st_size} B)")
+    return index
+
+
+# ((mtime, size) of the manifest file, its contents)
+_manifest_cache = (None, {})
+
+
+def _current_manifest() -> Dict:
+    """The image manifest, re-read when a rebuild has replaced it (a rebuild deletes the old derivatives)."""
+    global _manifest_cache
+    try:
+        stat = IMAGE_MANIFEST.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        key = None
+    cached_key, manifest = _manifest_cache
+    if key != cached_key:
+        manifest = _load_manifest()
+        _manifest_cache = (key, manifest)
+    return manifest
+
+
+def image_derivatives(name: str) -> List[Dict]:
+    """Derivatives recorded for an image in the build manifest (empty if not built)."""
+    return _current_manifest().get(name, {}).get('derivatives', [])
+
+
+def pick_derivative(name: str, width: int, fmt: str = 'jpeg') -> Optional[Dict]:
+    """Smallest derivative of the given format at least `width` pixels wide (else the largest)."""
+    candidates = sorted(
+        (d for d in image_derivatives(name) if d['format'] == fmt),
+        key=lambda d: d['width']
+    )
+    if not candidates:
+        return None
+    return next((d for d in candidates if d['width'] >= width), candidates[-1])
+
+
+def derivative_path(derivative: Dict) -> Path:
+    return IMAGES_DIR / derivative['file']
+
+
+def picture_html(name: str, base_url: str, alt: str, sizes: str = '100vw', caption: str = '') -> str:
+    """<picture> markup letting the browser pick the bucket and format it needs."""
+    derivatives = image_derivatives(name)
+    sources = []
+    for ext in ('webp', 'jpeg'):
+        srcset = ', '.join(
+            f"{base_url}/{d['file']} {d['width']}w" for d in derivatives if d['format'] == ext
+        )
+        sources.append(f'<source type="{MIME_TYPES[ext]}" srcset="{srcset}" sizes="{sizes}">')
+    fallback = pick_derivative(name, 640)
+    figcaption = f'<figcaption style="text-align:center;font-size:0.85rem;opacity:0.7">{caption}</figcaption>' if caption else ''
+    return (
+        '<figure style="margin:0"><picture>'
+        + ''.join(sources)
+        + f'<img src="{base_url}/{fallback["file"]}" alt="{alt}" width="{fallback["width"]}" '
+        + f'height="{fallback["height"]}" style="width:100%;height:auto" loading="eager">'
+        + f'</picture>{figcaption}</figure>'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build WisdomWeaver static asset derivatives")
+    parser.add_argument('--force', action='store_true', help="rebuild even if sources are unchanged")
+    args = parser.parse_args()
+
+    print("🕉️  WisdomWeaver Asset Build")
+    print("=" * 40)
+    build_image_derivatives('header', HEADER_IMAGE, force=args.force)
+    build_verse_shards(force=args.force)
+
+    # Imported here: related_verses imports this module
+    from related_verses import build_related_verses
+    build_related_verses(force=args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Offline batch generation of per-verse explanations for every theme.
+
+Walks the bot's verses_db and asks the model to explain each verse under each
+theme in GitaGeminiBot.themes, with bounded concurrency and a request-rate
+limit. Every result is committed to the explanation store as soon as it
+arrives, so an interrupted run resumes where it stopped.
+
+    python batch_explain.py --concurrency 4 --rate 2
+    python batch_explain.py --chapters 2 12 --themes "Inner Peace"
+    python batch_explain.py --standin          # against a local stand-in model
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from admission_control import BACKGROUND
+from explanation_store import EXPLANATION_STORE_PATH, ExplanationStore
+from gita_bot import GitaGeminiBot
+from verse_refs import chapter_number
+
+
+class RateLimiter:
+    """Spaces calls out to at most `rate` per second across all workers."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def verse_question(chapter: int, verse: str) -> str:
+    # Same wording as the sidebar's "Ask about this verse" button
+    return f"Please explain Chapter {chapter}, Verse {verse} and its practical application in modern life."
+
+
+def plan_tasks(bot, store: ExplanationStore, chapters=None, themes=None, limit=None):
+    """(chapter, verse, theme) triples still missing from the store."""
+    done = store.keys()
+    themes = themes or list(bot.themes.keys())
+    tasks = []
+    for chapter_key, chapter_data in bot.verses_db.items():
+        chapter = chapter_number(chapter_key)
+        if chapters and chapter not in chapters:
+            continue
+        for verse in chapter_data["verses"]:
+            for theme in themes:
+                if (chapter, verse, theme) not in done:
+                    tasks.append((chapter, verse, theme))
+    return tasks[:limit] if limit else tasks
+
+
+async def run_batch(bot, store: ExplanationStore, tasks, concurrency: int, rate: float, retries: int):
+    limiter = RateLimiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = {"done": 0, "failed": 0}
+    started = time.monotonic()
+
+    async def explain(chapter, verse, theme):
+        async with semaphore:
+            for attempt in range(retries):
+                await limiter.wait()
+                # get_response blocks on the HTTP call, so run it off the event loop
+                response = await asyncio.to_thread(
+                    lambda: asyncio.run(bot.get_response(verse_question(chapter, verse), theme, priority=BACKGROUND))
+                )
+                # Shed or failed calls fall back to local answers, which must not be stored
+                if not response.get("error") and response.get("source") != "offline":
+                    store.put(chapter, verse, theme, response)
+                    progress["done"] += 1
+                    break
+                await asyncio.sleep(2 ** attempt)
+            else:
+                progress["failed"] += 1
+                print(f"❌ Chapter {chapter}, Verse {verse} [{theme}] failed after {retries} attempts")
+
+            finished = progress["done"] + progress["failed"]
+            if finished % 25 == 0 or finished == len(tasks):
+                elapsed = time.monotonic() - started
+                print(f"   {finished}/{len(tasks)} done ({progress['failed']} failed, {finished / elapsed:.1f}/s)")
+
+    await asyncio.gather(*(explain(*task) for task in tasks))
+    return progress
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Generate verse explanations for every theme into the local store")
+    parser.add_argument("--store", default=EXPLANATION_STORE_PATH, help="SQLite store path")
+    parser.add_argument("--chapters", type=int, nargs="*", help="only these chapter numbers")
+    parser.add_argument("--themes", nargs="*", help="only these themes")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=2.0, help="maximum requests per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3, help="attempts per verse/theme")
+    parser.add_argument("--limit", type=int, help="stop after this many new explanations")
+    parser.add_argument("--endpoint", default=os.getenv("GEMINI_API_ENDPOINT"), help="alternative API endpoint")
+    parser.add_argument("--standin", action="store_true", help="start a local stand-in model and use it")
+    args = parser.parse_args()
+
+    if args.standin:
+        import gemini_standin
+        args.endpoint = gemini_standin.start_in_thread().url
+        print(f"🧪 Using local stand-in model at {args.endpoint}")
+
+    bot = GitaGeminiBot(os.getenv("GEMINI_API_KEY", "standin"), api_endpoint=args.endpoint)
+    store = ExplanationStore(args.store)
+
+    tasks = plan_tasks(bot, store, args.chapters, args.themes, args.limit)
+    print("🕉️  WisdomWeaver Batch Explanations")
+    print("=" * 40)
+    print(f"Store: {args.store} ({store.count()} stored)")
+    print(f"To generate: {len(tasks)} (concurrency {args.concurrency}, {args.rate or 'unlimited'} req/s)")
+    if not tasks:
+        print("✅ Nothing to do")
+        return
+
+    try:
+        progress = asyncio.run(run_batch(bot, store, tasks, args.concurrency, args.rate, args.retries))
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted - rerun the same command to resume")
+        return
+    print(f"✅ Generated {progress['done']}, failed {progress['failed']}, store now holds {store.count()}")
+
+
+if __name__ == "__main__":
+    main()
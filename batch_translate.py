@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Offline batch translation of every verse into the languages of the translation store.
+
+Asks the model once per (verse, language) with bounded concurrency and a
+request-rate limit, and writes each language's pack (translation_store.py)
+every --checkpoint results and at the end, so an interrupted run resumes
+where it stopped. Verses already in a pack are skipped unless their English
+text has changed since they were translated.
+
+    python batch_translate.py --languages Hindi Tamil --concurrency 4 --rate 2
+    python batch_translate.py --chapters 2 12 --languages Spanish
+    python batch_translate.py --standin          # against a local stand-in model
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from admission_control import BACKGROUND
+from asset_pipeline import BASE_DIR, VERSES_CSV, content_hash
+from batch_explain import RateLimiter
+from gita_bot import GitaGeminiBot
+from translation_store import (DEFAULT_LANGUAGE, LANGUAGES, TRANSLATION_STORE_DIR, PackEntry, TranslationPack,
+                               TranslationStore, source_crc, write_pack)
+from verse_refs import chapter_number, verse_numbers
+
+# (chapter, verse key, English text)
+Task = Tuple[int, str, str]
+
+
+def existing_entries(store: TranslationStore, language: str) -> Dict[Tuple[int, int], PackEntry]:
+    path = store.path(language)
+    if not path.exists():
+        return {}
+    return {(e[0], e[1]): e for e in TranslationPack(path).entries()}
+
+
+def plan_tasks(bot, done: Dict[Tuple[int, int], PackEntry], chapters=None) -> List[Task]:
+    """Verses missing from a language's pack, or translated from different English text."""
+    tasks = []
+    for chapter_key, chapter_data in bot.verses_db.items():
+        chapter = chapter_number(chapter_key)
+        if chapters and chapter not in chapters:
+            continue
+        for verse, data in chapter_data["verses"].items():
+            entry = done.get((chapter, verse_numbers(verse)[0]))
+            if entry is None or entry[3] != source_crc(data["translation"]):
+                tasks.append((chapter, verse, data["translation"]))
+    return tasks
+
+
+async def run_language(bot, store: TranslationStore, language: str, entries: Dict[Tuple[int, int], PackEntry],
+                       tasks: List[Task], concurrency: int, rate: float, retries: int, checkpoint: int):
+    limiter = RateLimiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = {"done": 0, "failed": 0, "unsaved": 0}
+    source_hash = content_hash((BASE_DIR / VERSES_CSV).read_bytes())
+    started = time.monotonic()
+
+    def save():
+        write_pack(store.path(language), list(entries.values()), source_hash)
+        progress["unsaved"] = 0
+
+    async def translate(chapter, verse, text):
+        async with semaphore:
+            for attempt in range(retries):
+                await limiter.wait()
+                try:
+                    # The model call blocks, so run it off the event loop
+                    translated = await asyncio.to_thread(bot.translate_verse, verse, text, language, BACKGROUND)
+                except Exception as e:
+                    print(f"⚠️  {language} {verse}: {e}")
+                    translated = ""
+                if translated:
+                    first, last = verse_numbers(verse)
+                    entries[(chapter, first)] = (chapter, first, last, source_crc(text), translated)
+                    progress["done"] += 1
+                    progress["unsaved"] += 1
+                    break
+                await asyncio.sleep(2 ** attempt)
+            else:
+                progress["failed"] += 1
+                print(f"❌ {language} {verse} failed after {retries} attempts")
+
+            if progress["unsaved"] >= checkpoint:
+                save()
+            finished = progress["done"] + progress["failed"]
+            if finished % 50 == 0 or finished == len(tasks):
+                elapsed = time.monotonic() - started
+                print(f"   {language}: {finished}/{len(tasks)} done ({progress['failed']} failed, {finished / elapsed:.1f}/s)")
+
+    try:
+        await asyncio.gather(*(translate(*task) for task in tasks))
+    finally:
+        if progress["unsaved"]:
+            save()
+    return progress
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Translate every verse into the local translation store")
+    parser.add_argument("--store", default=TRANSLATION_STORE_DIR, help="directory of language packs")
+    parser.add_argument("--languages", nargs="*", choices=[name for name in LANGUAGES if name != DEFAULT_LANGUAGE],
+                        help="only these languages (default: all)")
+    parser.add_argument("--chapters", type=int, nargs="*", help="only these chapter numbers")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=2.0, help="maximum requests per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3, help="attempts per verse")
+    parser.add_argument("--checkpoint", type=int, default=50, help="rewrite the pack after this many new translations")
+    parser.add_argument("--endpoint", default=os.getenv("GEMINI_API_ENDPOINT"), help="alternative API endpoint")
+    parser.add_argument("--standin", action="store_true", help="start a local stand-in model and use it")
+    args = parser.parse_args()
+
+    if args.standin:
+        import gemini_standin
+        args.endpoint = gemini_standin.start_in_thread().url
+        print(f"🧪 Using local stand-in model at {args.endpoint}")
+
+    bot = GitaGeminiBot(os.getenv("GEMINI_API_KEY", "standin"), api_endpoint=args.endpoint)
+    store = TranslationStore(args.store)
+    languages = args.languages or [name for name in LANGUAGES if name != DEFAULT_LANGUAGE]
+
+    print("🕉️  WisdomWeaver Batch Translations")
+    print("=" * 40)
+    for language in languages:
+        entries = existing_entries(store, language)
+        tasks = plan_tasks(bot, entries, args.chapters)
+        print(f"{language}: {len(entries)} stored, {len(tasks)} to translate "
+              f"(concurrency {args.concurrency}, {args.rate or 'unlimited'} req/s)")
+        if not tasks:
+            continue
+        try:
+            progress = asyncio.run(run_language(bot, store, language, entries, tasks, args.concurrency,
+                                                args.rate, args.retries, args.checkpoint))
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted - rerun the same command to resume")
+            return
+        print(f"✅ {language}: translated {progress['done']}, failed {progress['failed']}, "
+              f"{store.path(language).stat().st_size / 1024:.1f} KB for {len(entries)} verses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+GITA_CSV_PATH = os.path.join(ROOT_DIR, "bhagavad_gita_verses.csv")
+
+
+def load_verses_db():
+    """Build the same chapter -> verses structure as GitaGeminiBot.load_gita_database."""
+    import csv
+
+    verses_db = {}
+    with open(GITA_CSV_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            chapter = f"chapter_{row['chapter_number']}"
+            if chapter not in verses_db:
+                verses_db[chapter] = {"title": row["chapter_title"], "verses": {}, "summary": ""}
+            verses_db[chapter]["verses"][row["chapter_verse"]] = {"translation": row["translation"]}
+    return verses_db
+
+
+@contextmanager
+def count_forward_msg_bytes():
+    """Count serialized ForwardMsg bytes (what the websocket carries) enqueued while active."""
+    from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+
+    counter = {"bytes": 0, "messages": 0}
+    original = ForwardMsgQueue.enqueue
+
+    def enqueue(self, msg):
+        counter["bytes"] += msg.ByteSize()
+        counter["messages"] += 1
+        return original(self, msg)
+
+    ForwardMsgQueue.enqueue = enqueue
+    try:
+        yield counter
+    finally:
+        ForwardMsgQueue.enqueue = original
+
+
+def timed(fn, repeat=5):
+    """Run fn repeat times and return (best, mean) wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples), sum(samples) / len(samples)
@@ -0,0 +1,122 @@
+"""
+Burst handling against a throttling upstream.
+
+The local stand-in model answers in 400 ms and returns 429 (Retry-After 1s)
+above 6 concurrent requests. 40 interactive questions and 20 background
+warmer questions arrive at once.
+
+Before: every caller calls the model straight away, retrying 3 times with a
+fixed 1 s sleep. After: calls go through admission_control (token bucket,
+priority queue, AIMD concurrency, Retry-After backoff) and are shed to a
+local answer when they cannot be admitted in time (shown with a 10 s
+and a 1.5 s admission deadline).
+
+    python benchmarks/bench_admission_control.py
+"""
+
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+import urllib.request
+
+from _common import ROOT_DIR  # noqa: F401
+
+import admission_control
+import gemini_standin
+from admission_control import BACKGROUND, INTERACTIVE, AdmissionController
+
+INTERACTIVE_CALLERS = 40
+BACKGROUND_CALLERS = 20
+LATENCY_MS = 400
+UPSTREAM_CONCURRENCY = 6
+
+
+def upstream_stats(server):
+    with urllib.request.urlopen(f"{server.url}/stats") as response:
+        return json.load(response)
+
+
+def previous_call(bot, question):
+    """The old get_response model call: 3 attempts, 1 s apart, no admission."""
+    for attempt in range(3):
+        try:
+            response = bot.model.generate_content(question)
+            if response.text:
+                return {"source": "model"}
+        except Exception:
+            if attempt == 2:
+                return {"error": True}
+            time.sleep(1)
+    return {"error": True}
+
+
+def current_call(bot, question, priority, session_id):
+    answer = asyncio.run(bot.get_response(question, None, None, None, None, priority, session_id))
+    if answer.get("error"):
+        return {"error": True}
+    return {"source": answer.get("source", "model")}
+
+
+def burst(call):
+    barrier = threading.Barrier(INTERACTIVE_CALLERS + BACKGROUND_CALLERS)
+    results = []
+    lock = threading.Lock()
+
+    def caller(i, priority):
+        question = f"Question {i}: how should I act when facing challenge number {i}?"
+        barrier.wait()
+        started = time.perf_counter()
+        outcome = call(question, priority, f"session-{i}")
+        with lock:
+            results.append((priority, time.perf_counter() - started, outcome))
+
+    threads = [threading.Thread(target=caller, args=(i, INTERACTIVE)) for i in range(INTERACTIVE_CALLERS)]
+    threads += [threading.Thread(target=caller, args=(i, BACKGROUND)) for i in range(INTERACTIVE_CALLERS, INTERACTIVE_CALLERS + BACKGROUND_CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(label, results, upstream):
+    print(f"{label}: upstream requests {upstream['requests']}, 429s {upstream['throttled']}, peak in flight {upstream['peak_in_flight']}")
+    for priority, name in ((INTERACTIVE, "interactive"), (BACKGROUND, "background")):
+        rows = [r for r in results if r[0] == priority]
+        latencies = sorted(r[1] for r in rows)
+        sources = [r[2].get("source", "error") for r in rows]
+        print(
+            f"  {name:<11} model {sources.count('model'):>2}, local {sources.count('local'):>2}, failed {sources.count('error'):>2}"
+            f"  p50 {statistics.median(latencies):5.2f}s  p95 {latencies[int(len(latencies) * 0.95) - 1]:5.2f}s"
+        )
+
+
+def main():
+    logging.disable(logging.WARNING)
+    from gita_bot import GitaGeminiBot
+
+    server = gemini_standin.start_in_thread(latency_ms=LATENCY_MS, max_concurrent=UPSTREAM_CONCURRENCY, retry_after_sec=1)
+    bot = GitaGeminiBot("standin", api_endpoint=server.url)
+    results = burst(lambda question, priority, session_id: previous_call(bot, question))
+    report("before", results, upstream_stats(server))
+
+    server = gemini_standin.start_in_thread(latency_ms=LATENCY_MS, max_concurrent=UPSTREAM_CONCURRENCY, retry_after_sec=1)
+    bot = GitaGeminiBot("standin", api_endpoint=server.url)
+    admission_control._controller = AdmissionController(max_wait=10)
+    results = burst(lambda question, priority, session_id: current_call(bot, question, priority, session_id))
+    report("after", results, upstream_stats(server))
+    print("  controller:", admission_control.get_admission_controller().stats())
+
+    # A tight admission deadline sheds the overflow to local answers instead of queueing
+    server = gemini_standin.start_in_thread(latency_ms=LATENCY_MS, max_concurrent=UPSTREAM_CONCURRENCY, retry_after_sec=1)
+    bot = GitaGeminiBot("standin", api_endpoint=server.url)
+    admission_control._controller = AdmissionController(max_wait=1.5)
+    results = burst(lambda question, priority, session_id: current_call(bot, question, priority, session_id))
+    report("after, 1.5 s admission deadline", results, upstream_stats(server))
+
+
+if __name__ == "__main__":
+    main()
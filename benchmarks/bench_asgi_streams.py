@@ -0,0 +1,174 @@
+"""
+Load test for streamed answers on the ASGI server: concurrent open streams and memory per connection.
+
+Starts the Gemini stand-in and `uvicorn asgi_server:app` (one worker) as
+subprocesses, then:
+
+1. holds N /api/ask streams open at once (each has received its `accepted`
+   event and is queued for a bot slot) and reads the server's RSS, for
+   increasing N; the streams are then dropped, which must free them without
+   calling the model;
+2. opens more streams than ASGI_MAX_STREAMS and counts the 503s;
+3. runs a batch of streams to completion and reports time to the first
+   event and to the full answer.
+
+    python benchmarks/bench_asgi_streams.py [--levels 250,1000,2000] [--complete 400] [--latency fixed:200]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import quote
+
+from _common import ROOT_DIR
+
+QUESTION = "/api/ask?q=" + quote("How do I find peace when everything is uncertain?") + "&theme=" + quote("Inner Peace")
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+
+def get_json(base: str, path: str):
+    with urllib.request.urlopen(base + path, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def wait_ready(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def open_stream(port: int, path: str = QUESTION):
+    """Open an /api/ask stream and read up to its `accepted` event; returns (status, reader, writer, seconds)."""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    if status == 200:
+        await reader.readuntil(b"event: accepted\n")
+    return status, reader, writer, time.perf_counter() - started
+
+
+async def read_to_done(reader) -> float:
+    started = time.perf_counter()
+    await reader.readuntil(b"event: done\n")
+    return time.perf_counter() - started
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def hold(port: int, pid: int, base: str, count: int, baseline_kb: int):
+    results = await asyncio.gather(*(open_stream(port) for _ in range(count)))
+    await asyncio.sleep(0.5)
+    held_kb = rss_kb(pid)
+    stats = get_json(base, "/api/ask/stats")
+    accepted = sum(1 for status, *_ in results if status == 200)
+    for _, _, writer, _ in results:
+        writer.close()
+    deadline = time.monotonic() + 30
+    while get_json(base, "/api/ask/stats")["open"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+    print(f"{count:>8}{accepted:>10}{stats['open']:>8}{stats['waiting']:>9}{held_kb / 1024:>10.1f}"
+          f"{(held_kb - baseline_kb) / count:>12.1f}{percentile([r[3] for r in results], 99) * 1000:>12.0f}"
+          f"   open after drop: {get_json(base, '/api/ask/stats')['open']}")
+
+
+async def over_limit(port: int, base: str, max_streams: int, extra: int):
+    results = await asyncio.gather(*(open_stream(port) for _ in range(max_streams + extra)))
+    statuses = [status for status, *_ in results]
+    print(f"\n{max_streams + extra} streams against ASGI_MAX_STREAMS={max_streams}: "
+          f"{statuses.count(200)} accepted, {statuses.count(503)} got 503 + Retry-After")
+    for _, _, writer, _ in results:
+        writer.close()
+    while get_json(base, "/api/ask/stats")["open"]:
+        await asyncio.sleep(0.2)
+
+
+async def complete(port: int, count: int):
+    started = time.perf_counter()
+
+    async def one():
+        status, reader, writer, first = await open_stream(port)
+        try:
+            return first, first + await read_to_done(reader)
+        finally:
+            writer.close()
+
+    results = await asyncio.gather(*(one() for _ in range(count)))
+    elapsed = time.perf_counter() - started
+    first = [r[0] * 1000 for r in results]
+    done = [r[1] * 1000 for r in results]
+    print(f"\n{count} streams to completion in {elapsed:.1f} s ({count / elapsed:.0f} answers/s)")
+    print(f"  first event  p50 {statistics.median(first):6.0f} ms   p99 {percentile(first, 99):6.0f} ms")
+    print(f"  full answer  p50 {statistics.median(done):6.0f} ms   p99 {percentile(done, 99):6.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", default="250,1000,2000")
+    parser.add_argument("--max-streams", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--complete", type=int, default=400)
+    parser.add_argument("--latency", default="fixed:200", help="stand-in model latency")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.levels.split(",")]
+
+    standin_port, server_port = 8791, 8792
+    base = f"http://127.0.0.1:{server_port}"
+    env = {
+        **os.environ,
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{standin_port}",
+        "GEMINI_API_KEY": "standin",
+        "ASGI_MAX_STREAMS": str(args.max_streams),
+        "ASGI_ASK_CONCURRENCY": str(args.concurrency),
+        "UPSTREAM_RATE": "1000",
+        "UPSTREAM_BURST": "100",
+        "UPSTREAM_MAX_CONCURRENCY": str(args.concurrency),
+    }
+    processes = [
+        subprocess.Popen([sys.executable, "gemini_standin.py", "--port", str(standin_port), "--latency", args.latency],
+                         cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "asgi_server:app", "--port", str(server_port),
+                          "--log-level", "warning", "--backlog", "4096"],
+                         cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    server_pid = processes[1].pid
+    try:
+        wait_ready(base + "/api/chapters")
+        # Load the bot before measuring
+        asyncio.run(complete(server_port, 1))
+        baseline_kb = rss_kb(server_pid)
+        print(f"\nserver RSS after warm-up {baseline_kb / 1024:.1f} MB; "
+              f"{args.concurrency} bot slots, stand-in latency {args.latency}")
+        print(f"{'streams':>8}{'accepted':>10}{'open':>8}{'waiting':>9}{'RSS MB':>10}{'KB / conn':>12}{'p99 accept':>12}")
+        for count in levels:
+            asyncio.run(hold(server_port, server_pid, base, count, baseline_kb))
+        asyncio.run(over_limit(server_port, base, args.max_streams, 100))
+        asyncio.run(complete(server_port, args.complete))
+        print(f"\nserver RSS at the end {rss_kb(server_pid) / 1024:.1f} MB")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
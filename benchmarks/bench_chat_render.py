@@ -0,0 +1,106 @@
+"""
+Rerun latency of the chat transcript versus conversation length.
+
+Before: every message of st.session_state.messages redrawn with several
+st.markdown calls per rerun. After: chat_view keeps a bounded window, draws
+the recent messages from cached markdown and leaves the rest in the
+collapsed archive.
+
+    python benchmarks/bench_chat_render.py
+"""
+
+from _common import count_forward_msg_bytes, timed
+
+from streamlit.testing.v1 import AppTest
+
+TURNS = (10, 100, 1000)
+
+
+def sample_turn(i):
+    return (
+        {"role": "user", "content": f"Question {i}: how do I stay calm when work goes wrong?"},
+        {
+            "role": "assistant",
+            "verse_reference": "Chapter 2, Verse 47",
+            "sanskrit": "karmaṇy-evādhikāras te mā phaleṣhu kadāchana",
+            "translation": "You have a right to perform your prescribed duties, but you are not entitled to the fruits of your actions.",
+            "explanation": "Krishna teaches Arjuna to act without attachment to results. " * 6,
+            "application": "Focus on the quality of your effort and let go of outcomes you cannot control. " * 4,
+            "keywords": ["karma", "duty", "detachment", "action"],
+            "theme": "Work & Career",
+            "mood": "Seeking Peace",
+            "emotional_state": "Neutral",
+        },
+    )
+
+
+def previous_transcript():
+    import streamlit as st
+
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            if message["role"] == "user":
+                st.markdown(message["content"])
+            else:
+                if message.get("verse_reference"):
+                    st.markdown(f"**📖 {message['verse_reference']}**")
+                if message.get('sanskrit'):
+                    st.markdown(f"*Sanskrit:* {message['sanskrit']}")
+                if message.get('translation'):
+                    st.markdown(f"**Translation:** {message['translation']}")
+                if message.get('explanation'):
+                    st.markdown("### 🧠 Understanding")
+                    st.markdown(message["explanation"])
+                if message.get('application'):
+                    st.markdown("### 🌟 Modern Application")
+                    st.markdown(message["application"])
+                if message.get('keywords'):
+                    st.markdown("**Key Concepts:** " + " • ".join([f"`{kw}`" for kw in message['keywords']]))
+                context_parts = [message[k] for k in ('theme', 'mood', 'emotional_state') if message.get(k)]
+                if context_parts:
+                    st.markdown("**Response Context:** " + " • ".join(context_parts))
+
+
+def incremental_transcript():
+    from chat_view import render_chat_history
+
+    render_chat_history()
+
+
+def run(script, turns, bounded):
+    at = AppTest.from_function(script)
+    at.session_state["messages"] = []
+    if bounded:
+        # Route through append_message so the window and archive are bounded
+        from collections import deque
+        import chat_view
+
+        at.session_state["message_archive"] = deque(maxlen=chat_view.ARCHIVE_LIMIT)
+        at.session_state["question_count"] = 0
+        messages, archive = [], at.session_state["message_archive"]
+        for i in range(turns):
+            messages.extend(sample_turn(i))
+            overflow = len(messages) - chat_view.MAX_ACTIVE_MESSAGES
+            if overflow > 0:
+                archive.extend(messages[:overflow])
+                del messages[:overflow]
+        at.session_state["messages"] = messages
+    else:
+        at.session_state["messages"] = [m for i in range(turns) for m in sample_turn(i)]
+    at.run(timeout=120)
+
+    with count_forward_msg_bytes() as counter:
+        best, mean = timed(lambda: at.run(timeout=120), repeat=3)
+    return best, mean, counter["bytes"] / 3
+
+
+def main():
+    print(f"{'turns':>6} {'before ms':>10} {'after ms':>10} {'before KiB':>11} {'after KiB':>10}")
+    for turns in TURNS:
+        before = run(previous_transcript, turns, bounded=False)
+        after = run(incremental_transcript, turns, bounded=True)
+        print(f"{turns:>6} {before[1]:>10.1f} {after[1]:>10.1f} {before[2] / 1024:>11.1f} {after[2] / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Per-rerun CPU time and bytes shipped for the header image.
+
+Before: main() opened the JPEG with PIL, upsampled it to 1800 px and passed
+the PIL image to st.image, which re-encodes it (capped at 1460 px) on every
+rerun. After: the pre-built derivative is either referenced by URL
+(static serving) or passed to st.image as cached JPEG bytes.
+
+    python asset_pipeline.py && python benchmarks/bench_header_image.py
+"""
+
+import time
+
+from _common import ROOT_DIR
+
+from PIL import Image
+from streamlit.elements.lib import image_utils
+
+import asset_pipeline
+
+IMAGE_PATH = f"{ROOT_DIR}/{asset_pipeline.HEADER_IMAGE}"
+RUNS = 20
+
+
+def previous_rerun() -> int:
+    image = Image.open(IMAGE_PATH)
+    max_width = 1800
+    aspect_ratio = image.height / image.width
+    resized_image = image.resize((max_width, int(max_width * aspect_ratio)))
+    # What st.image(resized_image, use_container_width=True) does before shipping
+    image_format = image_utils._validate_image_format_string(resized_image, "auto")
+    data = image_utils._pil_to_bytes(resized_image, image_format)
+    data = image_utils._ensure_image_size_and_format(data, -2, image_format)
+    return len(data)
+
+
+def static_serving_rerun() -> int:
+    asset_pipeline.picture_html('header', 'app/static/build/images', "Bhagavad Gita")
+    # Hashed URLs are immutable: the browser fetches one derivative once, then nothing
+    return 0
+
+
+_cached = {}
+
+
+def st_image_rerun() -> int:
+    derivative = asset_pipeline.pick_derivative('header', 640, 'jpeg')
+    path = str(asset_pipeline.derivative_path(derivative))
+    if path not in _cached:
+        with open(path, 'rb') as f:
+            _cached[path] = f.read()
+    data = _cached[path]
+    image_format = image_utils._validate_image_format_string(data, "auto")
+    data = image_utils._ensure_image_size_and_format(data, -2, image_format)
+    return len(data)
+
+
+def measure(label, fn):
+    fn()
+    cpu_started = time.process_time()
+    total = 0
+    for _ in range(RUNS):
+        total += fn()
+    cpu_ms = (time.process_time() - cpu_started) * 1000 / RUNS
+    print(f"{label:<40} cpu {cpu_ms:8.2f} ms/rerun   payload {total / RUNS / 1024:7.1f} KB/rerun")
+
+
+def main():
+    if not asset_pipeline.image_derivatives('header'):
+        raise SystemExit("Run `python asset_pipeline.py` first")
+    first_load = asset_pipeline.pick_derivative('header', 640, 'webp')['bytes']
+    measure("before (PIL resize to 1800 px)", previous_rerun)
+    measure("after, st.image with 640 px JPEG", st_image_rerun)
+    measure("after, <picture> via static serving", static_serving_rerun)
+    print(f"\nstatic serving first load: {first_load / 1024:.1f} KB (640 px WebP), cached afterwards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Full-text search latency over a user's stored history at 100, 1,000 and 10,000 messages.
+
+Each history is written through SessionStore.append (so the FTS5 index is
+maintained by the background writer exactly as in the app), next to the
+same volume of messages from other users. Answers are built from verse
+translations so word frequencies look like real answers. Every query runs
+through SessionStore.search (ranked, limit 10, with snippets) and is
+compared with decoding and substring-matching every stored payload.
+
+    python benchmarks/bench_history_search.py
+"""
+
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _common import ROOT_DIR, load_verses_db  # noqa: F401
+
+from session_store import SessionStore, search_expression
+
+HISTORY_SIZES = (100, 1_000, 10_000)
+OTHER_USERS = 4
+QUERIES = {
+    "common word": "duty",
+    "rare word": "conch",
+    "two words": "mind peace",
+    "prefix": "detach*",
+    "short prefix": "de*",
+    "phrase": '"fruits of action"',
+    "no match": "smartphone",
+}
+REPEAT = 30
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+
+
+def turns(translations, count, seed):
+    rng = random.Random(seed)
+    for i in range(count // 2):
+        verse = rng.randrange(len(translations))
+        yield {"role": "user", "content": f"How can I live this teaching: {translations[verse][:80]}?"}
+        yield {
+            "role": "assistant",
+            "verse_reference": f"Chapter {rng.randint(1, 18)}, Verse {rng.randint(1, 40)}",
+            "translation": translations[verse],
+            "explanation": " ".join(rng.choice(translations) for _ in range(2)),
+            "application": "Focus on the quality of your effort and let go of the fruits of action.",
+            "keywords": [],
+        }
+
+
+def measure(fn):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)], result
+
+
+def main():
+    verses_db = load_verses_db()
+    translations = [data["translation"] for chapter in verses_db.values() for data in chapter["verses"].values()]
+
+    for size in HISTORY_SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sessions.db")
+            store = SessionStore(path)
+            started = time.perf_counter()
+            for user in range(OTHER_USERS + 1):
+                for message in turns(translations, size, seed=user):
+                    store.append(f"user{user}", "s", message)
+            store.flush()
+            append_ms = (time.perf_counter() - started) * 1000 / (size * (OTHER_USERS + 1))
+            conn = store._connect()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            db_kb = os.path.getsize(path) / 1024
+            rss_before = rss_mb()
+
+            print(f"\n{size} messages for the searched user ({size * (OTHER_USERS + 1)} stored), "
+                  f"{append_ms:.3f} ms per append including indexing, database {db_kb / 1024:.1f} MB")
+            print(f"{'query':<14}{'hits':>6}{'p50 ms':>9}{'p95 ms':>9}")
+            for name, query in QUERIES.items():
+                p50, p95, _ = measure(lambda: store.search("user0", query))
+                hits = conn.execute(
+                    "SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?",
+                    (f'user_id : "user0" AND text : ({search_expression(query)})',)
+                ).fetchone()[0]
+                print(f"{name:<14}{hits:>6}{p50:>9.2f}{p95:>9.2f}")
+
+            def scan():
+                rows = conn.execute("SELECT payload FROM messages WHERE user_id = ?", ("user0",)).fetchall()
+                return [payload for payload, in rows if "duty" in json.dumps(json.loads(payload)).lower()][:10]
+
+            scan_ms, _, _ = measure(scan)
+            print(f"decoding and scanning every payload instead: {scan_ms:.1f} ms")
+            print(f"RSS change while searching: {rss_mb() - rss_before:+.1f} MB")
+            example = store.search("user0", '"fruits of action"', 1)
+            if example:
+                print(f"snippet: {example[0][1]}")
+
+
+if __name__ == "__main__":
+    main()
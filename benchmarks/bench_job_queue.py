@@ -0,0 +1,70 @@
+"""
+UI responsiveness while a question is in flight.
+
+Before: main() ran asyncio.run(bot.get_response(...)) under st.spinner, so
+the script thread (and every other interaction in the session) waited for
+the full model latency. After: the question is submitted to job_queue and
+the script thread is free again immediately.
+
+    python benchmarks/bench_job_queue.py
+"""
+
+import asyncio
+import time
+
+from _common import ROOT_DIR  # noqa: F401  (puts the repo on sys.path)
+
+from job_queue import JobQueue, QueueLimitError
+
+MODEL_LATENCY_SEC = 2.0
+
+
+class SlowBot:
+    async def get_response(self, question, theme=None, mood=None, emotional_state=None):
+        # generate_content is a blocking call inside the coroutine
+        time.sleep(MODEL_LATENCY_SEC)
+        return {"verse_reference": "Chapter 2, Verse 47", "translation": question}
+
+
+def main():
+    bot = SlowBot()
+
+    started = time.perf_counter()
+    asyncio.run(bot.get_response("How do I find peace?"))
+    blocking = time.perf_counter() - started
+    print(f"before: time to next interaction      {blocking * 1000:9.1f} ms")
+
+    jobs = JobQueue(max_workers=8, session_limit=2)
+    started = time.perf_counter()
+    job_id = jobs.submit("session-1", bot.get_response, "How do I find peace?")
+    submitted = time.perf_counter() - started
+    print(f"after:  time to next interaction      {submitted * 1000:9.3f} ms")
+
+    # Polling cost paid by the 1 s status fragment
+    started = time.perf_counter()
+    for _ in range(10000):
+        jobs.get(job_id).finished
+    print(f"after:  status poll                   {(time.perf_counter() - started) / 10000 * 1e6:9.2f} µs")
+
+    jobs.submit("session-1", bot.get_response, "second")
+    try:
+        jobs.submit("session-1", bot.get_response, "third")
+    except QueueLimitError as e:
+        print(f"after:  per-session limit             rejected third question ({e})")
+
+    while not jobs.get(job_id).finished:
+        time.sleep(0.05)
+    job = jobs.get(job_id)
+    print(f"after:  answer ready after            {(job.finished_at - job.submitted_at) * 1000:9.1f} ms ({job.status})")
+
+    # Many sessions share the pool without waiting on each other's questions
+    sessions = 8
+    started = time.perf_counter()
+    ids = [jobs.submit(f"load-{i}", bot.get_response, "q") for i in range(sessions)]
+    while not all(jobs.get(i).finished for i in ids):
+        time.sleep(0.05)
+    print(f"after:  {sessions} concurrent sessions answered in {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
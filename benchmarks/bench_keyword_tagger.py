@@ -0,0 +1,114 @@
+"""
+Keyword tagging throughput on long responses, and concept filtering over chat history.
+
+Responses are built from consecutive verse translations padded to each size
+and tagged with the old extractor (19 substring checks on the lowercased
+text) and with keyword_tagger's automaton. The old extractor's tags that
+were only substrings of other words ("love" in "glove", "action" in
+"inaction") are counted over every verse. Then a session store is filled
+with tagged messages and "messages about X" is timed through the keyword
+index against decoding every stored payload.
+
+    python benchmarks/bench_keyword_tagger.py
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+
+from _common import ROOT_DIR, load_verses_db, timed  # noqa: F401
+
+from keyword_tagger import KeywordTagger, get_verse_concepts, lemmas
+from session_store import SessionStore
+
+OLD_KEYWORDS = [
+    'dharma', 'karma', 'moksha', 'yoga', 'devotion', 'meditation', 'duty',
+    'righteousness', 'soul', 'divine', 'surrender', 'detachment', 'wisdom',
+    'knowledge', 'action', 'service', 'love', 'peace', 'truth'
+]
+SIZES = (1_000, 4_000, 16_000, 64_000, 256_000)
+HISTORY_SIZES = (1_000, 10_000)
+REPEAT = 10
+
+
+def old_extract(text):
+    text_lower = text.lower()
+    return [keyword for keyword in OLD_KEYWORDS if keyword in text_lower][:5]
+
+
+def main():
+    verses_db = load_verses_db()
+    translations = [data["translation"] for chapter in verses_db.values() for data in chapter["verses"].values()]
+    corpus = " ".join(translations)
+
+    started = time.perf_counter()
+    tagger = KeywordTagger()
+    print(f"automaton: {len(tagger.weights)} concepts, {tagger.states} states, "
+          f"compiled in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"\n{'chars':>9}{'words':>8}{'old µs':>10}{'new µs':>10}{'new MB/s':>10}{'new µs/word':>13}   new tags")
+    for size in SIZES:
+        text = (corpus * (size // len(corpus) + 1))[:size]
+        words = len(lemmas(text))
+        old, _ = timed(lambda: old_extract(text), REPEAT)
+        new, _ = timed(lambda: tagger.tag(text), REPEAT)
+        print(f"{size:>9}{words:>8}{old * 1000:>10.0f}{new * 1000:>10.0f}{size / new / 1000:>10.1f}"
+              f"{new * 1000 / words:>13.2f}   {', '.join(tagger.tag(text))}")
+
+    # Old tags that only matched inside another word
+    whole_word = {kw: re.compile(rf"\b{kw}") for kw in OLD_KEYWORDS}
+    partial = {}
+    for translation in translations:
+        lowered = translation.lower()
+        for keyword in OLD_KEYWORDS:
+            if keyword in lowered and not whole_word[keyword].search(lowered):
+                words = re.findall(rf"\w*{keyword}\w*", lowered)
+                partial.setdefault(keyword, set()).update(words)
+    print(f"\nold extractor, substring-only matches across {len(translations)} verses:")
+    for keyword, words in sorted(partial.items()):
+        print(f"  {keyword:<10} in {', '.join(sorted(words)[:6])}")
+
+    started = time.perf_counter()
+    concepts = get_verse_concepts(verses_db)
+    print(f"\nverse concept index: {len(concepts.postings)} concepts over {len(concepts.by_verse)} verses, "
+          f"built in {(time.perf_counter() - started) * 1000:.0f} ms")
+    lookup, _ = timed(lambda: [concepts.verses(c, 5) for c in concepts.postings], REPEAT)
+    print(f"  verses for a concept: {lookup * 1000 / len(concepts.postings):.2f} µs")
+
+    print(f"\n{'messages':>9}{'append ms':>11}{'counts ms':>11}{'filter ms':>11}{'full scan ms':>14}")
+    for count in HISTORY_SIZES:
+        with tempfile.TemporaryDirectory() as directory:
+            store = SessionStore(os.path.join(directory, "sessions.db"))
+            started = time.perf_counter()
+            for i in range(count // 2):
+                translation = translations[i % len(translations)]
+                store.append("bench", "s", {"role": "user", "content": f"What does verse {i} teach about {translation[:60]}?"})
+                store.append("bench", "s", {"role": "assistant", "verse_reference": f"Chapter 2, Verse {i}",
+                                            "translation": translation, "explanation": "", "application": "",
+                                            "keywords": tagger.tag(translation)})
+            store.flush()
+            append = (time.perf_counter() - started) * 1000
+            counts, _ = timed(lambda: store.keyword_counts("bench"), REPEAT)
+            keyword = "equanimity"
+            indexed, _ = timed(lambda: store.with_keyword("bench", keyword, 10), REPEAT)
+
+            def full_scan():
+                rows = store._connect().execute(
+                    "SELECT payload FROM messages WHERE user_id = ? ORDER BY created_at DESC", ("bench",)).fetchall()
+                found = []
+                for payload, in rows:
+                    message = json.loads(payload)
+                    if keyword in (message.get("keywords") or tagger.tag(message.get("content", ""))):
+                        found.append(message)
+                        if len(found) == 10:
+                            break
+                return found
+
+            scan, _ = timed(full_scan, 3)
+            print(f"{count:>9}{append:>11.0f}{counts:>11.2f}{indexed:>11.2f}{scan:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cost of the metrics instrumentation.
+
+Times the recording primitives on their own, then one answer through
+get_response against a zero-latency local stand-in model with metrics on
+and with the primitives replaced by no-ops, so the difference is the
+instrumentation overhead on the request path. Finally renders /metrics for
+the recorded series.
+
+    python benchmarks/bench_metrics.py
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+from _common import ROOT_DIR, timed  # noqa: F401
+
+import gemini_standin
+import metrics
+
+N = 200_000
+ANSWERS = 300
+QUESTION = "How do I stay calm when my work is criticised?"
+
+
+def per_call_ns(fn, n=N) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n * 1e9
+
+
+def timer_once():
+    with metrics.timer("bench_timer_seconds"):
+        pass
+
+
+def ms_per_answer(bot) -> float:
+    async def run():
+        for _ in range(ANSWERS):
+            await bot.get_response(QUESTION, "Inner Peace", "Seeking Peace", "Neutral")
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return (time.perf_counter() - started) / ANSWERS * 1e3
+
+
+@contextmanager
+def noop_timer(name, **labels):
+    yield
+
+
+def main():
+    logging.disable(logging.WARNING)
+    print(f"inc                 {per_call_ns(lambda: metrics.inc('bench_total')):7.0f} ns")
+    print(f"inc with labels     {per_call_ns(lambda: metrics.inc('bench_total', source='model')):7.0f} ns")
+    print(f"observe             {per_call_ns(lambda: metrics.observe('bench_seconds', 0.042)):7.0f} ns")
+    print(f"timer               {per_call_ns(timer_once):7.0f} ns")
+
+    server = gemini_standin.start_in_thread(latency_ms=0)
+    from gita_bot import GitaGeminiBot
+    bot = GitaGeminiBot("standin", api_endpoint=server.url)
+    ms_per_answer(bot)    # warm up the client and connection
+
+    instrumented = min(ms_per_answer(bot) for _ in range(3))
+    real = metrics.inc, metrics.observe, metrics.timer
+    metrics.inc, metrics.observe, metrics.timer = (lambda *a, **k: None), (lambda *a, **k: None), noop_timer
+    try:
+        bare = min(ms_per_answer(bot) for _ in range(3))
+    finally:
+        metrics.inc, metrics.observe, metrics.timer = real
+    print(f"\nget_response (0 ms model)  {bare:.3f} ms bare, {instrumented:.3f} ms instrumented "
+          f"({(instrumented - bare) / bare * 100:+.1f}%)")
+
+    snapshots = metrics.collect()
+    best, mean = timed(lambda: metrics.render_prometheus(snapshots), repeat=50)
+    text = metrics.render_prometheus(snapshots)
+    print(f"render /metrics     {best:.3f} ms best, {mean:.3f} ms mean, {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Throughput of fully local answers (offline_answer) versus a model round trip.
+
+Indexes the verse collection once, then answers a mix of questions with
+varying theme, mood and emotional state on one CPU core.
+
+    python benchmarks/bench_offline_answer.py
+"""
+
+import itertools
+import time
+
+from _common import load_verses_db, timed
+
+from offline_answer import OfflineAnswerEngine
+
+QUESTIONS = [
+    "How do I stay calm when my work is criticised?",
+    "I am afraid of failing my exams, what should I do?",
+    "How can I control my anger towards my family?",
+    "What is the nature of the soul?",
+    "How do I find peace of mind when everything is uncertain?",
+    "Should I give up my job to pursue meditation?",
+    "How do I deal with grief after losing someone?",
+    "What does it mean to act without attachment to results?",
+]
+THEMES = ["Inner Peace", "Work & Career", "Relationships", "Spiritual Growth"]
+EMOTIONS = ["Neutral", "Sad", "Angry", "Fear"]
+ANSWERS = 20000
+
+
+def main():
+    verses_db = load_verses_db()
+    build_ms, _ = timed(lambda: OfflineAnswerEngine(verses_db), repeat=3)
+    engine = OfflineAnswerEngine(verses_db)
+    print(f"index {len(engine.verses)} verses, {len(engine.postings)} terms, built in {build_ms:.0f} ms")
+
+    for question, theme, emotion in zip(QUESTIONS, itertools.cycle(THEMES), itertools.cycle(EMOTIONS)):
+        answer = engine.answer(question, theme, "Seeking Wisdom", emotion)
+        print(f"  {question[:55]:<55} -> {answer['verse_reference']:<22} {answer['translation'][:60]}…")
+
+    cases = itertools.cycle(itertools.product(QUESTIONS, THEMES, EMOTIONS))
+    started = time.perf_counter()
+    for _ in range(ANSWERS):
+        question, theme, emotion = next(cases)
+        engine.answer(question, theme, "Seeking Wisdom", emotion)
+    elapsed = time.perf_counter() - started
+    print(f"{ANSWERS / elapsed:,.0f} answers/sec ({elapsed / ANSWERS * 1000:.3f} ms per answer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Bytes a returning client re-downloads after a single-icon change.
+
+Builds the precache manifest for a copy of the precached files, changes one
+pixel of icon-192.png and rebuilds. With the old versioned cache, bumping
+CACHE_NAME made every client re-fetch the whole list; with per-entry
+revisions the service worker only fetches entries whose hash changed (plus
+the new sw.js itself).
+
+    python benchmarks/bench_precache.py
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+from _common import ROOT_DIR  # noqa: F401
+
+import setup_pwa
+
+CHANGED_ICON = 'static/icon-192.png'
+
+
+def change_one_pixel(path: Path):
+    from PIL import Image
+    image = Image.open(path)
+    pixel = image.getpixel((0, 0))
+    image.putpixel((0, 0), tuple((channel + 1) % 256 for channel in pixel) if isinstance(pixel, tuple) else (pixel + 1) % 256)
+    image.save(path)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        base = Path(directory)
+        for relative_path in [*setup_pwa.PRECACHE_FILES.values(), 'sw.js']:
+            source = setup_pwa.BASE_DIR / relative_path
+            if source.exists():
+                (base / relative_path).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(source, base / relative_path)
+        assets = base / 'static' / 'build' / 'assets'
+        template = base / 'sw.js'
+        service_worker = base / 'static' / 'build' / 'sw.js'
+
+        before = setup_pwa.build_precache(base, assets)
+        setup_pwa.write_service_worker(before, template, service_worker)
+        sw_before = service_worker.stat().st_size
+
+        change_one_pixel(base / CHANGED_ICON)
+        after = setup_pwa.build_precache(base, assets)
+        setup_pwa.write_service_worker(after, template, service_worker)
+        sw_after = service_worker.stat().st_size
+
+        revisions = {e['url']: e['revision'] for e in before['entries']}
+        changed = [e for e in after['entries'] if revisions.get(e['url']) != e['revision']]
+        everything = sum(e['bytes'] for e in after['entries'])
+        print(f"{len(after['entries'])} precache entries, {everything} B; changed: {', '.join(e['url'] for e in changed)}")
+        print(f"versioned cache (CACHE_NAME bump): {everything + sw_after:>8} B  ({len(after['entries'])} requests + sw.js)")
+        print(f"per-entry revisions:               {sum(e['bytes'] for e in changed) + sw_after:>8} B  "
+              f"({len(changed)} request + sw.js, {sw_after} B; was {sw_before} B)")
+
+
+if __name__ == '__main__':
+    main()
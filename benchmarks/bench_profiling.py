@@ -0,0 +1,74 @@
+"""
+Overhead of the sampling profiler.
+
+Runs a CPU-bound stand-in for a rerun (offline answers for a batch of
+questions, ~100 ms) bare, inside an unsampled profile() section and inside a
+sampled one, and prints the hottest functions of the sampled runs.
+
+    python benchmarks/bench_profiling.py
+"""
+
+import logging
+import os
+import tempfile
+from collections import Counter
+
+from _common import ROOT_DIR, load_verses_db, timed  # noqa: F401
+
+import profiling
+from offline_answer import OfflineAnswerEngine
+
+QUESTIONS = [
+    "How do I stay calm when my work is criticised?",
+    "What is the nature of the soul?",
+    "How can I control my anger towards my family?",
+    "How do I deal with grief after losing someone?",
+]
+REPEAT = 20
+
+
+def main():
+    logging.disable(logging.INFO)
+    engine = OfflineAnswerEngine(load_verses_db())
+
+    def workload():
+        for i in range(300):
+            engine.answer(QUESTIONS[i % len(QUESTIONS)], "Inner Peace", "Seeking Peace", "Sad")
+
+    def unsampled():
+        with profiling.profile("bench", rate=0):
+            workload()
+
+    def sampled():
+        with profiling.profile("bench", force=True):
+            workload()
+
+    with tempfile.TemporaryDirectory() as directory:
+        profiling.PROFILE_DIR = directory
+        write_profile = profiling.write_profile
+        profiling.write_profile = lambda section, elapsed: write_profile(section, elapsed, directory)
+        workload()
+
+        bare, _ = timed(workload, REPEAT)
+        off, _ = timed(unsampled, REPEAT)
+        on, _ = timed(sampled, REPEAT)
+        print(f"interval {profiling.PROFILE_INTERVAL_MS:g} ms, best of {REPEAT}")
+        print(f"bare                 {bare:7.1f} ms")
+        print(f"profile, not sampled {off:7.1f} ms ({(off - bare) / bare * 100:+.1f}%)")
+        print(f"profile, sampled     {on:7.1f} ms ({(on - bare) / bare * 100:+.1f}%)")
+
+        paths = profiling.profile_files(directory)
+        samples, own = 0, Counter()
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    stack, _, n = line.rpartition(" ")
+                    samples += int(n)
+                    own[stack.split(";")[-1]] += int(n)
+        print(f"\n{len(paths)} profiles, {samples} samples, {sum(os.path.getsize(p) for p in paths) / len(paths):.0f} B each")
+        for frame, n in own.most_common(5):
+            print(f"  {n / samples * 100:5.1f}%  {frame}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Prompt size of the previous single-turn prompt versus prompt_builder.
+
+Before: an indented f-string with the instructions repeated for every
+question and no conversation context. After: compact instructions, one
+context line, a rolling summary and the latest turns within the budget.
+Token counts use prompt_builder.estimate_tokens for both.
+
+    python benchmarks/bench_prompt_builder.py
+"""
+
+from _common import timed
+
+from bench_chat_render import sample_turn
+from prompt_builder import PROMPT_TOKEN_BUDGET, build_prompt, estimate_tokens
+
+QUESTION = "How can I stay calm when my work is criticised in front of the team?"
+THEME_FOCUS = "guidance for professional life and service"
+MOOD = "Facing Challenges"
+EMOTION = "Sad"
+
+
+def previous_prompt(question, theme_focus, mood, emotional_state):
+    theme_context = f"Focus on {theme_focus}. "
+    mood_context = f"The user is currently {mood.lower()}. "
+    emotional_context = f"The user's emotional state is {emotional_state.lower()}. Please provide guidance that acknowledges and addresses this emotional state. "
+    return f"""
+            {theme_context}{mood_context}{emotional_context}Based on the Bhagavad Gita's teachings, provide guidance for this question:
+            {question}
+
+            Please format your response exactly like this:
+            Chapter X, Verse Y
+            Sanskrit: [Sanskrit verse if available]
+            Translation: [Clear English translation]
+            Explanation: [Detailed explanation of the verse's meaning and context, considering the user's emotional state]
+            Application: [Practical guidance for applying this wisdom in modern life, tailored to the user's current emotional state]
+
+            Make the response comprehensive but accessible to modern readers, with special attention to providing comfort and guidance appropriate for someone who is {emotional_state.lower() if emotional_state else 'seeking wisdom'}.
+            """
+
+
+def main():
+    import logging
+    logging.disable(logging.INFO)
+
+    before = previous_prompt(QUESTION, THEME_FOCUS, MOOD, EMOTION)
+    print(f"budget {PROMPT_TOKEN_BUDGET} tokens")
+    print(f"{'before (no history)':<28} {estimate_tokens(before):>5} tokens  {len(before):>6} chars")
+    for turns in (0, 3, 10, 50):
+        history = [message for i in range(turns) for message in sample_turn(i)]
+        prompt, tokens = build_prompt(QUESTION, THEME_FOCUS, MOOD, EMOTION, history)
+        best, _ = timed(lambda: build_prompt(QUESTION, THEME_FOCUS, MOOD, EMOTION, history), repeat=20)
+        print(f"{f'after ({turns} earlier turns)':<28} {tokens:>5} tokens  {len(prompt):>6} chars  built in {best:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Requests per second and bytes transferred for the PWA server.
+
+Fetches the files a PWA install pulls (pwa.html, sw.js, manifest, icons,
+verses CSV, header image) from concurrent clients, as an old client that
+sends no Accept-Encoding or validators, with gzip, with brotli, and as a
+returning client revalidating with If-None-Match. By default the server runs
+in-process on a threaded Werkzeug server; pass --url to measure a running
+server instead, e.g. `python pwa_server.py --production --port 5001`.
+
+    python benchmarks/bench_pwa_server.py [--url http://127.0.0.1:5001] [--clients 8] [--seconds 3]
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from _common import ROOT_DIR  # noqa: F401
+
+PATHS = [
+    '/pwa.html', '/sw.js', '/manifest.json', '/bhagavad_gita_verses.csv',
+    *(f'/static/icon-{size}.png' for size in (72, 96, 128, 144, 152, 192, 384, 512)),
+    '/Public/Images/' + quote('WhatsApp Image 2024-11-18 at 11.40.34_076eab8e.jpg'),
+]
+SCENARIOS = {
+    'identity': {},
+    'gzip': {'Accept-Encoding': 'gzip, deflate'},
+    'br': {'Accept-Encoding': 'gzip, deflate, br'},
+}
+
+
+def fetch(host, port, path, headers):
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, response.getheader('ETag'), response.getheader('Content-Encoding'), len(body)
+    finally:
+        connection.close()
+
+
+def run(host, port, headers_for, clients, seconds):
+    """Fetch PATHS round-robin from `clients` threads; returns (requests, body bytes, statuses)."""
+    stop = time.perf_counter() + seconds
+    totals = {'requests': 0, 'bytes': 0, 'statuses': {}}
+    lock = threading.Lock()
+
+    def client(offset):
+        requests = body_bytes = 0
+        statuses = {}
+        i = offset
+        while time.perf_counter() < stop:
+            path = PATHS[i % len(PATHS)]
+            status, _, _, size = fetch(host, port, path, headers_for(path))
+            requests += 1
+            body_bytes += size
+            statuses[status] = statuses.get(status, 0) + 1
+            i += 1
+        with lock:
+            totals['requests'] += requests
+            totals['bytes'] += body_bytes
+            for status, n in statuses.items():
+                totals['statuses'][status] = totals['statuses'].get(status, 0) + n
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        import logging
+        from werkzeug.serving import make_server
+
+        import pwa_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        started = time.perf_counter()
+        pwa_server.assets.preload(pwa_server.PRELOAD_ASSETS)
+        print(f"preload {(time.perf_counter() - started) * 1000:.0f} ms")
+        server = make_server('127.0.0.1', 0, pwa_server.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = '127.0.0.1', server.server_port
+
+    # One full install, per encoding: bytes on the wire
+    print(f"{'install':<12}{'bytes':>10}")
+    etags = {}
+    for name, headers in SCENARIOS.items():
+        total = 0
+        for path in PATHS:
+            status, etag, _, size = fetch(host, port, path, headers)
+            assert status == 200, (path, status)
+            etags[(name, path)] = etag
+            total += size
+        print(f"{name:<12}{total:>10}")
+    revalidate = sum(fetch(host, port, p, {**SCENARIOS['br'], 'If-None-Match': etags[('br', p)]})[3] for p in PATHS)
+    print(f"{'revalidate':<12}{revalidate:>10}")
+
+    print(f"\n{args.clients} clients, {args.seconds:g} s each")
+    print(f"{'scenario':<12}{'req/s':>10}{'MB/s':>10}  statuses")
+    cases = {name: (lambda path, h=headers: h) for name, headers in SCENARIOS.items()}
+    cases['revalidate'] = lambda path: {**SCENARIOS['br'], 'If-None-Match': etags[('br', path)]}
+    for name, headers_for in cases.items():
+        totals = run(host, port, headers_for, args.clients, args.seconds)
+        print(f"{name:<12}{totals['requests'] / args.seconds:>10.0f}"
+              f"{totals['bytes'] / args.seconds / 1e6:>10.2f}  {totals['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Build time, size and lookup latency of the related-verses graph.
+
+Times the offline build (TF-IDF and concept vectors, all-pairs similarity,
+top-K selection, serialization), loading the built file, and related()
+lookups for verses at the start, middle and end of the book and inside a
+ranged entry. For comparison, the same question answered on demand: the
+offline answer engine's TF-IDF search with a verse's translation as the
+query, which is what a rerun would do without the graph.
+
+    python benchmarks/bench_related_verses.py
+"""
+
+import time
+
+from _common import ROOT_DIR, load_verses_db, timed  # noqa: F401
+
+import related_verses
+from asset_pipeline import BASE_DIR, VERSES_CSV
+from offline_answer import OfflineAnswerEngine
+
+REPEAT = 20
+LOOKUPS = 10_000
+
+
+def main():
+    source_bytes = (BASE_DIR / VERSES_CSV).read_bytes()
+    started = time.perf_counter()
+    import numpy  # noqa: F401
+    related_verses.get_keyword_tagger()
+    print(f"numpy import and tagger compile (once per process): {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    best, mean = timed(lambda: related_verses.build_graph(source_bytes), REPEAT)
+    data = related_verses.build_graph(source_bytes)
+    graph = related_verses.RelatedVerses(data)
+    print(f"build: best {best:.0f} ms, mean {mean:.0f} ms for {graph.count} verses x {graph.k} neighbours")
+    print(f"size: {len(data) / 1024:.1f} KB ({len(data) / graph.count:.0f} B per verse)")
+    best, _ = timed(lambda: related_verses.RelatedVerses(data), REPEAT)
+    print(f"load from bytes: {best * 1000:.1f} µs")
+
+    print(f"\n{'lookup':<26}{'µs':>8}")
+    for label, chapter, verse in (("1.1 (first)", 1, "1.1"), ("9.22 (middle)", 9, "9.22"),
+                                  ("18.78 (last)", 18, "18.78"), ("1.5 (inside 1.4 – 1.6)", 1, 5)):
+        best, _ = timed(lambda: [graph.related(chapter, verse, 4) for _ in range(LOOKUPS)], 5)
+        print(f"{label:<26}{best * 1000 / LOOKUPS:>8.2f}")
+    best, _ = timed(lambda: [graph.index(2, 47) for _ in range(LOOKUPS)], 5)
+    print(f"{'index only':<26}{best * 1000 / LOOKUPS:>8.2f}")
+
+    verses_db = load_verses_db()
+    started = time.perf_counter()
+    engine = OfflineAnswerEngine(verses_db)
+    index_ms = (time.perf_counter() - started) * 1000
+    text = verses_db["chapter_Chapter 2"]["verses"]["2.47"]["translation"]
+    best, _ = timed(lambda: engine.search(text, k=5), REPEAT)
+    print(f"\non demand with the offline engine's TF-IDF index ({index_ms:.0f} ms to build): "
+          f"{best * 1000:.0f} µs per verse, lexical only")
+
+
+if __name__ == "__main__":
+    main()
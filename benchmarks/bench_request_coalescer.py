@@ -0,0 +1,97 @@
+"""
+Upstream model calls for N simultaneous identical requests.
+
+N threads (each running get_response in its own event loop, like the job
+queue workers) ask the same quick-action question at the same moment
+against the local stand-in model. With coalescing only the leader reaches
+the model; the rest receive its answer, also when each session has its own
+conversation history. Also shows that a leader's error reaches every
+follower.
+
+    python benchmarks/bench_request_coalescer.py
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+from _common import ROOT_DIR  # noqa: F401
+
+import gemini_standin
+from request_coalescer import RequestCoalescer, get_request_coalescer
+
+CALLERS = (1, 10, 50)
+LATENCY_MS = 300
+QUESTION = "What guidance does the Bhagavad Gita offer for Monday? Please provide a verse for daily reflection and contemplation."
+
+
+def upstream_requests(server) -> int:
+    with urllib.request.urlopen(f"{server.url}/stats") as response:
+        return json.load(response)["requests"]
+
+
+def simultaneous(n, fn):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def caller(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(n)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, (time.perf_counter() - started) * 1000
+
+
+def main():
+    logging.disable(logging.INFO)
+    server = gemini_standin.start_in_thread(latency_ms=LATENCY_MS)
+    from gita_bot import GitaGeminiBot
+    bot = GitaGeminiBot("standin", api_endpoint=server.url)
+
+    print(f"stand-in latency {LATENCY_MS} ms")
+    for n in CALLERS:
+        before = upstream_requests(server)
+        results, elapsed = simultaneous(n, lambda: asyncio.run(bot.get_response(QUESTION, "Inner Peace", "Grateful", "Neutral")))
+        calls = upstream_requests(server) - before
+        same = len({r["verse_reference"] for r in results}) == 1 and not any(r.get("error") for r in results)
+        print(f"{n:>3} identical requests -> {calls} upstream call(s), {elapsed:.0f} ms, identical answers: {same}")
+
+    # The quick action asked from sessions that each have their own conversation so far
+    def with_history(i):
+        history = [{"role": "user", "content": f"Question {i} about my work"},
+                   {"role": "assistant", "verse_reference": "Chapter 2, Verse 47", "translation": "", "explanation": f"Answer {i}"}]
+        return asyncio.run(bot.get_response(QUESTION, "Inner Peace", "Grateful", "Neutral", history))
+
+    counter = iter(range(10))
+    before = upstream_requests(server)
+    simultaneous(10, lambda: with_history(next(counter)))
+    print(f" 10 identical requests from sessions with different histories -> {upstream_requests(server) - before} upstream call(s)")
+    print("counters:", get_request_coalescer().stats())
+
+    # Errors from the leader are raised in every follower
+    coalescer = RequestCoalescer()
+
+    def failing():
+        time.sleep(0.2)
+        raise RuntimeError("quota exceeded")
+
+    def call():
+        try:
+            return coalescer.run("same prompt", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    results, _ = simultaneous(10, call)
+    print(f"error propagation: {results.count('quota exceeded')}/10 callers saw the leader's error;", coalescer.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Append throughput and server RSS with many concurrent chat sessions.
+
+Before: every session keeps its whole history in st.session_state (plus the
+old 900-message archive). After: messages go through session_store's
+write-behind writer and each session keeps only chat_view's window in memory.
+Each mode runs in a fresh interpreter so RSS figures are comparable.
+
+    python benchmarks/bench_session_store.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _common import ROOT_DIR
+
+SESSIONS = 500
+TURNS = 100       # per session, i.e. 200 messages
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_sessions(append, window=None):
+    """Drive SESSIONS threads that each append TURNS question/answer pairs."""
+    from bench_chat_render import sample_turn
+
+    histories = [[] for _ in range(SESSIONS)]
+    start_barrier = threading.Barrier(SESSIONS + 1)
+
+    def session(n):
+        start_barrier.wait()
+        messages = histories[n]
+        for i in range(TURNS):
+            for message in sample_turn(i):
+                # Real answers are unique strings, not shared constants
+                message = {k: f"{v} [{n}]" if isinstance(v, str) else v for k, v in message.items()}
+                message["created_at"] = time.time()
+                append(f"user-{n}", f"session-{n}", message)
+                messages.append(message)
+                if window and len(messages) > window:
+                    del messages[:len(messages) - window]
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(SESSIONS)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, histories
+
+
+def measure(mode: str):
+    # Import everything up front so RSS growth is history only
+    import chat_view  # noqa: F401
+    import session_store  # noqa: F401
+    baseline = rss_mb()
+    if mode == "before":
+        elapsed, histories = run_sessions(lambda *args: None)
+        result = {"appends_per_sec": SESSIONS * TURNS * 2 / elapsed}
+    else:
+        from chat_view import MAX_ACTIVE_MESSAGES
+        from session_store import SessionStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SessionStore(os.path.join(tmp, "sessions.db"))
+            elapsed, histories = run_sessions(store.append, window=MAX_ACTIVE_MESSAGES)
+            started = time.perf_counter()
+            store.flush()
+            drain = time.perf_counter() - started
+            result = {
+                "appends_per_sec": SESSIONS * TURNS * 2 / elapsed,
+                "persisted_per_sec": store.written / (elapsed + drain),
+                "batches": store.batches,
+                "db_mb": sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 2**20,
+            }
+            started = time.perf_counter()
+            for n in range(0, SESSIONS, 50):
+                store.recent(f"user-{n}", 40)
+            result["load_recent_ms"] = (time.perf_counter() - started) * 1000 / (SESSIONS // 50)
+    result["rss_growth_mb"] = rss_mb() - baseline
+    result["messages_in_memory"] = sum(len(h) for h in histories)
+    print(json.dumps(result))
+
+
+def main():
+    if len(sys.argv) > 1:
+        measure(sys.argv[1])
+        return
+
+    print(f"{SESSIONS} concurrent sessions x {TURNS} turns")
+    for mode in ("before", "after"):
+        output = subprocess.run(
+            [sys.executable, __file__, mode],
+            capture_output=True, text=True, check=True, cwd=ROOT_DIR
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>6}: " + ", ".join(
+            f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+            for key, value in result.items()
+        ))
+
+
+if __name__ == "__main__":
+    main()
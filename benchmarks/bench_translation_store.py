@@ -0,0 +1,97 @@
+"""
+Lookup latency and size of the translation store, per language.
+
+Builds a pack for every language in a temporary directory from stand-in
+translations (the gemini_standin.py answer to batch_translate.py's prompt,
+i.e. the English text with a language tag; text in Indic scripts takes 3
+bytes per character in UTF-8, so real packs are larger), then times lookups through
+TranslationStore: a verse, a verse inside a ranged entry, a miss, and
+localize_response on a structured answer. For comparison the same lookups
+go to a SQLite table of zlib-compressed text like the explanation store.
+
+    python benchmarks/bench_translation_store.py
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+
+from _common import ROOT_DIR, load_verses_db, timed  # noqa: F401
+
+import gemini_standin
+import translation_store
+from translation_store import DEFAULT_LANGUAGE, LANGUAGES, TranslationStore, source_crc, translation_prompt
+from verse_refs import chapter_number, verse_numbers
+
+REPEAT = 20
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+
+def main():
+    verses_db = load_verses_db()
+    verses = [(chapter_number(key), verse, data["translation"])
+              for key, chapter in verses_db.items() for verse, data in chapter["verses"].items()]
+    model = gemini_standin.StandinModel()
+    languages = [name for name in LANGUAGES if name != DEFAULT_LANGUAGE]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = TranslationStore(directory)
+        sqlite_db = sqlite3.connect(os.path.join(directory, "translations.db"))
+        sqlite_db.execute("CREATE TABLE t (chapter INTEGER, verse TEXT, language TEXT, text BLOB,"
+                          " PRIMARY KEY (chapter, verse, language)) WITHOUT ROWID")
+        started = time.perf_counter()
+        for language in languages:
+            entries = []
+            for chapter, verse, text in verses:
+                translated = model.answer(translation_prompt(verse, language, text))
+                entries.append((chapter, *verse_numbers(verse), source_crc(text), translated))
+                sqlite_db.execute("INSERT INTO t VALUES (?, ?, ?, ?)",
+                                  (chapter, verse, language, zlib.compress(translated.encode("utf-8"), 9)))
+            translation_store.write_pack(store.path(language), entries)
+        sqlite_db.commit()
+        print(f"built {len(languages)} packs of {len(verses)} verses in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        print(f"\n{'language':<10}{'pack KB':>9}{'index B':>9}{'text KB':>9}{'open µs':>9}"
+              f"{'hit µs':>8}{'range µs':>10}{'miss µs':>9}{'localize µs':>13}")
+        before = rss_kb()
+        for language in languages:
+            path = store.path(language)
+            size = path.stat().st_size
+            started = time.perf_counter()
+            pack = translation_store.TranslationPack(path)
+            open_us = (time.perf_counter() - started) * 1e6
+            index_bytes = size - len(pack.text)
+            store.pack(language)
+
+            hit, _ = timed(lambda: [store.get(c, v, language) for c, v, _ in verses], REPEAT)
+            ranged, _ = timed(lambda: [store.get(1, n, language) for _ in range(200) for n in range(4, 7)], REPEAT)
+            miss, _ = timed(lambda: [store.get(c, 99, language) for c, _, _ in verses], REPEAT)
+            answer = {"verse_reference": "Chapter 2, Verse 47", "translation": "…"}
+            localize, _ = timed(lambda: [translation_store.localize_response(answer, language) for _ in verses], REPEAT)
+            print(f"{language:<10}{size / 1024:>9.1f}{index_bytes:>9}{len(pack.text) / 1024:>9.1f}{open_us:>9.0f}"
+                  f"{hit * 1000 / len(verses):>8.2f}{ranged * 1000 / 600:>10.2f}{miss * 1000 / len(verses):>9.2f}"
+                  f"{localize * 1000 / len(verses):>13.2f}")
+        print(f"RSS after mapping and reading all packs: +{rss_kb() - before} KB "
+              f"(file pages are shared with other processes mapping the same packs)")
+
+        def sqlite_lookups():
+            for chapter, verse, _ in verses:
+                row = sqlite_db.execute("SELECT text FROM t WHERE chapter = ? AND verse = ? AND language = ?",
+                                        (chapter, verse, "Hindi")).fetchone()
+                zlib.decompress(row[0]).decode("utf-8")
+
+        best, _ = timed(sqlite_lookups, REPEAT)
+        sqlite_size = os.path.getsize(os.path.join(directory, "translations.db"))
+        print(f"\nSQLite + zlib (explanation store layout): {best * 1000 / len(verses):.2f} µs per lookup, "
+              f"{sqlite_size / 1024 / len(languages):.1f} KB per language")
+        print("translating per request instead: one extra model call for every answer and every verse shown")
+
+
+if __name__ == "__main__":
+    main()
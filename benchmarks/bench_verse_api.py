@@ -0,0 +1,149 @@
+"""
+Requests per second for the read-only verse API under concurrent load.
+
+Runs pwa_server in-process on a threaded Werkzeug server and fetches verse
+lookups (single and ranged), chapter pages and keyword searches from
+concurrent clients, with gzip, and as returning clients revalidating with
+If-None-Match. For comparison, the same lookups and searches are served by a
+naive handler that scans the CSV rows and serializes per request. Pass --url
+to measure a running server instead, e.g. `python pwa_server.py --production`.
+
+    python benchmarks/bench_verse_api.py [--url http://127.0.0.1:5000] [--clients 8] [--seconds 3]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import random
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from flask import Flask, Response, request
+
+from _common import GITA_CSV_PATH, ROOT_DIR, timed  # noqa: F401
+from bench_pwa_server import fetch
+
+import verse_index
+
+SEARCHES = ['anger', 'soul eternal', 'duty action', 'peace mind', 'devotion love', 'fear', 'desire senses',
+            'knowledge wisdom', 'yoga', 'death birth', 'sacrifice', 'equanimity pleasure pain']
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+
+
+def workloads(index):
+    verses = [v['verse'].split()[0] for v in index.verses]
+    return {
+        'verse': [f'/api/verses/{v}' for v in verses],
+        'range': ['/api/verses/' + quote(f'{c}.{n}-{c}.{n + 4}') for c, n in index.by_number],
+        'chapter page': [f'/api/chapters/{c}?page={p}' for c, data in index.chapters.items()
+                         for p in range(1, len(data['positions']) // verse_index.DEFAULT_PAGE_SIZE + 2)],
+        'search': [f'/api/search?q={quote(q)}' for q in SEARCHES],
+    }
+
+
+def naive_app():
+    """Scan the CSV rows and serialize per request: what a handler without the index would do."""
+    with open(GITA_CSV_PATH, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    app = Flask('naive')
+
+    @app.route('/api/verses/<reference>')
+    def verse(reference):
+        matches = [r for r in rows if r['chapter_verse'].split()[0] == reference]
+        return Response(json.dumps({'verses': matches}), mimetype='application/json')
+
+    @app.route('/api/search')
+    def search():
+        words = request.args.get('q', '').lower().split()
+        matches = [r for r in rows if all(w in r['translation'].lower() for w in words)]
+        return Response(json.dumps({'total': len(matches), 'results': matches[:10]}), mimetype='application/json')
+
+    return app
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return '127.0.0.1', server.server_port
+
+
+def run(host, port, paths, headers_for, clients, seconds):
+    """Fetch random paths from `clients` threads; returns (requests, statuses)."""
+    stop = time.perf_counter() + seconds
+    totals = {'requests': 0, 'statuses': {}}
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        requests, statuses = 0, {}
+        while time.perf_counter() < stop:
+            path = rng.choice(paths)
+            status = fetch(host, port, path, headers_for(path))[0]
+            requests += 1
+            statuses[status] = statuses.get(status, 0) + 1
+        with lock:
+            totals['requests'] += requests
+            for status, n in statuses.items():
+                totals['statuses'][status] = totals['statuses'].get(status, 0) + n
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    index = verse_index.VerseIndex()
+    print(f"index build {(time.perf_counter() - started) * 1000:.0f} ms: {len(index.verses)} verses, "
+          f"{len(index.postings)} terms")
+    best, _ = timed(lambda: [index.verse(v['verse'].split()[0]) for v in index.verses], 20)
+    print(f"verse lookup in-process {best * 1000 / len(index.verses):.2f} µs")
+    best, _ = timed(lambda: [index._search_terms(tuple(verse_index.terms(q)), 1, 10) for q in SEARCHES], 20)
+    print(f"search in-process, uncached {best * 1000 / len(SEARCHES):.0f} µs")
+    with open(GITA_CSV_PATH, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    best, _ = timed(lambda: [json.dumps([r for r in rows if r['chapter_verse'] == v['verse']]) for v in index.verses], 5)
+    print(f"verse lookup by CSV scan {best * 1000 / len(index.verses):.0f} µs")
+    best, _ = timed(lambda: [json.dumps([r for r in rows if all(w in r['translation'].lower() for w in q.split())][:10])
+                             for q in SEARCHES], 20)
+    print(f"search by CSV scan {best * 1000 / len(SEARCHES):.0f} µs")
+
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        import pwa_server
+        host, port = serve(pwa_server.app)
+    paths = workloads(index)
+    etags = {p: fetch(host, port, p, GZIP)[1] for group in paths.values() for p in group}
+
+    print(f"\n{args.clients} clients, {args.seconds:g} s each")
+    print(f"{'workload':<16}{'gzip req/s':>12}{'304 req/s':>12}  statuses")
+    for name, group in paths.items():
+        fresh = run(host, port, group, lambda p: GZIP, args.clients, args.seconds)
+        revalidate = run(host, port, group, lambda p: {**GZIP, 'If-None-Match': etags[p]}, args.clients, args.seconds)
+        print(f"{name:<16}{fresh['requests'] / args.seconds:>12.0f}{revalidate['requests'] / args.seconds:>12.0f}"
+              f"  {fresh['statuses']} {revalidate['statuses']}")
+
+    host, port = serve(naive_app())
+    print("\nnaive handler (CSV scan + json.dumps per request)")
+    for name in ('verse', 'search'):
+        totals = run(host, port, paths[name], lambda p: GZIP, args.clients, args.seconds)
+        print(f"{name:<16}{totals['requests'] / args.seconds:>12.0f}  {totals['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
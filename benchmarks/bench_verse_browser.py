@@ -0,0 +1,71 @@
+"""
+Rerun wall time and websocket payload of the sidebar verse browser.
+
+Compares the previous render-every-verse sidebar with the paginated fragment
+for the largest chapter (Chapter 18, 78 verses).
+
+    python benchmarks/bench_verse_browser.py
+"""
+
+from _common import count_forward_msg_bytes, load_verses_db, timed
+
+from streamlit.testing.v1 import AppTest
+
+CHAPTER = "chapter_Chapter 18"
+
+
+def previous_sidebar():
+    # Verse loop of render_enhanced_sidebar before the paginated browser
+    import streamlit as st
+    from _common import load_verses_db
+
+    verses_db = load_verses_db()
+    selected_chapter = st.sidebar.selectbox("Select Chapter", list(verses_db.keys()), index=17)
+    chapter_data = verses_db[selected_chapter]
+    st.sidebar.markdown(f"### {chapter_data['title']}")
+    st.sidebar.info(f"📊 {len(chapter_data['verses'])} verses in this chapter")
+    st.sidebar.markdown("#### All Verses:")
+    for verse_num, verse_data in chapter_data['verses'].items():
+        with st.sidebar.expander(f"Verse {verse_num}"):
+            translation = verse_data['translation']
+            st.markdown(translation[:200] + "..." if len(translation) > 200 else translation)
+            if st.button("Ask about this verse", key=f"ask_verse_{selected_chapter}_{verse_num}"):
+                st.session_state.auto_question = verse_num
+
+
+def paginated_sidebar():
+    import streamlit as st
+    from _common import load_verses_db
+    from verse_browser import render_verse_browser
+
+    if "browser_chapter" not in st.session_state:
+        st.session_state.browser_chapter = "chapter_Chapter 18"
+    with st.sidebar:
+        render_verse_browser(load_verses_db())
+
+
+def measure(script, label):
+    at = AppTest.from_function(script)
+    at.run()
+
+    with count_forward_msg_bytes() as counter:
+        best, mean = timed(at.run, repeat=10)
+    payload = counter["bytes"] // 10
+    print(f"{label:<28} rerun best {best:7.2f} ms  mean {mean:7.2f} ms  payload {payload / 1024:7.1f} KiB/rerun")
+    return at
+
+
+def main():
+    verses = len(load_verses_db()[CHAPTER]["verses"])
+    print(f"Chapter 18: {verses} verses\n")
+    measure(previous_sidebar, "before (all verses)")
+    at = measure(paginated_sidebar, "after (paginated fragment)")
+
+    # Paging within the browser only reruns the fragment
+    with count_forward_msg_bytes() as counter:
+        best, mean = timed(lambda: at.sidebar.number_input[0].increment().run(), repeat=5)
+    print(f"{'after, next page':<28} rerun best {best:7.2f} ms  mean {mean:7.2f} ms  payload {counter['bytes'] // 5 / 1024:7.1f} KiB/rerun")
+
+
+if __name__ == "__main__":
+    main()
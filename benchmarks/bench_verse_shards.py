@@ -0,0 +1,84 @@
+"""
+First-load bytes and time-to-first-verse: monolithic CSV vs chapter shards.
+
+An offline client that opens one chapter either downloads and parses the
+whole verses CSV, or downloads the shard index and that chapter's shard.
+Bytes are measured through the PWA server with gzip; time-to-first-verse
+is the local fetch-and-parse time plus the modelled transfer time on a slow
+mobile link (RTT + bytes / bandwidth, one round trip per request).
+
+    python benchmarks/bench_verse_shards.py
+"""
+
+import csv
+import io
+import json
+import time
+
+from _common import ROOT_DIR  # noqa: F401
+
+import asset_pipeline
+import pwa_server
+
+GZIP = {'Accept-Encoding': 'gzip'}
+LINK_RTT_SEC = 0.15
+LINK_BYTES_PER_SEC = 1.6e6 / 8     # "slow 4G"
+REPEAT = 50
+
+
+def best_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return min(samples)
+
+
+def link_ms(requests: int, wire_bytes: int) -> float:
+    return (requests * LINK_RTT_SEC + wire_bytes / LINK_BYTES_PER_SEC) * 1000
+
+
+def main():
+    asset_pipeline.build_verse_shards()
+    client = pwa_server.app.test_client()
+    index = json.loads(client.get('/verses/index.json').get_data())
+
+    csv_wire = len(client.get('/bhagavad_gita_verses.csv', headers=GZIP).data)
+    index_wire = len(client.get('/verses/index.json', headers=GZIP).data)
+    shard_wire = {c['chapter']: len(client.get(c['url'], headers=GZIP).data) for c in index['chapters']}
+
+    def first_verse_csv(chapter):
+        def run():
+            text = client.get('/bhagavad_gita_verses.csv').get_data(as_text=True)
+            prefix = f"{chapter}."
+            return next(row for row in csv.DictReader(io.StringIO(text)) if row['chapter_verse'].startswith(prefix))
+        return run
+
+    def first_verse_shards(chapter):
+        def run():
+            listing = json.loads(client.get('/verses/index.json').get_data())
+            url = next(c['url'] for c in listing['chapters'] if c['chapter'] == chapter)
+            return json.loads(client.get(url).get_data())['verses'][0]
+        return run
+
+    print(f"link model: {LINK_RTT_SEC * 1000:.0f} ms RTT, {LINK_BYTES_PER_SEC * 8 / 1e6:.1f} Mbit/s; bytes gzip-encoded")
+    print("ttfv = time to first verse; 'warm' = index already cached by the service worker install")
+    print(f"{'open chapter':<14}{'CSV bytes':>11}{'shard bytes':>13}{'CSV ttfv':>11}{'shard ttfv':>12}"
+          f"{'warm ttfv':>11}{'CSV parse':>11}{'shard parse':>13}")
+    for chapter in (1, 2, 18):
+        csv_parse = best_ms(first_verse_csv(chapter))
+        shard_parse = best_ms(first_verse_shards(chapter))
+        sharded = index_wire + shard_wire[chapter]
+        print(f"{chapter:<14}{csv_wire:>11}{sharded:>13}"
+              f"{link_ms(1, csv_wire) + csv_parse:>9.0f}ms{link_ms(2, sharded) + shard_parse:>10.0f}ms"
+              f"{link_ms(1, shard_wire[chapter]) + shard_parse:>9.0f}ms"
+              f"{csv_parse:>9.2f}ms{shard_parse:>11.2f}ms")
+
+    print(f"\nall 18 shards + index: {index_wire + sum(shard_wire.values())} B vs CSV {csv_wire} B")
+    print(f"a data change re-downloads the index ({index_wire} B) and the changed shard "
+          f"(median {sorted(shard_wire.values())[len(shard_wire) // 2]} B) instead of the CSV")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Capture profiles for the WebRTC emotion stream.
+
+The emotion pipeline only needs a face crop a few times per second, so each
+session picks a named profile (resolution, frame rate and analysis rate) and
+is stepped down automatically when server-side frame processing gets slow or
+the host CPU is saturated. Controllers are released when the webcam is
+turned off, and dropped after CONTROLLER_IDLE_SEC without a rerun or frame
+for sessions that simply went away. The number of sessions on each profile
+is reported as the wisdom_capture_sessions gauge.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CaptureProfile:
+    name: str
+    width: int
+    height: int
+    frame_rate: int
+    analysis_fps: float  # face crops handed to the emotion thread per second
+
+    def media_stream_constraints(self) -> Dict:
+        """Constraints passed to the browser's getUserMedia call."""
+        return {
+            "video": {
+                "width": {"ideal": self.width, "max": self.width},
+                "height": {"ideal": self.height, "max": self.height},
+                "frameRate": {"ideal": self.frame_rate, "max": self.frame_rate}
+            },
+            "audio": False
+        }
+
+
+# Ordered from the richest to the lightest profile
+CAPTURE_PROFILES = [
+    CaptureProfile("High", 1280, 720, 30, 6.0),
+    CaptureProfile("Balanced", 640, 480, 15, 4.0),
+    CaptureProfile("Low", 480, 360, 10, 2.0),
+    CaptureProfile("Minimal", 320, 240, 5, 1.0),
+]
+PROFILES_BY_NAME = {profile.name: profile for profile in CAPTURE_PROFILES}
+DEFAULT_PROFILE = "Balanced"
+
+# Step-down thresholds, overridable through the environment
+LATENCY_THRESHOLD_MS = float(os.getenv("CAPTURE_LATENCY_THRESHOLD_MS", "60"))
+CPU_THRESHOLD = float(os.getenv("CAPTURE_CPU_THRESHOLD", "0.85"))
+ADJUST_COOLDOWN_SEC = 10.0
+STEP_UP_AFTER_SEC = 60.0
+CONTROLLER_IDLE_SEC = 300.0  # controllers with no rerun or frame for this long belong to closed sessions
+
+
+def _cpu_load() -> Optional[float]:
+    """Return the 1-minute load average per core, or None where unsupported."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class CaptureProfileController:
+    """Tracks frame processing cost for one session and adapts its profile."""
+
+    def __init__(self, session_id: str, profile_name: str = DEFAULT_PROFILE):
+        self.session_id = session_id
+        self.ceiling = self._index(profile_name)
+        self.level = self.ceiling
+        self.avg_latency_ms = 0.0
+        self.cpu_load = None
+        self._lock = threading.Lock()
+        self._last_change = time.monotonic()
+        self._last_cpu_sample = 0.0
+        self._last_analysis = 0.0
+        self.last_used = time.monotonic()
+
+    @staticmethod
+    def _index(profile_name: str) -> int:
+        names = [profile.name for profile in CAPTURE_PROFILES]
+        return names.index(profile_name) if profile_name in names else names.index(DEFAULT_PROFILE)
+
+    @property
+    def profile(self) -> CaptureProfile:
+        return CAPTURE_PROFILES[self.level]
+
+    @property
+    def is_degraded(self) -> bool:
+        return self.level > self.ceiling
+
+    def set_ceiling(self, profile_name: str):
+        """Apply the profile chosen by the user; automatic changes never exceed it."""
+        index = self._index(profile_name)
+        with self._lock:
+            if index != self.ceiling:
+                self.ceiling = index
+                self._switch(index, "selected by user")
+
+    def should_analyze(self) -> bool:
+        """Rate-limit face crops sent for emotion inference to the profile's analysis rate."""
+        now = time.monotonic()
+        if now - self._last_analysis >= 1.0 / self.profile.analysis_fps:
+            self._last_analysis = now
+            return True
+        return False
+
+    def target_size(self, width: int, height: int):
+        """Return the frame size to process, or None when the frame already fits."""
+        profile = self.profile
+        if width <= profile.width and height <= profile.height:
+            return None
+        scale = min(profile.width / width, profile.height / height)
+        return int(width * scale), int(height * scale)
+
+    def record_frame(self, latency_sec: float):
+        """Feed one frame's processing latency and step the profile if needed."""
+        latency_ms = latency_sec * 1000
+        with self._lock:
+            # Exponentially weighted average keeps single slow frames from tripping a change
+            self.avg_latency_ms = 0.9 * self.avg_latency_ms + 0.1 * latency_ms if self.avg_latency_ms else latency_ms
+
+            now = time.monotonic()
+            self.last_used = now
+            if now - self._last_cpu_sample >= 1.0:
+                self.cpu_load = _cpu_load()
+                self._last_cpu_sample = now
+
+            if now - self._last_change < ADJUST_COOLDOWN_SEC:
+                return
+
+            overloaded = self.avg_latency_ms > LATENCY_THRESHOLD_MS or (
+                self.cpu_load is not None and self.cpu_load > CPU_THRESHOLD
+            )
+            if overloaded and self.level < len(CAPTURE_PROFILES) - 1:
+                self._switch(self.level + 1, self._reason())
+            elif (
+                not overloaded
+                and self.level > self.ceiling
+                and now - self._last_change >= STEP_UP_AFTER_SEC
+                and self.avg_latency_ms < LATENCY_THRESHOLD_MS / 2
+                and (self.cpu_load is None or self.cpu_load < CPU_THRESHOLD / 2)
+            ):
+                self._switch(self.level - 1, "load recovered")
+
+    def _reason(self) -> str:
+        cpu = f"{self.cpu_load:.2f}" if self.cpu_load is not None else "n/a"
+        return f"avg frame latency {self.avg_latency_ms:.1f} ms, cpu load {cpu}"
+
+    def _switch(self, level: int, reason: str):
+        previous = self.profile.name
+        self.level = level
+        self._last_change = time.monotonic()
+        logger.info(
+            "Capture profile for session %s: %s -> %s (%s)",
+            self.session_id, previous, self.profile.name, reason
+        )
+
+    def status(self) -> Dict:
+        return {
+            "profile": self.profile.name,
+            "selected": CAPTURE_PROFILES[self.ceiling].name,
+            "avg_latency_ms": round(self.avg_latency_ms, 1),
+            "cpu_load": self.cpu_load,
+        }
+
+
+_controllers: Dict[str, CaptureProfileController] = {}
+_controllers_lock = threading.Lock()
+
+
+def _drop_idle_controllers():
+    # Caller holds _controllers_lock
+    cutoff = time.monotonic() - CONTROLLER_IDLE_SEC
+    for session_id in [s for s, c in _controllers.items() if c.last_used < cutoff]:
+        logger.info("Dropping idle capture profile controller for session %s", session_id)
+        del _controllers[session_id]
+
+
+def get_controller(session_id: str, profile_name: str = DEFAULT_PROFILE) -> CaptureProfileController:
+    """Return the controller for a session, creating it on first use."""
+    with _controllers_lock:
+        _drop_idle_controllers()
+        controller = _controllers.get(session_id)
+        if controller is None:
+            controller = CaptureProfileController(session_id, profile_name)
+            _controllers[session_id] = controller
+        controller.last_used = time.monotonic()
+        return controller
+
+
+def release_controller(session_id: str):
+    with _controllers_lock:
+        _controllers.pop(session_id, None)
+
+
+def current_profiles() -> Dict[str, Dict]:
+    """Current capture profile of every active session, keyed by session id."""
+    with _controllers_lock:
+        _drop_idle_controllers()
+        return {session_id: controller.status() for session_id, controller in _controllers.items()}
+
+
+def _sessions_by_profile() -> List[Tuple[Dict, int]]:
+    counts: Dict[Tuple[str, str], int] = {}
+    for status in current_profiles().values():
+        key = (status["profile"], status["selected"])
+        counts[key] = counts.get(key, 0) + 1
+    return [({"profile": profile, "selected": selected}, count) for (profile, selected), count in counts.items()]
+
+
+metrics.register_gauge("wisdom_capture_sessions", _sessions_by_profile)
@@ -0,0 +1,172 @@
+"""
+On-demand chat export in plain text, Markdown and JSON Lines.
+
+Exports are produced by generators that yield one chunk per message, so a
+long history is written straight into the output buffer instead of being
+built up by string concatenation. Nothing is generated until the user asks
+for an export.
+"""
+
+import io
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator
+
+import streamlit as st
+
+METADATA_FIELDS = ("theme", "mood", "emotional_state", "keywords", "timestamp")
+ANSWER_FIELDS = ("verse_reference", "sanskrit", "translation", "explanation", "application")
+
+# label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "Plain text": ("txt", "text/plain"),
+    "Markdown": ("md", "text/markdown"),
+    "JSON Lines": ("jsonl", "application/x-ndjson"),
+}
+
+
+def _iter_text(messages: Iterable[Dict]) -> Iterator[str]:
+    yield f"--- Wisdom Weaver Chat History - {datetime.now().strftime('%Y-%m-%d %H:%M')} ---\n\n"
+    for message in messages:
+        if message["role"] == "user":
+            yield f"User: {message['content']}\n\n"
+            continue
+
+        lines = ["Wisdom Weaver: "]
+        if message.get("verse_reference"):
+            lines.append(f"📖 {message['verse_reference']}\n")
+        if message.get("sanskrit"):
+            lines.append(f"Sanskrit: {message['sanskrit']}\n")
+        if message.get("translation"):
+            lines.append(f"Translation: {message['translation']}\n")
+        if message.get("explanation"):
+            lines.append(f"Explanation: {message['explanation']}\n")
+        if message.get("application"):
+            lines.append(f"Modern Application: {message['application']}\n")
+        lines.append("\n")
+        yield "".join(lines)
+    yield "--- End of Chat History ---"
+
+
+def _iter_markdown(messages: Iterable[Dict]) -> Iterator[str]:
+    yield f"# Wisdom Weaver Chat History\n\n*Exported {datetime.now().strftime('%Y-%m-%d %H:%M')}*\n\n"
+    for message in messages:
+        if message["role"] == "user":
+            yield f"## 🙏 {message['content']}\n\n"
+            continue
+
+        parts = []
+        if message.get("verse_reference"):
+            parts.append(f"**📖 {message['verse_reference']}**\n\n")
+        if message.get("sanskrit"):
+            parts.append(f"*Sanskrit:* {message['sanskrit']}\n\n")
+        if message.get("translation"):
+            parts.append(f"**Translation:** {message['translation']}\n\n")
+        if message.get("explanation"):
+            parts.append(f"### 🧠 Understanding\n\n{message['explanation']}\n\n")
+        if message.get("application"):
+            parts.append(f"### 🌟 Modern Application\n\n{message['application']}\n\n")
+        if message.get("keywords"):
+            parts.append("**Key Concepts:** " + " • ".join(f"`{kw}`" for kw in message["keywords"]) + "\n\n")
+
+        context = [
+            f"{label}: {message[field]}"
+            for field, label in (("theme", "Theme"), ("mood", "Mood"), ("emotional_state", "Emotional state"), ("timestamp", "Time"))
+            if message.get(field)
+        ]
+        if context:
+            parts.append("> " + " · ".join(context) + "\n\n")
+        parts.append("---\n\n")
+        yield "".join(parts)
+
+
+def _iter_jsonl(messages: Iterable[Dict]) -> Iterator[str]:
+    for message in messages:
+        if message["role"] == "user":
+            record = {"role": "user", "content": message["content"]}
+        else:
+            record = {"role": message["role"]}
+            record.update({field: message.get(field, "") for field in ANSWER_FIELDS})
+        record.update({field: message.get(field) for field in METADATA_FIELDS if field in message})
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+_GENERATORS = {
+    "Plain text": _iter_text,
+    "Markdown": _iter_markdown,
+    "JSON Lines": _iter_jsonl,
+}
+
+
+def iter_export(messages: Iterable[Dict], export_format: str = "Plain text") -> Iterator[str]:
+    """Yield the export of `messages` chunk by chunk."""
+    if export_format not in _GENERATORS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    # Answers still being generated are left out
+    return _GENERATORS[export_format](m for m in messages if "pending_job" not in m)
+
+
+def write_export(messages: Iterable[Dict], export_format: str, out) -> int:
+    """Stream an export into a binary file object and return the bytes written."""
+    written = 0
+    for chunk in iter_export(messages, export_format):
+        written += out.write(chunk.encode("utf-8"))
+    return written
+
+
+def export_buffer(messages: Iterable[Dict], export_format: str) -> io.BytesIO:
+    buffer = io.BytesIO()
+    write_export(messages, export_format, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _clear_prepared_export():
+    st.session_state.pop("prepared_export", None)
+
+
+def _prepare_export(get_messages, export_format, signature):
+    st.session_state.prepared_export = {
+        "signature": signature,
+        "buffer": export_buffer(get_messages(), export_format),
+    }
+
+
+@st.fragment
+def render_export_controls(get_messages, get_signature):
+    """Format picker and download button; the history is read and the export built only when requested.
+
+    get_signature() must be cheap: it runs on every rerun and changes whenever the history does.
+    """
+    export_col1, export_col2 = st.columns([2, 3])
+    with export_col1:
+        export_format = st.selectbox(
+            "Export format",
+            list(EXPORT_FORMATS.keys()),
+            key="export_format",
+            label_visibility="collapsed",
+            on_change=_clear_prepared_export
+        )
+
+    # Any new message invalidates a previously prepared export
+    signature = (export_format, get_signature())
+    prepared = st.session_state.get("prepared_export")
+
+    with export_col2:
+        if prepared and prepared["signature"] == signature:
+            extension, mimetype = EXPORT_FORMATS[export_format]
+            st.download_button(
+                label="📥 Download Chat History",
+                data=prepared["buffer"],
+                file_name=f"WisdomWeaver_Chat_History_{datetime.now().strftime('%Y-%m-%d')}.{extension}",
+                mime=mimetype,
+                on_click="ignore",
+                help="Download your entire chat conversation"
+            )
+        else:
+            st.button(
+                "📦 Prepare Chat Export",
+                help="Build a download of your entire chat conversation",
+                on_click=_prepare_export,
+                args=(get_messages, export_format, signature)
+            )
@@ -0,0 +1,250 @@
+"""
+Incremental chat transcript rendering with bounded history.
+
+Only the most recent messages are drawn in full and only a short window is
+kept in session state; every message is persisted through session_store and
+older turns are paged back from disk when the user opens the archive. Each
+message is turned into markdown once and reused on later reruns, and the
+transcript runs as a fragment so archive browsing reruns only this area.
+The concept filter reads the session store's keyword index and the verse
+concept index, and history search its full-text index; both are fragments,
+so using them reruns only that part of the sidebar.
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+import streamlit as st
+
+from explanation_store import parse_verse_question
+from keyword_tagger import get_verse_concepts
+from related_verses import get_related_verses
+from session_store import get_session_id, get_session_store, get_user_id
+
+RECENT_MESSAGES = 20         # drawn in full on every rerun
+MAX_ACTIVE_MESSAGES = 40     # kept in st.session_state.messages, the rest is on disk
+QUESTION_HISTORY_LIMIT = 5   # latest questions kept for the sidebar
+ARCHIVE_PAGE_SIZE = 20
+CONCEPT_MESSAGES = 10        # past messages listed for a concept
+CONCEPT_VERSES = 5           # verses listed for a concept
+SEARCH_RESULTS = 10
+RELATED_IN_ANSWER = 3        # related verses listed under an answer
+
+
+def init_chat_state():
+    """Load the user's recent history, question count and favorites into session state once."""
+    if st.session_state.get("chat_loaded"):
+        return
+    user_id = get_user_id()
+    store = get_session_store()
+    st.session_state.messages = store.recent(user_id, MAX_ACTIVE_MESSAGES)
+    st.session_state.archived_count = store.count(user_id) - len(st.session_state.messages)
+    st.session_state.question_count = store.count(user_id, role="user")
+    st.session_state.question_history = store.recent_questions(user_id, QUESTION_HISTORY_LIMIT)
+    st.session_state.favorite_verses = store.favorites(user_id)
+    st.session_state.chat_loaded = True
+
+
+def reset_chat_state():
+    get_session_store().clear_messages(get_user_id())
+    st.session_state.messages = []
+    st.session_state.archived_count = 0
+    st.session_state.question_count = 0
+    st.session_state.question_history = []
+    st.session_state.archive_visible = ARCHIVE_PAGE_SIZE
+
+
+def persist_message(message: Dict):
+    """Queue a finished message for the session store's background writer."""
+    get_session_store().append(get_user_id(), get_session_id(), message)
+
+
+def append_message(message: Dict):
+    """Append a message, dropping the oldest ones from memory once they are on disk."""
+    init_chat_state()
+    message.setdefault("created_at", time.time())
+    # Placeholders are persisted once their answer arrives
+    if not message.get("pending_job"):
+        persist_message(message)
+
+    messages = st.session_state.messages
+    messages.append(message)
+    if message["role"] == "user":
+        st.session_state.question_count += 1
+        st.session_state.question_history = (st.session_state.question_history + [message["content"]])[-QUESTION_HISTORY_LIMIT:]
+
+    overflow = len(messages) - MAX_ACTIVE_MESSAGES
+    if overflow > 0:
+        st.session_state.archived_count += overflow
+        del messages[:overflow]
+
+
+def _archived(limit=None) -> List[Dict]:
+    """Up to `limit` of the newest messages that are only on disk, oldest first."""
+    messages = st.session_state.messages
+    if not st.session_state.archived_count or not messages:
+        return []
+    return get_session_store().before(get_user_id(), messages[0]["created_at"], limit)
+
+
+def all_messages() -> List[Dict]:
+    """Archived and active messages, oldest first."""
+    init_chat_state()
+    return _archived() + st.session_state.messages
+
+
+def history_signature() -> Tuple:
+    """Changes whenever a message is stored or the history is cleared, without reading the archive."""
+    init_chat_state()
+    messages = st.session_state.messages
+    return get_session_store().count(get_user_id()), id(messages[-1]) if messages else None
+
+
+def message_markdown(message: Dict) -> str:
+    """Markdown for one message, built once and cached on the message itself."""
+    if message.get("pending_job"):
+        return "🧘 *Contemplating your question...*"
+
+    cached = message.get("_markdown")
+    if cached is not None:
+        return cached
+
+    if message["role"] == "user":
+        markdown = message["content"]
+    else:
+        parts = []
+        if message.get("verse_reference"):
+            parts.append(f"**📖 {message['verse_reference']}**")
+        if message.get('sanskrit'):
+            parts.append(f"*Sanskrit:* {message['sanskrit']}")
+        if message.get('translation'):
+            parts.append(f"**Translation:** {message['translation']}")
+        if message.get('explanation'):
+            parts.append("### 🧠 Understanding")
+            parts.append(message["explanation"])
+        if message.get('application'):
+            parts.append("### 🌟 Modern Application")
+            parts.append(message["application"])
+
+        # Show keywords if available
+        if message.get('keywords'):
+            parts.append("**Key Concepts:** " + " • ".join([f"`{kw}`" for kw in message['keywords']]))
+
+        # Cross-references from the precomputed related-verses graph
+        verse = parse_verse_question(message.get('verse_reference') or "")
+        related = get_related_verses().related(*verse, RELATED_IN_ANSWER) if verse else []
+        if related:
+            parts.append("**Related Verses:** " + " • ".join(f"Chapter {c}, Verse {v}" for c, v, _ in related))
+
+        # Show context values that were passed to LLM
+        context_parts = []
+        if message.get('theme'):
+            context_parts.append(f"🎯 {message['theme']}")
+        if message.get('mood'):
+            context_parts.append(f"🎭 {message['mood']}")
+        if message.get('emotional_state'):
+            context_parts.append(f"💭 {message['emotional_state']}")
+        if context_parts:
+            parts.append("**Response Context:** " + " • ".join(context_parts))
+
+        markdown = "\n\n".join(parts)
+
+    message["_markdown"] = markdown
+    return markdown
+
+
+def _render_message(message: Dict):
+    with st.chat_message(message["role"]):
+        st.markdown(message_markdown(message))
+
+
+def _show_more_archived():
+    st.session_state.archive_visible = st.session_state.get("archive_visible", ARCHIVE_PAGE_SIZE) + ARCHIVE_PAGE_SIZE
+
+
+@st.fragment
+def render_chat_history():
+    """Render recent messages in full and older ones behind a lazily expanded archive."""
+    init_chat_state()
+    messages = st.session_state.messages
+
+    older_active = max(0, len(messages) - RECENT_MESSAGES)
+    older_count = st.session_state.archived_count + older_active
+
+    if older_count:
+        show_older = st.toggle(f"🗂️ Show {older_count} earlier messages", key="show_archive")
+        if show_older:
+            # Newest older messages first, a page at a time; pages beyond the window come from disk
+            visible = min(older_count, st.session_state.get("archive_visible", ARCHIVE_PAGE_SIZE))
+            from_disk = visible - older_active
+            older = _archived(from_disk) if from_disk > 0 else []
+            older += messages[max(0, older_active - visible):older_active]
+            with st.container(border=True):
+                if visible < older_count:
+                    st.button(
+                        f"Load {min(ARCHIVE_PAGE_SIZE, older_count - visible)} more",
+                        key="archive_more",
+                        on_click=_show_more_archived
+                    )
+                for message in older:
+                    _render_message(message)
+
+    for message in messages[older_active:]:
+        _render_message(message)
+
+
+def _concept_summary(message: Dict) -> str:
+    if message["role"] == "user":
+        return f"❓ *{message['content']}*"
+    return f"📖 **{message.get('verse_reference') or 'Answer'}**: {', '.join(message.get('keywords', []))}"
+
+
+@st.fragment
+def render_concept_filter(verses_db: Dict):
+    """Pick a concept from the user's history and list the messages and verses tagged with it."""
+    store = get_session_store()
+    user_id = get_user_id()
+    counts = dict(store.keyword_counts(user_id))
+    verse_concepts = get_verse_concepts(verses_db)
+    concepts = list(counts) + sorted(c for c in verse_concepts.postings if c not in counts)
+    concept = st.selectbox(
+        "🏷️ Filter by Concept",
+        [None] + concepts,
+        format_func=lambda c: "Choose a concept" if c is None else f"{c} ({counts[c]})" if c in counts else c,
+        key="concept_filter",
+        help="Concepts in your questions and answers come first"
+    )
+    if concept is None:
+        return
+
+    messages = store.with_keyword(user_id, concept, CONCEPT_MESSAGES)
+    if messages:
+        st.markdown("**In your journey**")
+        for message in messages:
+            st.markdown(_concept_summary(message))
+    verses = verse_concepts.verses(concept, CONCEPT_VERSES)
+    if verses:
+        st.markdown(f"**Verses on {concept}** ({len(verse_concepts.verses(concept))})")
+        for chapter, verse in verses:
+            st.markdown(f"• Chapter {chapter}, Verse {verse}")
+
+
+@st.fragment
+def render_history_search():
+    """Full-text search over the user's stored questions and answers."""
+    query = st.text_input(
+        "🔍 Search your journey",
+        key="history_search",
+        placeholder='detach*  or  "without attachment"',
+        help='Finds messages containing every word; use "quotes" for a phrase and * for a prefix'
+    )
+    if not query.strip():
+        return
+    results = get_session_store().search(get_user_id(), query, SEARCH_RESULTS)
+    if not results:
+        st.caption("No matching messages")
+        return
+    for message, snippet in results:
+        label = "❓" if message["role"] == "user" else f"📖 {message.get('verse_reference') or 'Answer'}"
+        when = time.strftime("%b %d", time.localtime(message["created_at"])) if message.get("created_at") else ""
+        st.markdown(f"{label} · {when}\n\n{snippet}")
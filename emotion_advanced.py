@@ -6,9 +6,15 @@ import cv2
 import numpy as np
 import threading
 import time
+import logging
 from collections import deque
 import queue
 
+import metrics
+from profiling import profile
+
+logger = logging.getLogger(__name__)
+
 class AdvancedEmotionDetector:
     def __init__(self):
         # Load face detection models
@@ -36,7 +42,7 @@ class AdvancedEmotionDetector:
         self.processing_thread = threading.Thread(target=self._emotion_processing_loop, daemon=True)
         self.processing_thread.start()
         
-        print("Advanced Emotion Detector initialized!")
+        logger.info("Advanced Emotion Detector initialized")
 
     def _emotion_processing_loop(self):
         """Background thread for emotion processing"""
@@ -46,7 +52,8 @@ class AdvancedEmotionDetector:
                     face_roi = self.frame_queue.get(timeout=0.1)
                     
                     # Process emotion
-                    emotion, confidence = self._analyze_emotion_internal(face_roi)
+                    with profile("emotion"):
+                        emotion, confidence = self._analyze_emotion_internal(face_roi)
                     
                     if emotion:
                         # Add to history for smoothing
@@ -64,7 +71,8 @@ class AdvancedEmotionDetector:
             except queue.Empty:
                 continue
             except Exception as e:
-                print(f"Processing error: {e}")
+                logger.warning("Processing error: %s", e)
+                metrics.inc("wisdom_errors_total", stage="emotion_processing")
 
     def _analyze_emotion_internal(self, face_roi):
         """Internal emotion analysis method with improved neutral handling"""
@@ -76,13 +84,14 @@ class AdvancedEmotionDetector:
             # Enhance image quality
             face_roi = cv2.convertScaleAbs(face_roi, alpha=1.2, beta=10)
             
-            analysis = DeepFace.analyze(
-                face_roi,
-                actions=['emotion'],
-                enforce_detection=False,
-                silent=True,
-                detector_backend='opencv'  # Faster backend
-            )
+            with metrics.timer("wisdom_emotion_inference_seconds"):
+                analysis = DeepFace.analyze(
+                    face_roi,
+                    actions=['emotion'],
+                    enforce_detection=False,
+                    silent=True,
+                    detector_backend='opencv'  # Faster backend
+                )
             
             if isinstance(analysis, list):
                 emotion_data = analysis[0]['emotion']
@@ -105,25 +114,25 @@ class AdvancedEmotionDetector:
                             # Special handling for angry - needs >12% confidence
                             if confidence_score > 12.0:
                                 dominant_emotion = emotion_name
-                                print(f"Neutral confidence {neutral_confidence:.1f}% < 95%, using {emotion_name} ({confidence_score:.1f}%)")
+                                logger.debug("Neutral confidence %.1f%% < 95%%, using %s (%.1f%%)", neutral_confidence, emotion_name, confidence_score)
                                 break
                             else:
-                                print(f"Skipping angry ({confidence_score:.1f}%) - below 12% threshold")
+                                logger.debug("Skipping angry (%.1f%%) - below 12%% threshold", confidence_score)
                                 continue
                         elif emotion_name == 'sad':
                             # Special handling for sad - needs >2.5% confidence
                             if confidence_score > 2.5:
                                 dominant_emotion = emotion_name
-                                print(f"Neutral confidence {neutral_confidence:.1f}% < 95%, using {emotion_name} ({confidence_score:.1f}%)")
+                                logger.debug("Neutral confidence %.1f%% < 95%%, using %s (%.1f%%)", neutral_confidence, emotion_name, confidence_score)
                                 break
                             else:
-                                print(f"Skipping sad ({confidence_score:.1f}%) - below 2.5% threshold")
+                                logger.debug("Skipping sad (%.1f%%) - below 2.5%% threshold", confidence_score)
                                 continue
                         else:
                             # For other emotions, use >5% threshold
                             if confidence_score > 5.0:
                                 dominant_emotion = emotion_name
-                                print(f"Neutral confidence {neutral_confidence:.1f}% < 95%, using {emotion_name} ({confidence_score:.1f}%)")
+                                logger.debug("Neutral confidence %.1f%% < 95%%, using %s (%.1f%%)", neutral_confidence, emotion_name, confidence_score)
                                 break
             
             # Special handling for happy - only display if confidence > 70%
@@ -138,7 +147,7 @@ class AdvancedEmotionDetector:
                     for emotion_name, confidence_score in sorted_emotions:
                         if emotion_name != 'happy' and confidence_score > 5.0:
                             dominant_emotion = emotion_name
-                            print(f"Happy confidence {happy_confidence:.1f}% <= 70%, using {emotion_name} ({confidence_score:.1f}%)")
+                            logger.debug("Happy confidence %.1f%% <= 70%%, using %s (%.1f%%)", happy_confidence, emotion_name, confidence_score)
                             break
             
             return dominant_emotion, emotion_data
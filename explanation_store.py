@@ -0,0 +1,133 @@
+"""
+Local store of pre-generated verse explanations.
+
+One row per (chapter, verse, theme) holding the structured response as
+zlib-compressed JSON in a SQLite table keyed by that triple, filled offline
+by batch_explain.py and consulted by GitaGeminiBot.get_response before it
+calls the model for a plain "explain this verse" question. Questions that ask
+something more about the verse ("how does it apply to my exam stress?") go
+to the model.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Set, Tuple
+
+EXPLANATION_STORE_PATH = os.getenv(
+    "EXPLANATION_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "explanations.db")
+)
+
+# "Chapter 2, Verse 2.47", "Chapter 1, Verse 1.4 – 1.6", "Chapter 2 Verse 47"
+VERSE_QUESTION_PATTERN = re.compile(
+    r'chapter\s+(\d+)\s*,?\s*verse\s+((?:\d+\.)?\d+(?:\s*[–-]\s*(?:\d+\.)?\d+)?)',
+    re.IGNORECASE
+)
+
+# Words a question may have besides the verse reference and still be a plain request to explain the verse,
+# as asked by the "Ask about this verse" button and the random-verse quick action
+PLAIN_QUESTION_WORDS = frozenset((
+    "please", "explain", "share", "tell", "me", "about", "what", "is", "does", "mean", "meaning", "the",
+    "wisdom", "teaching", "from", "of", "and", "its", "practical", "application", "in", "modern", "life",
+))
+_WORD = re.compile(r"[a-z]+|\d+")
+
+# Answer fields kept in the store; per-request metadata is added on lookup
+STORED_FIELDS = ("verse_reference", "sanskrit", "translation", "explanation", "application", "keywords")
+
+
+def parse_verse_question(question: str) -> Optional[Tuple[int, str]]:
+    """Return (chapter, verse key) for questions about one specific verse."""
+    match = VERSE_QUESTION_PATTERN.search(question)
+    if not match:
+        return None
+    chapter = int(match.group(1))
+    verse = match.group(2)
+    if '.' not in verse.split('–')[0].split('-')[0]:
+        verse = f"{chapter}.{verse}"
+    verse = re.sub(r'\s*[–-]\s*', ' – ', verse)
+    return chapter, verse
+
+
+def is_plain_verse_question(question: str) -> bool:
+    """True when the question only asks to explain the verse it names."""
+    match = VERSE_QUESTION_PATTERN.search(question)
+    if not match:
+        return False
+    rest = question[:match.start()] + " " + question[match.end():]
+    return all(word in PLAIN_QUESTION_WORDS for word in _WORD.findall(rest.lower()))
+
+
+class ExplanationStore:
+    def __init__(self, path: str = EXPLANATION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                " chapter INTEGER NOT NULL,"
+                " verse TEXT NOT NULL,"
+                " theme TEXT NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (chapter, verse, theme)"
+                ") WITHOUT ROWID"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, chapter: int, verse: str, theme: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT payload FROM explanations WHERE chapter = ? AND verse = ? AND theme = ?",
+            (chapter, verse, theme)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, chapter: int, verse: str, theme: str, response: Dict):
+        payload = {field: response.get(field, "") for field in STORED_FIELDS}
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO explanations (chapter, verse, theme, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (chapter, verse, theme, blob, time.time())
+            )
+
+    def keys(self) -> Set[Tuple[int, str, str]]:
+        return set(self._connect().execute("SELECT chapter, verse, theme FROM explanations"))
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+
+    def lookup(self, question: str, theme: Optional[str]) -> Optional[Dict]:
+        """Stored explanation for a plain question about one verse, or None."""
+        if not theme or not is_plain_verse_question(question):
+            return None
+        parsed = parse_verse_question(question)
+        if parsed is None:
+            return None
+        return self.get(parsed[0], parsed[1], theme)
+
+
+_store: Optional[ExplanationStore] = None
+
+
+def get_explanation_store() -> Optional[ExplanationStore]:
+    """Shared store, or None until batch_explain.py has created it."""
+    global _store
+    if _store is None and os.path.exists(EXPLANATION_STORE_PATH):
+        _store = ExplanationStore(EXPLANATION_STORE_PATH)
+    return _store
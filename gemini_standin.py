@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini generate-content API.
+
+Answers POST /v1beta/models/<model>:generateContent and
+:streamGenerateContent (server-sent events with ?alt=sse, as the REST client
+requests, or a JSON array otherwise) with canned responses in the
+"Chapter X, Verse Y / Sanskrit / Translation / Explanation / Application"
+layout that GitaGeminiBot.format_response parses, so tools can be exercised
+without spending API quota.
+
+Latency follows a configurable distribution, and errors can be injected:
+429 throttling (randomly or above a concurrency cap, with Retry-After) and
+500/503 server errors. GET /stats returns request counters. Point the bot
+at it with
+
+    python gemini_standin.py --port 8765 --latency lognormal:800:0.5 --error-rate 0.05
+    GEMINI_API_ENDPOINT=http://localhost:8765 python batch_explain.py ...
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+GITA_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bhagavad_gita_verses.csv")
+DEFAULT_VERSE = "2.47"
+STREAM_CHUNKS = 4
+# Prompts from translation_store.translation_prompt: language, then the English text after a blank line
+TRANSLATION_REQUEST = re.compile(r"^Translate [^\n]*? into ([^.\n]+)\.[^\n]*\n\n(.*)$", re.DOTALL)
+
+
+def _load_translations() -> Dict[str, str]:
+    with open(GITA_CSV_PATH, newline="", encoding="utf-8") as f:
+        return {row["chapter_verse"]: row["translation"] for row in csv.DictReader(f)}
+
+
+def latency_sampler(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Parse a latency distribution into a function returning seconds.
+
+    fixed:MS, uniform:LOW_MS:HIGH_MS, normal:MEAN_MS:STDDEV_MS or
+    lognormal:MEDIAN_MS:SIGMA; a bare number is fixed.
+    """
+    kind, _, rest = spec.partition(":")
+    if not rest:
+        kind, rest = "fixed", kind
+    values = [float(v) for v in rest.split(":")]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        return lambda: values[0] * rng.lognormvariate(0, values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+class StandinModel:
+    """Builds canned answers, injects latency and errors, and keeps request counters."""
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, max_concurrent: int = 0,
+                 retry_after_sec: float = 1.0, latency: Optional[str] = None,
+                 server_error_rate: float = 0.0, seed: int = 0):
+        self._random = random.Random(seed)
+        self.sample_latency = latency_sampler(latency or f"fixed:{latency_ms}", self._random)
+        self.error_rate = error_rate                # fraction of requests answered with 429
+        self.server_error_rate = server_error_rate  # fraction answered with 500/503
+        self.max_concurrent = max_concurrent        # 429 above this many requests in flight (0 = unlimited)
+        self.retry_after_sec = retry_after_sec
+        self.translations = _load_translations()
+        self.requests = 0
+        self.streamed = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def answer(self, prompt: str) -> str:
+        translation = TRANSLATION_REQUEST.match(prompt)
+        if translation:
+            # batch_translate.py: a tagged copy of the English text stands in for the translation
+            return f"[{translation.group(1)}] {translation.group(2).strip()}"
+        # The question comes last; earlier mentions belong to conversation history
+        matches = re.findall(r'chapter\s+(\d+)\s*,?\s*verse\s+((?:\d+\.)?\d+)', prompt, re.IGNORECASE)
+        if matches:
+            chapter, number = matches[-1]
+            verse = number if '.' in number else f"{chapter}.{number}"
+        else:
+            verse = DEFAULT_VERSE
+        if verse not in self.translations:
+            verse = DEFAULT_VERSE
+        translation = self.translations[verse]
+        chapter, number = verse.split('.', 1)
+        return (
+            f"Chapter {chapter}, Verse {number}\n"
+            f"Sanskrit: [stand-in] śloka {verse}\n"
+            f"Translation: {translation}\n"
+            f"Explanation: This verse teaches steady action, devotion and wisdom; act with duty and detachment.\n"
+            f"Application: Practice this teaching today with patience, service and inner peace.\n"
+        )
+
+    def admit(self) -> Optional[int]:
+        """Count a request in; return an injected error status, or None to serve it."""
+        with self._lock:
+            self.requests += 1
+            over_capacity = self.max_concurrent and self.in_flight >= self.max_concurrent
+            draw = self._random.random()
+            if over_capacity or draw < self.error_rate:
+                self.throttled += 1
+                return 429
+            if draw < self.error_rate + self.server_error_rate:
+                self.server_errors += 1
+                return self._random.choice((500, 503))
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return None
+
+    def done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def error_body(self, status: int) -> Dict:
+        if status == 429:
+            return {"error": {
+                "code": 429,
+                "message": "Resource has been exhausted (e.g. check quota).",
+                "status": "RESOURCE_EXHAUSTED",
+                "details": [{
+                    "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                    "retryDelay": f"{self.retry_after_sec:g}s"
+                }]
+            }}
+        if status == 503:
+            return {"error": {"code": 503, "message": "The model is overloaded. Please try again later.", "status": "UNAVAILABLE"}}
+        return {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "throttled": self.throttled,
+                "server_errors": self.server_errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight
+            }
+
+    @staticmethod
+    def prompt_text(body: Dict) -> str:
+        return " ".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+
+    @staticmethod
+    def _response(text: str, prompt: str, finished: bool = True) -> Dict:
+        candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4
+            }
+        }
+
+    def generate(self, body: Dict) -> Dict:
+        prompt = self.prompt_text(body)
+        time.sleep(self.sample_latency())
+        return self._response(self.answer(prompt), prompt)
+
+    def generate_stream(self, body: Dict) -> List[Dict]:
+        """The answer split into response chunks, the last one carrying finishReason."""
+        with self._lock:
+            self.streamed += 1
+        prompt = self.prompt_text(body)
+        lines = self.answer(prompt).splitlines(keepends=True)
+        size = max(1, -(-len(lines) // STREAM_CHUNKS))
+        parts = ["".join(lines[i:i + size]) for i in range(0, len(lines), size)]
+        return [self._response(part, prompt, finished=i == len(parts) - 1) for i, part in enumerate(parts)]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    model: StandinModel = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: Dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, body: Dict, sse: bool):
+        # Half the sampled latency before the first chunk, the rest spread over the others
+        chunks = self.model.generate_stream(body)
+        delay = self.model.sample_latency()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(delay / 2)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(delay / 2 / (len(chunks) - 1))
+            if sse:
+                data = f"data: {json.dumps(chunk)}\r\n\r\n"
+            else:
+                data = ("[" if i == 0 else ",\r\n") + json.dumps(chunk) + ("]" if i == len(chunks) - 1 else "")
+            self._write_chunk(data.encode("utf-8"))
+        self._write_chunk(b"")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path, _, query = self.path.partition("?")
+        streaming = path.endswith(":streamGenerateContent")
+        if not (streaming or path.endswith(":generateContent")):
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown method {path}", "status": "NOT_FOUND"}})
+            return
+
+        error = self.model.admit()
+        if error is not None:
+            headers = {"Retry-After": f"{self.model.retry_after_sec:g}"} if error == 429 else None
+            self._send_json(error, self.model.error_body(error), headers)
+            return
+        try:
+            if streaming:
+                self._stream(body, sse="alt=sse" in query)
+            else:
+                self._send_json(200, self.model.generate(body))
+        finally:
+            self.model.done()
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.model.stats())
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, **model_options) -> ThreadingHTTPServer:
+    """Create (but do not start) a stand-in server; port 0 picks a free port."""
+    handler = type("BoundStandinHandler", (StandinHandler,), {"model": StandinModel(**model_options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**options) -> ThreadingHTTPServer:
+    """Start a stand-in server on a background thread; the URL is server.url."""
+    server = make_server(port=0, **options)
+    server.url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_model_arguments(parser: argparse.ArgumentParser):
+    """Stand-in behaviour options, shared with load_test.py."""
+    parser.add_argument("--latency", default="fixed:0",
+                        help="latency distribution: fixed:MS, uniform:LO:HI, normal:MEAN:SD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="fraction of requests answered with 500/503")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="429 above this many requests in flight")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429 responses")
+    parser.add_argument("--seed", type=int, default=0, help="seed for latency and error sampling")
+
+
+def model_options(args: argparse.Namespace) -> Dict:
+    return {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "server_error_rate": args.server_error_rate,
+        "max_concurrent": args.max_concurrent,
+        "retry_after_sec": args.retry_after,
+        "seed": args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generate-content API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_model_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, **model_options(args))
+    print(f"🕉️  Gemini stand-in listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
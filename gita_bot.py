@@ -0,0 +1,360 @@
+"""
+Gemini-backed Bhagavad Gita question answering.
+
+Kept apart from the Streamlit UI so command-line tools and servers can use
+the bot without loading the webcam and emotion-detection stack.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import google.generativeai as genai
+import pandas as pd
+import streamlit as st
+
+import metrics
+from admission_control import BACKGROUND, INTERACTIVE, Overloaded, backoff_delay, get_admission_controller, is_throttled
+from answer_warmer import is_quick_action_question
+from explanation_store import get_explanation_store
+from keyword_tagger import get_keyword_tagger
+from offline_answer import get_offline_engine
+from prompt_builder import build_prompt, estimate_tokens
+from request_coalescer import get_request_coalescer, request_key
+from translation_store import localize_response, translation_prompt
+
+logger = logging.getLogger(__name__)
+
+GITA_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bhagavad_gita_verses.csv")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Alternative API endpoint, e.g. http://localhost:8765 for the local stand-in (gemini_standin.py)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+
+class GitaGeminiBot:
+    def __init__(self, api_key: str, api_endpoint: str = GEMINI_API_ENDPOINT):
+        """Initialize the Gita bot with Gemini API and enhanced features."""
+        if api_endpoint:
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": api_endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        self.verses_db = self.load_gita_database()
+        self.themes = {
+            'Life Guidance': 'guidance for life decisions and personal growth',
+            'Dharma & Ethics': 'understanding of duty, righteousness, and moral conduct',
+            'Spiritual Growth': 'spiritual development and self-realization',
+            'Relationships': 'wisdom for interpersonal relationships and social harmony',
+            'Work & Career': 'guidance for professional life and service',
+            'Inner Peace': 'achieving mental tranquility and emotional balance',
+            'Devotion & Love': 'understanding devotion, love, and surrender'
+        }
+
+    @st.cache_data
+    def load_gita_database(_self) -> Dict:
+        """Load the Bhagavad Gita dataset with caching for better performance."""
+        try:
+            verses_df = pd.read_csv(GITA_CSV_PATH)
+        except FileNotFoundError:
+            st.error(f"Gita database file '{GITA_CSV_PATH}' not found. Please ensure the file is in the correct location.")
+            st.stop()
+        except Exception as e:
+            st.error(f"Error loading Gita database: {str(e)}")
+            st.stop()
+
+        verses_db = {}
+        for _, row in verses_df.iterrows():
+            chapter = f"chapter_{row['chapter_number']}"
+            if chapter not in verses_db:
+                verses_db[chapter] = {
+                    "title": row['chapter_title'],
+                    "verses": {},
+                    "summary": _self._get_chapter_summary(row['chapter_number'])
+                }
+            verse_num = str(row['chapter_verse'])
+            verses_db[chapter]["verses"][verse_num] = {
+                "translation": row['translation']
+            }
+        return verses_db
+
+    def format_response(self, raw_text: str) -> Dict:
+        """Enhanced response formatting with better error handling."""
+        try:
+            # Try JSON parsing first
+            if raw_text.strip().startswith('{') and raw_text.strip().endswith('}'):
+                try:
+                    return json.loads(raw_text)
+                except json.JSONDecodeError:
+                    pass
+
+            # Enhanced text parsing
+            response = {
+                "verse_reference": "",
+                "sanskrit": "",
+                "translation": "",
+                "explanation": "",
+                "application": "",
+                "keywords": []
+            }
+
+            lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
+            current_section = None
+            
+            for line in lines:
+                line_lower = line.lower()
+                
+                # Better pattern matching
+                if re.search(r'chapter\s+\d+.*verse\s+\d+', line_lower):
+                    response["verse_reference"] = line
+                elif line_lower.startswith(('sanskrit:', 'verse:')):
+                    response["sanskrit"] = re.sub(r'^(sanskrit:|verse:)\s*', '', line, flags=re.IGNORECASE)
+                elif line_lower.startswith('translation:'):
+                    response["translation"] = re.sub(r'^translation:\s*', '', line, flags=re.IGNORECASE)
+                elif line_lower.startswith(('explanation:', 'meaning:')):
+                    current_section = "explanation"
+                    response["explanation"] = re.sub(r'^(explanation:|meaning:)\s*', '', line, flags=re.IGNORECASE)
+                elif line_lower.startswith(('application:', 'practical:')):
+                    current_section = "application"
+                    response["application"] = re.sub(r'^(application:|practical:)\s*', '', line, flags=re.IGNORECASE)
+                elif current_section and line:
+                    response[current_section] += " " + line
+
+            # Extract keywords for better searchability
+            text_content = f"{response['translation']} {response['explanation']} {response['application']}"
+            response["keywords"] = self._extract_keywords(text_content)
+
+            return response
+
+        except Exception as e:
+            logger.exception("Error formatting response")
+            return {
+                "verse_reference": "Error in parsing",
+                "sanskrit": "",
+                "translation": raw_text[:500] + "..." if len(raw_text) > 500 else raw_text,
+                "explanation": "Please try rephrasing your question.",
+                "application": "",
+                "keywords": []
+            }
+
+    def _get_chapter_summary(self, chapter_num: int) -> str:
+        """Get a brief summary for each chapter."""
+        summaries = {
+            1: "Arjuna's moral dilemma and the beginning of Krishna's counsel",
+            2: "The fundamental teachings on the soul, duty, and the path of knowledge",
+            3: "The path of selfless action and karma yoga",
+            4: "Divine knowledge, incarnation, and the evolution of dharma",
+            5: "The harmony between action and renunciation",
+            6: "The practice of meditation and self-control",
+            7: "Knowledge of the Absolute and devotion to the Divine",
+            8: "The imperishable Brahman and the path at the time of death",
+            9: "Royal knowledge and the most confidential wisdom",
+            10: "Divine manifestations and infinite glories",
+            11: "The cosmic vision of the universal form",
+            12: "The path of devotion and love",
+            13: "The field of activity and the knower of the field",
+            14: "The three modes of material nature",
+            15: "The supreme person and the cosmic tree",
+            16: "Divine and demonic natures in human beings",
+            17: "The three divisions of faith and their characteristics",
+            18: "The perfection of renunciation and complete surrender"
+        }
+        return summaries.get(chapter_num, "Eternal wisdom and guidance")
+
+    def format_response(self, raw_text: str) -> Dict:
+        """Enhanced response formatting with better error handling."""
+        try:
+            # Try JSON parsing first
+            if raw_text.strip().startswith('{') and raw_text.strip().endswith('}'):
+                try:
+                    return json.loads(raw_text)
+                except json.JSONDecodeError:
+                    pass
+
+            # Enhanced text parsing
+            response = {
+                "verse_reference": "",
+                "sanskrit": "",
+                "translation": "",
+                "explanation": "",
+                "application": "",
+                "keywords": []
+            }
+
+            lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
+            current_section = None
+            
+            for line in lines:
+                line_lower = line.lower()
+                
+                # Better pattern matching
+                if re.search(r'chapter\s+\d+.*verse\s+\d+', line_lower):
+                    response["verse_reference"] = line
+                elif line_lower.startswith(('sanskrit:', 'verse:')):
+                    response["sanskrit"] = re.sub(r'^(sanskrit:|verse:)\s*', '', line, flags=re.IGNORECASE)
+                elif line_lower.startswith('translation:'):
+                    response["translation"] = re.sub(r'^translation:\s*', '', line, flags=re.IGNORECASE)
+                elif line_lower.startswith(('explanation:', 'meaning:')):
+                    current_section = "explanation"
+                    response["explanation"] = re.sub(r'^(explanation:|meaning:)\s*', '', line, flags=re.IGNORECASE)
+                elif line_lower.startswith(('application:', 'practical:')):
+                    current_section = "application"
+                    response["application"] = re.sub(r'^(application:|practical:)\s*', '', line, flags=re.IGNORECASE)
+                elif current_section and line:
+                    response[current_section] += " " + line
+
+            # Extract keywords for better searchability
+            text_content = f"{response['translation']} {response['explanation']} {response['application']}"
+            response["keywords"] = self._extract_keywords(text_content)
+
+            return response
+
+        except Exception as e:
+            logger.exception("Error formatting response")
+            return {
+                "verse_reference": "Error in parsing",
+                "sanskrit": "",
+                "translation": raw_text[:500] + "..." if len(raw_text) > 500 else raw_text,
+                "explanation": "Please try rephrasing your question.",
+                "application": "",
+                "keywords": []
+            }
+
+    def _extract_keywords(self, text: str) -> List[str]:
+        """The response's most salient Gita concepts."""
+        with metrics.timer("wisdom_keyword_extraction_seconds"):
+            return get_keyword_tagger().tag(text)
+
+    def _generate_text(self, prompt: str, prompt_tokens: int, priority: int, session_id: str = None) -> str:
+        """Call the model through the admission controller, backing off between retries."""
+        controller = get_admission_controller()
+        max_retries = 3
+        for attempt in range(max_retries):
+            controller.acquire(priority, session_id)
+            started = time.monotonic()
+            outcome = "error"
+            try:
+                response = self.model.generate_content(prompt)
+                outcome = "ok"
+            except Exception as e:
+                if is_throttled(e):
+                    outcome = "throttled"
+                if attempt == max_retries - 1:
+                    raise
+                delay = backoff_delay(attempt, e)
+            finally:
+                elapsed = time.monotonic() - started
+                controller.release(session_id, elapsed, outcome)
+                metrics.observe("wisdom_model_call_seconds", elapsed, outcome=outcome)
+
+            if outcome == "ok":
+                if response.text:
+                    break
+                delay = backoff_delay(attempt, ValueError("empty response"))
+            logger.info("Model call failed (%s), retrying in %.1fs", outcome, delay)
+            metrics.inc("wisdom_model_retries_total", reason=outcome if outcome != "ok" else "empty")
+            time.sleep(delay)
+
+        if not response.text:
+            raise ValueError("Empty response received from the model")
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.prompt_token_count:
+            logger.info("Prompt tokens: %d reported, ~%d estimated", usage.prompt_token_count, prompt_tokens)
+        return response.text
+
+    def translate_verse(self, verse: str, text: str, language: str, priority: int = BACKGROUND) -> str:
+        """Model translation of a verse's English text; run offline by batch_translate.py."""
+        prompt = translation_prompt(verse, language, text)
+        return self._generate_text(prompt, estimate_tokens(prompt), priority).strip()
+
+    def local_response(self, question: str, theme: str = None, mood: str = None, emotional_state: str = None,
+                       language: str = None) -> Dict:
+        """Answer without the model, from the explanation store or the local verse index."""
+        response = self._stored_response(question, theme, mood, emotional_state)
+        if response is None:
+            response = get_offline_engine(self.verses_db).answer(question, theme, mood, emotional_state)
+            metrics.inc("wisdom_answer_source_total", source=response["source"])
+            self._add_metadata(response, theme, mood, emotional_state)
+        return localize_response(response, language)
+
+    def _stored_response(self, question: str, theme: str = None, mood: str = None,
+                         emotional_state: str = None) -> Optional[Dict]:
+        """batch_explain.py's answer to a plain "explain this verse" question, or None."""
+        store = get_explanation_store()
+        stored = store.lookup(question, theme) if store is not None else None
+        if not stored:
+            return None
+        stored["source"] = "verse_store"
+        metrics.inc("wisdom_answer_source_total", source="verse_store")
+        return self._add_metadata(stored, theme, mood, emotional_state)
+
+    @staticmethod
+    def _add_metadata(response: Dict, theme: str = None, mood: str = None, emotional_state: str = None) -> Dict:
+        response.update({
+            "timestamp": datetime.now().isoformat(),
+            "theme": theme,
+            "mood": mood,
+            "emotional_state": emotional_state
+        })
+        return response
+
+    async def get_response(self, question: str, theme: str = None, mood: str = None, emotional_state: str = None,
+                           history: List[Dict] = None, priority: int = INTERACTIVE, session_id: str = None,
+                           language: str = None) -> Dict:
+        """Enhanced response generation with theme, mood, emotional state and conversation context."""
+        response = await self._get_response(question, theme, mood, emotional_state, history, priority, session_id)
+        # Verse text in the reader's language comes from the translation store, not another model call
+        return localize_response(response, language)
+
+    async def _get_response(self, question: str, theme: str = None, mood: str = None, emotional_state: str = None,
+                            history: List[Dict] = None, priority: int = INTERACTIVE, session_id: str = None) -> Dict:
+        # Plain "explain this verse" questions are answered from batch_explain.py's store; follow-ups go to the model
+        stored = self._stored_response(question, theme, mood, emotional_state)
+        if stored is not None:
+            return stored
+
+        try:
+            # Quick-action questions are answered without the conversation, so they are the same for every session
+            standalone = not history or is_quick_action_question(question)
+
+            # Instructions, context, conversation so far and the question within the token budget
+            with metrics.timer("wisdom_prompt_build_seconds"):
+                prompt, prompt_tokens = build_prompt(
+                    question,
+                    self.themes.get(theme) if theme else None,
+                    mood,
+                    emotional_state,
+                    None if standalone else history
+                )
+            metrics.observe("wisdom_prompt_tokens", prompt_tokens)
+
+            try:
+                if standalone:
+                    # The same question in the same context already in flight from another session shares its call
+                    text = get_request_coalescer().run(request_key(question, theme, mood, emotional_state),
+                                                       self._generate_text, prompt, prompt_tokens, priority, session_id)
+                else:
+                    text = self._generate_text(prompt, prompt_tokens, priority, session_id)
+            except Overloaded as e:
+                logger.warning("Shedding model call (%s), answering locally", e)
+                metrics.inc("wisdom_model_calls_shed_total")
+                return self.local_response(question, theme, mood, emotional_state)
+
+            with metrics.timer("wisdom_format_response_seconds"):
+                formatted_response = self.format_response(text)
+            metrics.inc("wisdom_answer_source_total", source="model")
+            return self._add_metadata(formatted_response, theme, mood, emotional_state)
+
+        except Exception as e:
+            # Runs on the job queue, outside any script run: the UI shows "_error" when the answer is collected
+            logger.exception("Error getting response")
+            metrics.inc("wisdom_errors_total", stage="get_response")
+            # Still answer from the local verse index; flagged so it is not cached as a model answer
+            fallback = self.local_response(question, theme, mood, emotional_state)
+            fallback["error"] = True
+            fallback["_error"] = str(e)
+            return fallback
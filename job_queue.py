@@ -0,0 +1,141 @@
+"""
+Background job queue for model calls.
+
+Questions are submitted to a process-wide worker pool and return a job id
+straight away, so the Streamlit script thread never waits on Gemini. The UI
+polls job status and fills the answer in when it is ready. Each session may
+only have a limited number of jobs in flight.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+SESSION_JOB_LIMIT = int(os.getenv("SESSION_JOB_LIMIT", "2"))
+FINISHED_JOB_TTL_SEC = 600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class QueueLimitError(Exception):
+    """Raised when a session already has the maximum number of jobs in flight."""
+
+
+class Job:
+    def __init__(self, job_id: str, session_id: str, label: str):
+        self.id = job_id
+        self.session_id = session_id
+        self.label = label
+        self.status = QUEUED
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.future = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = JOB_WORKERS, session_limit: int = SESSION_JOB_LIMIT):
+        self.session_limit = session_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def submit(self, session_id: str, fn: Callable, *args, label: str = "", **kwargs) -> str:
+        """Run fn(*args, **kwargs) on the pool; coroutine functions are run to completion."""
+        with self._lock:
+            self._prune()
+            in_flight = [job for job in self._jobs.values() if job.session_id == session_id and not job.finished]
+            if len(in_flight) >= self.session_limit:
+                raise QueueLimitError(
+                    f"{len(in_flight)} questions already in progress (limit {self.session_limit})"
+                )
+            job = Job(f"job-{next(self._ids)}", session_id, label)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.debug("Submitted %s for session %s", job.id, session_id)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        if job.status == CANCELLED:
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            result = fn(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = asyncio.run(result)
+            if job.status != CANCELLED:
+                job.result = result
+                job.status = DONE
+        except BaseException as e:
+            if job.status != CANCELLED:
+                job.error = e
+                job.status = FAILED
+                logger.warning("Job %s failed: %s", job.id, e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job. A running job finishes in the background but its result is discarded."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.future.cancel()
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        logger.info("Cancelled %s for session %s", job_id, job.session_id)
+        return True
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def pending(self, session_id: str) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.session_id == session_id and not job.finished]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _prune(self):
+        """Drop finished jobs nobody collected. Caller holds the lock."""
+        cutoff = time.time() - FINISHED_JOB_TTL_SEC
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue shared by all sessions."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
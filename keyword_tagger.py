@@ -0,0 +1,307 @@
+"""
+Concept tagging for answers, questions and verses.
+
+Text is split into words and each word is reduced to a lemma by a few
+suffix rules (duties -> duty, serving/served/serve -> serv), so tags match
+whole words in any inflection: "love" no longer matches "glove" and "action"
+no longer matches "inaction". Every surface form of every concept in the
+vocabulary, including multi-word synonyms ("karma yoga", "non-attachment"),
+is compiled once into an Aho-Corasick automaton over lemmas, and a text is
+tagged in a single pass over its words. Overlapping matches keep the longest
+one, so "selfless service" counts as selfless action rather than service.
+
+Concepts are ranked by salience: concept weight (generic words such as
+"action" and "mind" weigh less than "moksha") times a sublinear count, with
+a small bonus for concepts that appear early.
+
+The vocabulary is CONCEPTS plus, optionally, a JSON file named by
+KEYWORD_VOCABULARY_PATH mapping concept names to a list of synonyms or to
+{"synonyms": [...], "weight": 1.0}.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import defaultdict, deque
+from functools import lru_cache
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from verse_refs import chapter_number
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_VOCABULARY_PATH = os.getenv("KEYWORD_VOCABULARY_PATH")
+MAX_KEYWORDS = 5            # tags kept on an answer
+DEFAULT_WEIGHT = 1.0
+WORD_CACHE_SIZE = 1 << 17   # distinct words remembered by a tagger
+EARLY_BONUS = 0.25          # added for a concept mentioned at the very start, less further in
+
+# Concept -> (synonyms, weight); the concept name is always one of its own surface forms
+CONCEPTS: Dict[str, Tuple[Tuple[str, ...], float]] = {
+    "dharma": (("dharmic", "svadharma", "sacred law"), 1.0),
+    "karma": (("karmic",), 1.0),
+    "selfless action": (("karma yoga", "nishkama karma", "action without attachment",
+                         "selfless service", "selfless work", "fruits of action"), 1.2),
+    "moksha": (("liberation", "liberated", "mukti", "nirvana", "release from rebirth"), 1.2),
+    "yoga": (("yogi", "yogin", "yogic"), 0.9),
+    "devotion": (("bhakti", "devotee", "devote", "devotional", "worship"), 1.0),
+    "meditation": (("meditate", "dhyana", "contemplation", "contemplate"), 1.0),
+    "duty": (("obligation", "responsibility"), 1.0),
+    "righteousness": (("righteous", "virtue", "virtuous"), 0.9),
+    "soul": (("atman", "atma", "jivatma", "eternal self", "embodied self", "indweller"), 1.0),
+    "brahman": (("supreme spirit", "imperishable", "absolute reality"), 1.1),
+    "divine": (("divinity", "god", "godhead", "supreme lord"), 0.7),
+    "surrender": (("take refuge", "refuge", "surrendered"), 1.1),
+    "detachment": (("detached", "non-attachment", "nonattachment", "unattached", "vairagya", "dispassion",
+                    "without attachment"), 1.2),
+    "attachment": (("attached", "clinging"), 0.9),
+    "desire": (("craving", "lust", "kama", "yearning"), 0.9),
+    "wisdom": (("wise", "sage", "discernment", "discrimination"), 0.8),
+    "knowledge": (("jnana", "knower", "gyan"), 0.8),
+    "action": (("act", "deed", "activity"), 0.6),
+    "renunciation": (("renounce", "renunciate", "sannyasa", "sanyasa", "tyaga", "relinquishment"), 1.1),
+    "service": (("seva", "serving others", "service to others"), 0.9),
+    "sacrifice": (("yajna", "oblation", "fire sacrifice"), 1.0),
+    "love": (("loving", "beloved", "prema"), 0.8),
+    "compassion": (("mercy", "compassionate", "kind-hearted"), 1.0),
+    "peace": (("peaceful", "tranquility", "tranquillity", "serenity", "shanti", "calm", "stillness"), 0.9),
+    "equanimity": (("even-minded", "equal-minded", "evenness of mind", "balanced mind", "steady mind",
+                    "same in pleasure and pain", "samatva"), 1.2),
+    "self-control": (("self-restraint", "self-discipline", "discipline", "restraint", "control of the senses",
+                      "mastery of the senses", "subdued senses"), 1.1),
+    "faith": (("shraddha", "trust"), 1.0),
+    "courage": (("fearless", "fearlessness", "valor", "valour", "bravery"), 1.0),
+    "fear": (("afraid", "dread", "anxiety", "anxious"), 0.9),
+    "anger": (("wrath", "rage", "fury"), 1.0),
+    "grief": (("sorrow", "lament", "lamentation", "mourn", "despair"), 1.0),
+    "gunas": (("guna", "sattva", "rajas", "tamas", "modes of nature", "three modes"), 1.2),
+    "mind": (("intellect", "buddhi", "manas"), 0.6),
+    "truth": (("satya", "reality"), 0.9),
+}
+
+_WORD = re.compile(r"\w+")
+# Ordered so that the longest suffix is tried first
+_SUFFIXES = (("ness", ""), ("ies", "y"), ("ied", "y"), ("ings", ""), ("ing", ""), ("ed", ""), ("es", ""), ("s", ""))
+_KEEP_FINAL_S = ("ss", "us", "is")
+_DOUBLING_SUFFIXES = ("ing", "ings", "ed")   # controlling, worshipped: the consonant before them may be doubled
+
+
+@lru_cache(maxsize=1 << 16)
+def lemma(word: str) -> str:
+    """Crude lemma of a lowercase word; only has to map inflections of one word to the same string.
+
+    A consonant doubled before -ing/-ed is kept here ("controll"); KeywordTagger undoubles it
+    against its vocabulary.
+    """
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == "s" and word.endswith(_KEEP_FINAL_S):
+                break
+            word = word[:-len(suffix)] + replacement
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def lemmas(text: str) -> List[str]:
+    return [lemma(word) for word in _WORD.findall(text.lower())]
+
+
+def load_vocabulary(path: Optional[str] = KEYWORD_VOCABULARY_PATH) -> Dict[str, Tuple[Tuple[str, ...], float]]:
+    """CONCEPTS, extended or overridden by the JSON vocabulary file when one is configured."""
+    vocabulary = dict(CONCEPTS)
+    if not path:
+        return vocabulary
+    try:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring keyword vocabulary %s: %s", path, e)
+        return vocabulary
+    for concept, entry in extra.items():
+        if isinstance(entry, dict):
+            vocabulary[concept.lower()] = (tuple(entry.get("synonyms", ())), float(entry.get("weight", DEFAULT_WEIGHT)))
+        else:
+            vocabulary[concept.lower()] = (tuple(entry), DEFAULT_WEIGHT)
+    return vocabulary
+
+
+def message_text(message: Dict) -> str:
+    """The text of a chat message that tags are taken from."""
+    if message.get("content"):
+        return message["content"]
+    return " ".join(message.get(field) or "" for field in ("translation", "explanation", "application"))
+
+
+class KeywordTagger:
+    def __init__(self, vocabulary: Optional[Dict[str, Tuple[Iterable[str], float]]] = None):
+        vocabulary = load_vocabulary() if vocabulary is None else vocabulary
+        self.weights = {concept: weight for concept, (_, weight) in vocabulary.items()}
+
+        # Trie over lemma sequences; outputs[state] are the (concept, length) patterns ending there
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[str, int]]] = [[]]
+        for concept, (synonyms, _) in vocabulary.items():
+            for form in (concept, *synonyms):
+                pattern = lemmas(form)
+                if not pattern:
+                    continue
+                state = 0
+                for token in pattern:
+                    if token not in goto[state]:
+                        goto[state][token] = len(goto)
+                        goto.append({})
+                        outputs.append([])
+                    state = goto[state][token]
+                if not outputs[state]:
+                    outputs[state].append((concept, len(pattern)))
+                elif outputs[state][0][0] != concept:
+                    logger.warning("%r is a synonym of both %r and %r; keeping %r",
+                                   form, outputs[state][0][0], concept, outputs[state][0][0])
+
+        # Failure links, breadth first, with each state's outputs merged with its fallback's
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and token not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(token, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(o) for o in outputs]
+        self._alphabet = frozenset(token for transitions in goto for token in transitions)
+        # Lemmas that dropped a final e ("sage" -> "sag"); "sagging" must not undouble onto them
+        self._e_lemmas = frozenset(lemma(word) for concept, (synonyms, _) in vocabulary.items()
+                                   for form in (concept, *synonyms) for word in _WORD.findall(form.lower())
+                                   if word.endswith("e"))
+        self._tokens: Dict[str, Optional[str]] = {}
+        self.states = len(goto)
+
+    def _token(self, word: str) -> Optional[str]:
+        token = lemma(word)
+        if (token not in self._alphabet and word.endswith(_DOUBLING_SUFFIXES) and len(token) > 3
+                and token[-1] == token[-2] and token[-1] != "s" and token[:-1] not in self._e_lemmas):
+            token = token[:-1]
+        return token if token in self._alphabet else None
+
+    def matches(self, text: str) -> List[Tuple[int, int, str]]:
+        """Non-overlapping (first word, last word, concept) matches, leftmost-longest."""
+        words = _WORD.findall(text.lower())
+        # Words seen before map straight to their automaton token (or None) without being lemmatized again
+        tokens = self._tokens
+        missing = set(words).difference(tokens)
+        if not missing:
+            mapped = list(map(tokens.__getitem__, words))
+        elif len(tokens) < WORD_CACHE_SIZE:
+            tokens.update((word, self._token(word)) for word in missing)
+            mapped = list(map(tokens.__getitem__, words))
+        else:
+            new = {word: self._token(word) for word in missing}
+            mapped = list(map(new.get, words, map(tokens.get, words)))
+
+        # Only words that occur in some pattern move the automaton; any other word sends it back to the root
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = []
+        state = 0
+        previous = -2
+        for position in compress(range(len(mapped)), mapped):
+            token = mapped[position]
+            if position != previous + 1:
+                state = 0
+            previous = position
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for concept, length in outputs[state]:
+                found.append((position - length + 1, position, concept))
+        if len(found) < 2:
+            return found
+
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        kept = []
+        end = -1
+        for match in found:
+            if match[0] > end:
+                kept.append(match)
+                end = match[1]
+        return kept
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Salience of every concept in the text."""
+        counts: Dict[str, int] = defaultdict(int)
+        first: Dict[str, int] = {}
+        matches = self.matches(text)
+        for start, _, concept in matches:
+            counts[concept] += 1
+            first.setdefault(concept, start)
+        span = (matches[-1][1] + 1) if matches else 1
+        return {concept: self.weights[concept] * (1 + math.log(count)) + EARLY_BONUS * (1 - first[concept] / span)
+                for concept, count in counts.items()}
+
+    def tag(self, text: str, limit: int = MAX_KEYWORDS) -> List[str]:
+        """The text's most salient concepts, best first."""
+        scores = self.scores(text)
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+
+class VerseConcepts:
+    """Inverted index from concept to the verses tagged with it, most salient first."""
+
+    def __init__(self, verses_db: Dict, tagger: Optional[KeywordTagger] = None):
+        tagger = tagger or get_keyword_tagger()
+        postings: Dict[str, List[Tuple[float, int, str]]] = defaultdict(list)
+        self.by_verse: Dict[Tuple[int, str], List[str]] = {}
+        for chapter_key, chapter_data in verses_db.items():
+            chapter = chapter_number(chapter_key)
+            for verse, data in chapter_data["verses"].items():
+                scores = tagger.scores(data["translation"])
+                self.by_verse[(chapter, verse)] = sorted(scores, key=scores.get, reverse=True)
+                for concept, score in scores.items():
+                    postings[concept].append((-score, chapter, verse))
+        self.postings = {concept: [(chapter, verse) for _, chapter, verse in sorted(entries)]
+                         for concept, entries in postings.items()}
+
+    def verses(self, concept: str, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        """(chapter, verse) pairs tagged with the concept."""
+        return self.postings.get(concept, [])[:limit]
+
+    def concepts(self, chapter: int, verse: str) -> List[str]:
+        return self.by_verse.get((chapter, verse), [])
+
+    def counts(self) -> Dict[str, int]:
+        return {concept: len(verses) for concept, verses in self.postings.items()}
+
+
+_tagger: Optional[KeywordTagger] = None
+_verse_concepts: Optional[VerseConcepts] = None
+_lock = threading.Lock()
+
+
+def get_keyword_tagger() -> KeywordTagger:
+    """Process-wide tagger, compiled on first use."""
+    global _tagger
+    with _lock:
+        if _tagger is None:
+            _tagger = KeywordTagger()
+        return _tagger
+
+
+def get_verse_concepts(verses_db: Dict) -> VerseConcepts:
+    """Process-wide verse index, built on first use."""
+    global _verse_concepts
+    tagger = get_keyword_tagger()
+    with _lock:
+        if _verse_concepts is None:
+            _verse_concepts = VerseConcepts(verses_db, tagger)
+        return _verse_concepts
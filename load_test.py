@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Load generator for the question paths, driven by virtual sessions.
+
+Each virtual session behaves like a browser tab: it waits a random think
+time, then asks a free-form question, asks about a specific verse, or clicks
+the Daily Reflection / Random Verse quick actions, and goes through the same
+code the app uses (warm answer pools, the job queue, GitaGeminiBot with
+admission control and coalescing, or instant offline answers). The model is
+the local stand-in from gemini_standin.py unless --endpoint is given, so no
+API quota is spent.
+
+    python load_test.py --sessions 50 --duration 60 --latency lognormal:800:0.5 --error-rate 0.05
+    python load_test.py --sessions 200 --questions 5 --report report.json
+
+The report (JSON, to stdout or --report) has throughput, latency percentiles
+and error rates per path, plus the stand-in, admission, coalescer and job
+queue counters.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+import gemini_standin
+from verse_refs import chapter_number
+
+QUESTIONS = [
+    "How do I stay calm when my work is criticised?",
+    "I am afraid of failing my exams, what should I do?",
+    "How can I control my anger towards my family?",
+    "What is the nature of the soul?",
+    "How do I find peace when everything is uncertain?",
+    "Should I leave my job to follow my passion?",
+    "How do I deal with grief after losing someone?",
+    "What does it mean to act without attachment to results?",
+    "How can I be a better friend?",
+    "How do I stop overthinking at night?",
+]
+EMOTIONS = ["Neutral", "Happy", "Sad", "Angry", "Fear", "Surprise", "Disgust"]
+# path -> share of actions
+DEFAULT_MIX = {"chat": 0.55, "verse": 0.15, "daily_reflection": 0.1, "random_verse": 0.1, "offline": 0.1}
+POLL_INTERVAL_SEC = 0.05
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 4)
+
+    return {
+        "p50": pick(50), "p90": pick(90), "p95": pick(95), "p99": pick(99),
+        "max": round(ordered[-1], 4), "mean": round(statistics.fmean(ordered), 4)
+    }
+
+
+class VirtualSession(threading.Thread):
+    def __init__(self, number: int, bot, recorder, args):
+        super().__init__(name=f"virtual-session-{number}", daemon=True)
+        self.session_id = f"virtual-{number}"
+        self.bot = bot
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(args.seed * 100003 + number)
+        self.history: List[Dict] = []
+        self.theme = self.rng.choice(list(bot.themes))
+
+    def run(self):
+        from answer_warmer import MOODS
+
+        asked = 0
+        while not self.recorder.stopped.is_set() and (not self.args.questions or asked < self.args.questions):
+            self.recorder.stopped.wait(self.rng.expovariate(1 / self.args.think_sec) if self.args.think_sec else 0)
+            if self.recorder.stopped.is_set():
+                break
+            path = self.rng.choices(list(self.args.mix), weights=list(self.args.mix.values()))[0]
+            mood, emotion = self.rng.choice(MOODS), self.rng.choice(EMOTIONS)
+            started = time.perf_counter()
+            outcome = self.ask(path, mood, emotion)
+            self.recorder.record(path, time.perf_counter() - started, outcome)
+            asked += 1
+
+    def ask(self, path: str, mood: str, emotion: str) -> str:
+        from admission_control import INTERACTIVE
+        from answer_warmer import daily_reflection_question, get_answer_warmer, random_verse_question
+        from job_queue import DONE, QueueLimitError, get_job_queue
+
+        if path == "offline":
+            question = self.rng.choice(QUESTIONS)
+            return self.remember(question, self.bot.local_response(question, self.theme, mood, emotion))
+
+        if path in ("daily_reflection", "random_verse"):
+            warmer = get_answer_warmer(self.bot)
+            if path == "daily_reflection":
+                warmed = warmer.take_daily_reflection(self.theme, mood)
+                question = daily_reflection_question(time.strftime("%A"))
+            else:
+                warmed = warmer.take_random_verse(self.theme, mood)
+                question = random_verse_question(self.bot.verses_db, self.rng)
+            if warmed is not None:
+                self.remember(warmed["question"], warmed["answer"])
+                return "warm_pool"
+        elif path == "verse":
+            chapter = self.rng.choice(list(self.bot.verses_db))
+            verse = self.rng.choice(list(self.bot.verses_db[chapter]["verses"]))
+            question = f"Please explain Chapter {chapter_number(chapter)}, Verse {verse} and its practical application in modern life."
+        else:
+            question = self.rng.choice(QUESTIONS)
+
+        jobs = get_job_queue()
+        try:
+            job_id = jobs.submit(
+                self.session_id, self.bot.get_response,
+                question, self.theme, mood, emotion, list(self.history[-40:]), INTERACTIVE, self.session_id,
+                label=question
+            )
+        except QueueLimitError:
+            return "rejected"
+        while True:
+            job = jobs.get(job_id)
+            if job.finished:
+                break
+            time.sleep(POLL_INTERVAL_SEC)
+        jobs.forget(job_id)
+        if job.status != DONE:
+            return "failed"
+        answer = job.result
+        if answer.get("error"):
+            return "error"
+        return self.remember(question, answer)
+
+    def remember(self, question: str, answer: Dict) -> str:
+        self.history += [{"role": "user", "content": question}, {"role": "assistant", **answer}]
+        return answer.get("source", "model")
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)      # path -> [(latency, outcome)]
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def record(self, path: str, latency: float, outcome: str):
+        with self._lock:
+            self.samples[path].append((latency, outcome))
+
+    def report(self, elapsed: float) -> Dict:
+        with self._lock:
+            samples = {path: list(rows) for path, rows in self.samples.items()}
+        paths = {}
+        for path, rows in sorted(samples.items()):
+            outcomes = defaultdict(int)
+            for _, outcome in rows:
+                outcomes[outcome] += 1
+            failures = sum(outcomes.get(o, 0) for o in ("error", "failed", "rejected"))
+            paths[path] = {
+                "count": len(rows),
+                "throughput_per_sec": round(len(rows) / elapsed, 3),
+                "error_rate": round(failures / len(rows), 4),
+                "outcomes": dict(outcomes),
+                "latency_sec": percentiles([latency for latency, _ in rows]),
+            }
+        all_rows = [row for rows in samples.values() for row in rows]
+        failures = sum(1 for _, outcome in all_rows if outcome in ("error", "failed", "rejected"))
+        return {
+            "elapsed_sec": round(elapsed, 3),
+            "requests": len(all_rows),
+            "throughput_per_sec": round(len(all_rows) / elapsed, 3) if elapsed else 0,
+            "error_rate": round(failures / len(all_rows), 4) if all_rows else 0,
+            "latency_sec": percentiles([latency for latency, _ in all_rows]),
+            "paths": paths,
+        }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'chat=0.6,verse=0.2,offline=0.2' -> weights."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown path '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Drive virtual sessions through the question paths")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent virtual sessions")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run (ignored with --questions)")
+    parser.add_argument("--questions", type=int, default=0, help="questions per session, then stop")
+    parser.add_argument("--think-sec", type=float, default=2.0, help="mean think time between questions")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="path weights, e.g. chat=0.6,verse=0.2,offline=0.2")
+    parser.add_argument("--endpoint", help="use this API endpoint instead of a local stand-in")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    gemini_standin.add_model_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"), stream=sys.stderr)
+    server = None
+    if not args.endpoint:
+        server = gemini_standin.start_in_thread(**gemini_standin.model_options(args))
+        args.endpoint = server.url
+
+    from admission_control import get_admission_controller
+    from gita_bot import GitaGeminiBot
+    from job_queue import get_job_queue
+    from request_coalescer import get_request_coalescer
+
+    bot = GitaGeminiBot(os.getenv("GEMINI_API_KEY", "standin"), api_endpoint=args.endpoint)
+    recorder = Recorder()
+    sessions = [VirtualSession(n, bot, recorder, args) for n in range(args.sessions)]
+    print(f"🧪 {args.sessions} virtual sessions against {args.endpoint}", file=sys.stderr)
+
+    started = time.perf_counter()
+    for session in sessions:
+        session.start()
+    if args.questions:
+        for session in sessions:
+            session.join()
+    else:
+        recorder.stopped.wait(args.duration)
+        recorder.stopped.set()
+        for session in sessions:
+            session.join(timeout=60)
+    elapsed = time.perf_counter() - started
+
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "sessions": args.sessions, "duration": args.duration, "questions": args.questions,
+        "think_sec": args.think_sec, "mix": args.mix, "endpoint": args.endpoint,
+        **({"standin": gemini_standin.model_options(args)} if server else {})
+    }
+    if server:
+        report["upstream"] = server.RequestHandlerClass.model.stats()
+    report["admission"] = get_admission_controller().stats()
+    report["coalescer"] = get_request_coalescer().stats()
+    report["jobs"] = get_job_queue().stats()
+
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output + "\n")
+        print(f"📄 Report written to {args.report}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Lightweight in-process metrics: counters, histograms and gauges.
+
+Call sites record with inc(), observe() or timer() (a context manager and
+decorator); state that is already kept elsewhere is reported through a gauge
+callback (register_gauge()) read when a snapshot is taken. Each process
+keeps its metrics in memory and periodically writes a JSON snapshot to
+METRICS_DIR; pwa_server.py runs in a separate process and serves the merged
+snapshots in Prometheus text format at /metrics. The route is off unless
+METRICS_TOKEN is set, and then answers only requests with
+"Authorization: Bearer <METRICS_TOKEN>" (Prometheus' authorization scrape
+setting).
+
+Recording takes a dict lookup, a bisect and a short critical section, one to
+three microseconds (see benchmarks/bench_metrics.py), so it is cheap enough
+for per-frame and per-request hot paths.
+"""
+
+import functools
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "wisdomweaver-metrics"))
+METRICS_SNAPSHOT_SEC = float(os.getenv("METRICS_SNAPSHOT_SEC", "10"))
+STALE_SNAPSHOT_SEC = 300    # snapshots from processes that stopped writing are ignored
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")   # bearer token required by /metrics; unset disables the route
+
+# Seconds, from sub-millisecond parsing up to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    "wisdom_prompt_build_seconds": "Time to assemble a model prompt",
+    "wisdom_prompt_tokens": "Estimated prompt size in tokens",
+    "wisdom_model_call_seconds": "Upstream generate_content latency by outcome",
+    "wisdom_model_retries_total": "Model call retries by reason",
+    "wisdom_format_response_seconds": "Time to parse a model response",
+    "wisdom_keyword_extraction_seconds": "Time to extract keywords from a response",
+    "wisdom_answer_source_total": "Answers by where they came from",
+    "wisdom_model_calls_shed_total": "Model calls shed by admission control",
+    "wisdom_warm_pool_total": "Quick-action warm pool lookups by outcome",
+    "wisdom_coalesced_requests_total": "Model requests by coalescing role",
+    "wisdom_rerun_seconds": "Streamlit script run time",
+    "wisdom_face_detection_seconds": "Face detection time per analysed frame",
+    "wisdom_emotion_inference_seconds": "Emotion model inference time per face",
+    "wisdom_frame_seconds": "Total video frame processing time",
+    "wisdom_errors_total": "Handled errors by stage",
+    "wisdom_profiles_total": "Sampled profiles written by section",
+    "wisdom_answer_streams_total": "Streamed /api/ask answers by outcome",
+    "wisdom_translation_lookups_total": "Translation store lookups by outcome",
+    "wisdom_answer_stream_seconds": "Time from /api/ask request to the end of its stream by outcome",
+    "wisdom_capture_sessions": "Webcam sessions by current and selected capture profile",
+}
+
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)    # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.buckets: Dict[str, Tuple[float, ...]] = {"wisdom_prompt_tokens": TOKEN_BUCKETS}
+        self.gauges: Dict[str, Callable[[], List[Tuple[Dict, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def register_gauge(self, name: str, read: Callable[[], List[Tuple[Dict, float]]]):
+        """Report the (labels, value) pairs returned by read() as a gauge, read at every snapshot."""
+        with self._lock:
+            self.gauges[name] = read
+
+    def _read_gauges(self) -> Dict:
+        gauges = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                gauges[name] = [[labels, value] for labels, value in read()]
+            except Exception as e:
+                logger.warning("Could not read gauge %s: %s", name, e)
+        return gauges
+
+    def snapshot(self) -> Dict:
+        gauges = self._read_gauges()
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "written_at": time.time(),
+                "counters": {
+                    name: [[dict(key), value] for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "histograms": {
+                    name: [[dict(key), list(h.bounds), list(h.counts), h.sum, h.count] for key, h in series.items()]
+                    for name, series in self.histograms.items()
+                },
+                "gauges": gauges,
+            }
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+register_gauge = registry.register_gauge
+
+
+class timer:
+    """Observe the duration of a with-block, or of each call when used as a decorator, in seconds."""
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(self.name, **self.labels):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+# Snapshots for the /metrics route
+
+def write_snapshot(directory: str = METRICS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(registry.snapshot(), f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+_snapshot_thread: Optional[threading.Thread] = None
+_snapshot_lock = threading.Lock()
+
+
+def start_snapshots(interval: float = METRICS_SNAPSHOT_SEC):
+    """Write this process's metrics to METRICS_DIR every `interval` seconds (once per process)."""
+    global _snapshot_thread
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot()
+            except OSError as e:
+                logger.warning("Could not write metrics snapshot: %s", e)
+
+    with _snapshot_lock:
+        if _snapshot_thread is None:
+            _snapshot_thread = threading.Thread(target=loop, name="metrics-snapshot", daemon=True)
+            _snapshot_thread.start()
+
+
+def read_snapshots(directory: str = METRICS_DIR) -> List[Dict]:
+    """Recent snapshots from every process that writes to `directory`."""
+    snapshots = []
+    if not os.path.isdir(directory):
+        return snapshots
+    cutoff = time.time() - STALE_SNAPSHOT_SEC
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get("written_at", 0) >= cutoff:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def collect(directory: str = METRICS_DIR) -> List[Dict]:
+    """Snapshots from other processes plus this process's live metrics."""
+    pid = os.getpid()
+    return [s for s in read_snapshots(directory) if s.get("pid") != pid] + [registry.snapshot()]
+
+
+def scrape_allowed(authorization: Optional[str], token: Optional[str] = METRICS_TOKEN) -> bool:
+    """Whether a request with this Authorization header may read /metrics."""
+    if not token or not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+def _labels(labels: Dict, extra: Optional[Dict] = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+
+def render_prometheus(snapshots: Iterable[Dict]) -> str:
+    """Merge snapshots (summing across processes) into Prometheus text exposition format."""
+    counters: Dict[str, Dict[LabelKey, float]] = {}
+    gauges: Dict[str, Dict[LabelKey, float]] = {}
+    histograms: Dict[str, Dict[LabelKey, list]] = {}
+    for snapshot in snapshots:
+        for name, series in snapshot.get("counters", {}).items():
+            merged = counters.setdefault(name, {})
+            for labels, value in series:
+                key = tuple(sorted(labels.items()))
+                merged[key] = merged.get(key, 0) + value
+        for name, series in snapshot.get("gauges", {}).items():
+            merged = gauges.setdefault(name, {})
+            for labels, value in series:
+                key = tuple(sorted(labels.items()))
+                merged[key] = merged.get(key, 0) + value
+        for name, series in snapshot.get("histograms", {}).items():
+            merged = histograms.setdefault(name, {})
+            for labels, bounds, counts, total, count in series:
+                key = tuple(sorted(labels.items()))
+                if key not in merged:
+                    merged[key] = [bounds, [0] * len(counts), 0.0, 0]
+                entry = merged[key]
+                entry[1] = [a + b for a, b in zip(entry[1], counts)]
+                entry[2] += total
+                entry[3] += count
+
+    lines = []
+    for name in sorted(counters):
+        if name in HELP:
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_labels(dict(key))} {value:g}")
+    for name in sorted(gauges):
+        if name in HELP:
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in sorted(gauges[name].items()):
+            lines.append(f"{name}{_labels(dict(key))} {value:g}")
+    for name in sorted(histograms):
+        if name in HELP:
+            lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, (bounds, counts, total, count) in sorted(histograms[name].items()):
+            labels = dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(list(bounds) + ["+Inf"], counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{name}_bucket{_labels(labels, {'le': le})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6g}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,234 @@
+"""
+Fully local answers from the verse store.
+
+Verse translations are indexed once with TF-IDF in an inverted index. A
+question that names a verse ("Chapter 2, Verse 47") is answered from that
+verse, with the index only finding related verses. Any other question is
+expanded with terms for the user's emotional state, mood and theme, scored
+against the index, and the best verse is used. Either way the verse is
+turned into the same structured response the model produces, using
+theme-specific reflection templates. Everything runs on the CPU in well
+under a millisecond per answer, so it serves as the fallback when the model
+is unavailable or shedding load, and as a selectable instant answer mode.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from explanation_store import parse_verse_question
+from keyword_tagger import get_keyword_tagger
+from verse_refs import chapter_number, verse_numbers
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each even ever every few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just let may me
+more most my myself no nor not now o of off on once only or other our ours ourselves out over own same
+shall she should so some such than that the their theirs them themselves then there these they this those
+through thus to too under until up upon very was we were what when where which while who whom why will
+with within without would ye yet you your yours yourself yourselves said thee thou thy thine unto
+please tell explain give share verse verses chapter gita bhagavad krishna arjun arjuna guidance
+""".split())
+
+# Extra query terms for the user's state; they steer the match without dominating it
+EMOTION_TERMS = {
+    "Happy": "joy delight content gratitude",
+    "Sad": "grief sorrow lament distress comfort",
+    "Angry": "anger wrath desire calm control",
+    "Fear": "fear fearless courage protect",
+    "Surprise": "wonder amazement",
+    "Disgust": "aversion attachment equanimity",
+}
+MOOD_TERMS = {
+    "Seeking Wisdom": "wisdom knowledge understand",
+    "Feeling Confused": "confused delusion doubt clarity",
+    "Need Motivation": "action duty perform strength",
+    "Seeking Peace": "peace tranquil mind steady",
+    "Facing Challenges": "difficulty battle endure steadfast",
+    "Grateful": "devotion offering grace",
+    "Contemplative": "meditation self reflection",
+}
+THEME_TERMS = {
+    "Life Guidance": "path duty decision",
+    "Dharma & Ethics": "dharma duty righteous",
+    "Spiritual Growth": "soul self realization yoga",
+    "Relationships": "friend kin love equal",
+    "Work & Career": "work action duty result",
+    "Inner Peace": "peace mind calm steady",
+    "Devotion & Love": "devotion love surrender",
+}
+CONTEXT_WEIGHT = 0.35   # weight of state/theme terms relative to the question's own words
+
+REFLECTIONS = {
+    "Life Guidance": (
+        "{reference} offers a steady reference point for the choice in front of you: {excerpt}",
+        "Before deciding, ask which option lets you act with integrity regardless of the outcome, and take that step."
+    ),
+    "Dharma & Ethics": (
+        "{reference} speaks to duty and right conduct: {excerpt}",
+        "Name the responsibility that is truly yours in this situation and fulfil it honestly, without needing credit."
+    ),
+    "Spiritual Growth": (
+        "{reference} points inward, to the self beyond passing circumstances: {excerpt}",
+        "Set aside a few quiet minutes today to observe your thoughts without judging them, returning to the breath."
+    ),
+    "Relationships": (
+        "{reference} reminds us how to hold others with equal regard: {excerpt}",
+        "In your next conversation, listen fully before responding and offer goodwill without keeping score."
+    ),
+    "Work & Career": (
+        "{reference} teaches action without clinging to its fruits: {excerpt}",
+        "Give your full attention to the task at hand and treat the result as information, not as a verdict on you."
+    ),
+    "Inner Peace": (
+        "{reference} describes the steady mind that is not shaken by change: {excerpt}",
+        "When agitation rises, pause, breathe slowly, and let the feeling pass without acting on it immediately."
+    ),
+    "Devotion & Love": (
+        "{reference} speaks of offering one's actions with love: {excerpt}",
+        "Dedicate one ordinary task today as an offering, doing it with care for its own sake."
+    ),
+}
+DEFAULT_THEME = "Life Guidance"
+EMOTION_NOTES = {
+    "Sad": " In sorrow, remember that pain, like joy, is temporary and does not touch the deeper self.",
+    "Angry": " Anger clouds judgement; acting only after it settles protects you and others.",
+    "Fear": " Fear loosens its hold when attention returns to the duty of this present moment.",
+    "Happy": " Enjoy this gladness fully, while holding it lightly.",
+}
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ness", "ment", "ing", "ed", "ly", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def tfidf_vectors(documents: List[str]) -> Tuple[List[Dict[str, float]], Dict[str, float]]:
+    """Unit-length TF-IDF vectors of each document's terms (log-scaled tf × smoothed idf), and the idf table.
+
+    The offline engine's index and the related-verses graph both weight verses with this, so their lexical
+    scores agree.
+    """
+    counts = [Counter(tokenize(document)) for document in documents]
+    doc_freq = Counter(term for doc in counts for term in doc)
+    total = len(counts)
+    idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in doc_freq.items()}
+    vectors = []
+    for doc in counts:
+        weights = {term: (1 + math.log(tf)) * idf[term] for term, tf in doc.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in weights.items()})
+    return vectors, idf
+
+
+def _excerpt(text: str, limit: int = 220) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+class OfflineAnswerEngine:
+    def __init__(self, verses_db: Dict):
+        self.verses: List[Tuple[int, str, str]] = []   # (chapter, verse, translation)
+        self.by_number: Dict[Tuple[int, int], int] = {}  # (chapter, verse number) -> index, ranged entries included
+        for chapter_key, chapter_data in verses_db.items():
+            chapter = chapter_number(chapter_key)
+            for verse, data in chapter_data["verses"].items():
+                first, last = verse_numbers(verse)
+                for number in range(first, last + 1):
+                    self.by_number[(chapter, number)] = len(self.verses)
+                self.verses.append((chapter, verse, data["translation"]))
+
+        vectors, self.idf = tfidf_vectors([translation for _, _, translation in self.verses])
+
+        # Inverted index of unit-length TF-IDF vectors
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for index, vector in enumerate(vectors):
+            for term, weight in vector.items():
+                self.postings[term].append((index, weight))
+
+    def query_vector(self, question: str, theme: Optional[str] = None, mood: Optional[str] = None,
+                     emotional_state: Optional[str] = None) -> Dict[str, float]:
+        vector = Counter()
+        for term in tokenize(question):
+            vector[term] += 1.0
+        context = " ".join(filter(None, (EMOTION_TERMS.get(emotional_state), MOOD_TERMS.get(mood), THEME_TERMS.get(theme))))
+        for term in tokenize(context):
+            vector[term] += CONTEXT_WEIGHT
+        return {term: weight * self.idf[term] for term, weight in vector.items() if term in self.idf}
+
+    def referenced_verse(self, question: str) -> Optional[int]:
+        """Index of the verse the question names, if any."""
+        reference = parse_verse_question(question)
+        if reference is None:
+            return None
+        return self.by_number.get((reference[0], verse_numbers(reference[1])[0]))
+
+    def _rank(self, vector: Dict[str, float], k: int) -> List[Tuple[float, int]]:
+        scores = defaultdict(float)
+        for term, weight in vector.items():
+            for index, doc_weight in self.postings[term]:
+                scores[index] += weight * doc_weight
+        return sorted(((score, index) for index, score in scores.items()), reverse=True)[:k]
+
+    def search(self, question: str, theme: Optional[str] = None, mood: Optional[str] = None,
+               emotional_state: Optional[str] = None, k: int = 3) -> List[Tuple[float, int]]:
+        """Best (score, verse index) pairs, highest first; a verse the question names comes first, scored 1."""
+        referenced = self.referenced_verse(question)
+        if referenced is not None:
+            # The named verse, then the verses closest to its translation
+            related = self._rank(self.query_vector(self.verses[referenced][2]), k + 1)
+            return [(1.0, referenced)] + [(score, index) for score, index in related if index != referenced][:k - 1]
+
+        results = self._rank(self.query_vector(question, theme, mood, emotional_state), k)
+        if not results:
+            # Nothing matched: fall back to the best-known verse on action without attachment
+            return [(0.0, next((i for i, v in enumerate(self.verses) if v[1] == "2.47"), 0))]
+        return results
+
+    def answer(self, question: str, theme: Optional[str] = None, mood: Optional[str] = None,
+               emotional_state: Optional[str] = None) -> Dict:
+        """A structured response in the same shape as GitaGeminiBot.format_response."""
+        results = self.search(question, theme, mood, emotional_state)
+        chapter, verse, translation = self.verses[results[0][1]]
+        reference = f"Chapter {chapter}, Verse {verse}"
+        explanation_template, application = REFLECTIONS.get(theme, REFLECTIONS[DEFAULT_THEME])
+
+        explanation = explanation_template.format(reference=reference, excerpt=_excerpt(translation))
+        explanation += EMOTION_NOTES.get(emotional_state, "")
+        related = [f"Chapter {self.verses[i][0]}, Verse {self.verses[i][1]}" for _, i in results[1:]]
+        if related:
+            explanation += f" See also {' and '.join(related)}."
+
+        return {
+            "verse_reference": reference,
+            "sanskrit": "",
+            "translation": translation,
+            "explanation": explanation,
+            "application": application,
+            "keywords": get_keyword_tagger().tag(f"{question} {translation}"),
+            "source": "offline",
+        }
+
+
+_engine: Optional[OfflineAnswerEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_offline_engine(verses_db: Dict) -> OfflineAnswerEngine:
+    """Process-wide engine, indexed on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = OfflineAnswerEngine(verses_db)
+        return _engine
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Opt-in sampling profiler for Streamlit reruns and the emotion inference thread.
+
+Code to be profiled runs inside profile(name). A configurable fraction of
+those sections is sampled: while any is active, one background thread reads
+the stack of each profiled thread every PROFILE_INTERVAL_MS via
+sys._current_frames(), so the profiled code itself is not traced or slowed
+down. When a sampled section ends its stacks are written in collapsed
+("folded") format, one file per run, which flamegraph.pl, inferno and
+speedscope render as flame graphs. Only the newest PROFILE_RETENTION files
+are kept.
+
+Profiling is off unless a sample rate is set:
+
+    PROFILE_RERUN_RATE=0.02 PROFILE_EMOTION_RATE=0.01 streamlit run app.py
+
+or, when PROFILE_TOKEN is set, a single rerun is requested with
+?profile=<PROFILE_TOKEN> in the app URL (ignored otherwise, so visitors
+cannot turn sampling on). Sampling costs roughly a percent of one core
+while a section is active, and only a random number per section
+otherwise, so a low rate is safe in production.
+
+    python profiling.py top --name rerun     # hottest functions across saved runs
+"""
+
+import argparse
+import hmac
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from itertools import count
+from typing import Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "wisdomweaver-profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "200"))     # profile files kept
+_DEFAULT_RATE = os.getenv("PROFILE_SAMPLE_RATE", "0")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")    # ?profile=<token> forces one rerun to be sampled
+SAMPLE_RATES = {
+    "rerun": float(os.getenv("PROFILE_RERUN_RATE", _DEFAULT_RATE)),
+    "emotion": float(os.getenv("PROFILE_EMOTION_RATE", _DEFAULT_RATE)),
+}
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Section:
+    """Stack samples of one profiled run of a code section."""
+
+    def __init__(self, name: str, root_frame):
+        self.name = name
+        self.root = root_frame
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+
+    def record(self, frame):
+        # Walk from the running frame up to the frame that entered profile()
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            if frame is self.root:
+                break
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+
+
+class StackSampler:
+    """One background thread sampling every thread with an active section."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.active: Dict[int, Section] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, thread_id: int, section: Section):
+        with self._lock:
+            self.active[thread_id] = section
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def remove(self, thread_id: int):
+        with self._lock:
+            self.active.pop(thread_id, None)
+
+    def _loop(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                sections = list(self.active.items())
+                if not sections:
+                    self._wake.clear()
+                    continue
+            frames = sys._current_frames()
+            for thread_id, section in sections:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    section.record(frame)
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+_sequence = count()
+
+
+class profile:
+    """
+    Sample the stacks of the with-block, for a fraction of runs.
+
+    `name` picks the rate from SAMPLE_RATES (overridden by `rate`);
+    force=True always samples, e.g. for ?profile=<PROFILE_TOKEN> (see profile_requested).
+    """
+    __slots__ = ("name", "sampled", "section", "thread_id")
+
+    def __init__(self, name: str, force: bool = False, rate: Optional[float] = None):
+        self.name = name
+        rate = SAMPLE_RATES.get(name, 0.0) if rate is None else rate
+        self.sampled = force or (rate > 0 and random.random() < rate)
+        self.section = None
+
+    def __enter__(self):
+        if self.sampled:
+            self.thread_id = threading.get_ident()
+            if self.thread_id not in _sampler.active:    # nested sections join the outer one
+                self.section = Section(self.name, sys._getframe(1))
+                _sampler.add(self.thread_id, self.section)
+        return self
+
+    def __exit__(self, *exc):
+        if self.section is not None:
+            _sampler.remove(self.thread_id)
+            elapsed = time.perf_counter() - self.section.started
+            try:
+                write_profile(self.section, elapsed)
+            except OSError as e:
+                logger.warning("Could not write profile: %s", e)
+            self.section = None
+        return False
+
+
+def write_profile(section: Section, elapsed: float, directory: str = PROFILE_DIR) -> Optional[str]:
+    """Write the section's stacks as a collapsed-stack file and prune old files."""
+    if not section.stacks:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    filename = (f"{section.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+                f"{next(_sequence):05d}-{elapsed * 1000:.0f}ms.folded")
+    path = os.path.join(directory, filename)
+    with open(path, "w") as f:
+        for stack, samples in section.stacks.most_common():
+            f.write(f"{stack} {samples}\n")
+    metrics.inc("wisdom_profiles_total", section=section.name)
+    logger.info("Profile of %s (%.0f ms, %d samples) written to %s",
+                section.name, elapsed * 1000, sum(section.stacks.values()), path)
+    prune(directory)
+    return path
+
+
+def profile_requested(value: Optional[str], token: Optional[str] = PROFILE_TOKEN) -> bool:
+    """Whether a ?profile= query value asks, with the configured token, for this run to be sampled."""
+    return bool(token and value) and hmac.compare_digest(value.encode(), token.encode())
+
+
+def profile_files(directory: str = PROFILE_DIR, name: Optional[str] = None) -> List[str]:
+    """Saved profiles, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, f) for f in os.listdir(directory)
+             if f.endswith(".folded") and (name is None or f.startswith(f"{name}-"))]
+    return sorted(paths, key=os.path.getmtime)
+
+
+def prune(directory: str = PROFILE_DIR, keep: int = PROFILE_RETENTION):
+    paths = profile_files(directory)
+    for path in paths[:max(0, len(paths) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise saved profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    top = sub.add_parser("top", help="functions with the most samples across saved profiles")
+    top.add_argument("--dir", default=PROFILE_DIR)
+    top.add_argument("--name", help="only profiles of this section (rerun, emotion)")
+    top.add_argument("--limit", type=int, default=25)
+    merge = sub.add_parser("merge", help="merge saved profiles into one collapsed-stack file for a flame graph")
+    merge.add_argument("--dir", default=PROFILE_DIR)
+    merge.add_argument("--name")
+    merge.add_argument("output")
+    args = parser.parse_args()
+
+    merged = Counter()
+    paths = profile_files(args.dir, args.name)
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                stack, _, samples = line.rstrip("\n").rpartition(" ")
+                merged[stack] += int(samples)
+
+    if args.command == "merge":
+        with open(args.output, "w") as f:
+            for stack, samples in merged.most_common():
+                f.write(f"{stack} {samples}\n")
+        print(f"{len(paths)} profiles, {sum(merged.values())} samples -> {args.output}")
+        return
+
+    total = sum(merged.values()) or 1
+    own, inclusive = Counter(), Counter()
+    for stack, samples in merged.items():
+        frames = stack.split(";")
+        own[frames[-1]] += samples
+        for frame in set(frames):
+            inclusive[frame] += samples
+    print(f"{len(paths)} profiles, {total} samples")
+    print(f"{'self %':>7} {'total %':>8}  function")
+    for frame, samples in own.most_common(args.limit):
+        print(f"{samples / total * 100:7.1f} {inclusive[frame] / total * 100:8.1f}  {frame}")
+
+
+if __name__ == "__main__":
+    main()
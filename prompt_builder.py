@@ -0,0 +1,118 @@
+"""
+Token-budgeted prompt assembly for GitaGeminiBot.
+
+A prompt is built from the answer-format instructions, one compact line of
+theme/mood/emotion context, a rolling summary of earlier turns, the most
+recent turns and the question. Sizes are measured with a local token
+estimator; when the total exceeds the budget the least important parts are
+trimmed first: the oldest summary lines, then the oldest recent turns.
+"""
+
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "800"))
+RECENT_TURNS = 3            # question/answer pairs quoted in full
+SUMMARY_TURNS = 12          # earlier turns condensed into one line each
+ANSWER_EXCERPT_CHARS = 240  # how much of an earlier answer's explanation is quoted
+
+SYSTEM_INSTRUCTIONS = (
+    "You are a guide to the Bhagavad Gita. Answer with one relevant verse in exactly this format:\n"
+    "Chapter X, Verse Y\n"
+    "Sanskrit: [verse if available]\n"
+    "Translation: [clear English translation]\n"
+    "Explanation: [meaning and context]\n"
+    "Application: [practical guidance for modern life]\n"
+    "Be comprehensive but accessible, and suit the guidance to the user's state."
+)
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate subword token count: one per word or symbol, plus one per 6 extra letters."""
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def context_line(theme_focus: Optional[str], mood: Optional[str], emotional_state: Optional[str]) -> str:
+    parts = []
+    if theme_focus:
+        parts.append(f"focus: {theme_focus}")
+    if mood:
+        parts.append(f"mood: {mood.lower()}")
+    if emotional_state:
+        parts.append(f"emotion: {emotional_state.lower()} (acknowledge it)")
+    return "User context: " + "; ".join(parts) if parts else ""
+
+
+def _turns(history: List[Dict]) -> List[Tuple[str, Optional[Dict]]]:
+    """Pair each question with the answer that followed it, skipping unanswered placeholders."""
+    turns = []
+    for message in history:
+        if message.get("pending_job") or message.get("error"):
+            continue
+        if message["role"] == "user":
+            turns.append((message["content"], None))
+        elif turns and turns[-1][1] is None:
+            turns[-1] = (turns[-1][0], message)
+    return turns
+
+
+def _summary_line(question: str, answer: Optional[Dict]) -> str:
+    reference = answer.get("verse_reference", "") if answer else ""
+    return f"- {_shorten(question, 80)}" + (f" → {reference}" if reference else "")
+
+
+def _recent_turn(question: str, answer: Optional[Dict]) -> str:
+    lines = [f"User: {_shorten(question, 300)}"]
+    if answer:
+        lines.append(f"Guide: {answer.get('verse_reference', '')}. {_shorten(answer.get('explanation', ''), ANSWER_EXCERPT_CHARS)}")
+    return "\n".join(lines)
+
+
+def build_prompt(question: str, theme_focus: Optional[str] = None, mood: Optional[str] = None,
+                 emotional_state: Optional[str] = None, history: Optional[List[Dict]] = None,
+                 budget: int = PROMPT_TOKEN_BUDGET) -> Tuple[str, int]:
+    """Return (prompt, estimated tokens) for a question and the conversation so far."""
+    turns = _turns(history or [])
+    recent = [_recent_turn(q, a) for q, a in turns[-RECENT_TURNS:]]
+    summary = [_summary_line(q, a) for q, a in turns[:-RECENT_TURNS][-SUMMARY_TURNS:]]
+
+    fixed = [SYSTEM_INSTRUCTIONS, context_line(theme_focus, mood, emotional_state), f"Question: {question.strip()}"]
+    used = sum(estimate_tokens(part) for part in fixed)
+    summary_tokens = [estimate_tokens(line) for line in summary]
+    recent_tokens = [estimate_tokens(turn) for turn in recent]
+
+    # Trim the least important history first
+    while summary and used + sum(summary_tokens) + sum(recent_tokens) > budget:
+        summary.pop(0)
+        summary_tokens.pop(0)
+    while recent and used + sum(recent_tokens) > budget:
+        recent.pop(0)
+        recent_tokens.pop(0)
+
+    sections = [SYSTEM_INSTRUCTIONS]
+    if fixed[1]:
+        sections.append(fixed[1])
+    if summary:
+        sections.append("Earlier in this conversation:\n" + "\n".join(summary))
+    if recent:
+        sections.append("Recent exchange:\n" + "\n\n".join(recent))
+    sections.append(fixed[2])
+    prompt = "\n\n".join(sections)
+
+    tokens = used + sum(summary_tokens) + sum(recent_tokens)
+    logger.info(
+        "Prompt ~%d tokens (budget %d): %d summary lines, %d recent turns, %d earlier turns dropped",
+        tokens, budget, len(summary), len(recent), len(turns) - len(summary) - len(recent)
+    )
+    return prompt, tokens
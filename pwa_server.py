@@ -1,95 +1,209 @@
 """
 PWA File Server - Serves manifest.json, sw.js, and PWA files
 Run this alongside your Streamlit app for full PWA functionality
+
+    python pwa_server.py                          # Flask development server
+    python pwa_server.py --debug                  # ... with the debugger and reloader (local use only)
+    python pwa_server.py --production --workers 4 # gunicorn, assets precompressed at startup
 """
 
-from flask import Flask, send_file, send_from_directory, Response
+from flask import Flask, Response, request
+import argparse
+import logging
 import os
 from pathlib import Path
 
-app = Flask(__name__)
+import metrics
+from asset_cache import NO_CACHE, SHORT_CACHE, AssetCache, variants_response
+from asset_pipeline import (BUILD_DIR, IMAGES_DIR, MIME_TYPES, SERVICE_WORKER, VERSES_DIR, derivative_path,
+                            pick_derivative)
+from verse_index import (DEFAULT_PAGE_SIZE, DEFAULT_SEARCH_SIZE, JSON_MIMETYPE, APIError, dumps,
+                         get_verse_index, page_args)
+
+# Flask's built-in /static route would shadow serve_static below
+app = Flask(__name__, static_folder=None)
 
 # Set the base directory to the current working directory
 BASE_DIR = Path(__file__).parent
 
+PRELOAD_ASSETS = [
+    'manifest.json', 'sw.js', os.path.relpath(SERVICE_WORKER, BASE_DIR), 'pwa.html', 'bhagavad_gita_verses.csv',
+    *(f'static/{p.name}' for p in sorted((BASE_DIR / 'static').glob('*.png'))),
+    *(os.path.relpath(p, BASE_DIR) for p in sorted(IMAGES_DIR.glob('*')) if p.suffix in ('.webp', '.jpeg')),
+    *(os.path.relpath(p, BASE_DIR) for p in sorted(VERSES_DIR.glob('*.json'))),
+    *(os.path.relpath(p, BASE_DIR) for p in sorted((BUILD_DIR / 'assets').glob('*'))),
+]
+
+assets = AssetCache(BASE_DIR)
+
+def serve_asset(parts, missing_message, **options):
+    """Serve a file from the precompressed asset cache, or 404"""
+    response = assets.respond(*parts, **options)
+    if response is None:
+        return Response(missing_message, status=404)
+    return response
+
 @app.route('/manifest.json')
 def serve_manifest():
     """Serve the manifest.json file with correct MIME type"""
-    try:
-        return send_file(
-            BASE_DIR / 'manifest.json',
-            mimetype='application/json',
-            as_attachment=False
-        )
-    except FileNotFoundError:
-        return Response("Manifest file not found", status=404)
+    return serve_asset(['manifest.json'], "Manifest file not found", mimetype='application/json')
+
+def service_worker_parts():
+    """The built service worker with its precache list, else the checked-in one that precaches nothing"""
+    return os.path.relpath(SERVICE_WORKER, BASE_DIR).split(os.sep) if SERVICE_WORKER.is_file() else ['sw.js']
 
 @app.route('/sw.js')
 def serve_service_worker():
-    """Serve the service worker with correct MIME type"""
-    try:
-        return send_file(
-            BASE_DIR / 'sw.js',
-            mimetype='application/javascript',
-            as_attachment=False
-        )
-    except FileNotFoundError:
-        return Response("Service worker not found", status=404)
+    """Serve the service worker with correct MIME type; browsers must always revalidate it"""
+    return serve_asset(service_worker_parts(), "Service worker not found", mimetype='application/javascript',
+                       cache_control=NO_CACHE)
 
 @app.route('/static/<path:filename>')
 def serve_static(filename):
-    """Serve static files (icons, etc.)"""
-    try:
-        return send_from_directory(BASE_DIR / 'static', filename)
-    except FileNotFoundError:
-        return Response("File not found", status=404)
+    """Serve static files (icons, and content-hashed build output with immutable caching)"""
+    return serve_asset(['static', filename], "File not found")
+
+@app.route('/images/<name>')
+def serve_responsive_image(name):
+    """Serve the pre-built derivative that best fits ?w= and the Accept header"""
+    width = request.args.get('w', 640, type=int)
+    fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    derivative = pick_derivative(name, width, fmt)
+    if derivative is None:
+        return Response("Image not built - run asset_pipeline.py", status=404)
+    relative_path = os.path.relpath(derivative_path(derivative), BASE_DIR)
+    return serve_asset(relative_path.split(os.sep), "Image not found", mimetype=MIME_TYPES[fmt],
+                       cache_control=SHORT_CACHE, vary=('Accept',))
 
 @app.route('/pwa.html')
 def serve_pwa_page():
     """Serve the PWA landing page"""
-    try:
-        return send_file(
-            BASE_DIR / 'pwa.html',
-            mimetype='text/html'
-        )
-    except FileNotFoundError:
-        return Response("PWA page not found", status=404)
+    return serve_asset(['pwa.html'], "PWA page not found", mimetype='text/html')
 
 @app.route('/bhagavad_gita_verses.csv')
 def serve_csv():
     """Serve the Gita verses CSV for offline caching"""
-    try:
-        return send_file(
-            BASE_DIR / 'bhagavad_gita_verses.csv',
-            mimetype='text/csv',
-            as_attachment=False
-        )
-    except FileNotFoundError:
-        return Response("CSV file not found", status=404)
+    return serve_asset(['bhagavad_gita_verses.csv'], "CSV file not found", mimetype='text/csv')
+
+@app.route('/verses/index.json')
+def serve_verse_index():
+    """Serve the chapter shard index; clients revalidate it to learn which shards changed"""
+    return serve_asset([os.path.relpath(VERSES_DIR, BASE_DIR), 'index.json'],
+                       "Verse index not built - run asset_pipeline.py", mimetype='application/json')
+
+@app.route('/verses/<filename>')
+def serve_verse_shard(filename):
+    """Serve a content-hashed chapter shard with immutable caching"""
+    return serve_asset([os.path.relpath(VERSES_DIR, BASE_DIR), filename], "Chapter shard not found",
+                       mimetype='application/json')
+
+@app.route('/api/chapters')
+def api_chapters():
+    """List chapters with their titles and verse counts"""
+    return variants_response(get_verse_index().chapter_list, JSON_MIMETYPE, NO_CACHE)
+
+@app.route('/api/chapters/<int:chapter>')
+def api_chapter(chapter):
+    """One page of a chapter's verses (?page=, ?per_page=)"""
+    page, per_page = page_args(request.args.get('page'), request.args.get('per_page'),
+                               DEFAULT_PAGE_SIZE)
+    return variants_response(get_verse_index().chapter_page(chapter, page, per_page), JSON_MIMETYPE, NO_CACHE)
+
+@app.route('/api/verses/<reference>')
+def api_verse(reference):
+    """A verse by reference (2.47) or a range (1.4-1.6); ranged entries are found by any verse they cover"""
+    return variants_response(get_verse_index().verse(reference), JSON_MIMETYPE, NO_CACHE)
+
+@app.route('/api/search')
+def api_search():
+    """Verses containing all words of ?q=, ranked by relevance"""
+    page, per_page = page_args(request.args.get('page'), request.args.get('per_page'),
+                               DEFAULT_SEARCH_SIZE)
+    return variants_response(get_verse_index().search(request.args.get('q', ''), page, per_page),
+                             JSON_MIMETYPE, NO_CACHE)
+
+@app.errorhandler(APIError)
+def api_error(error):
+    """JSON error body for bad API requests"""
+    return Response(dumps({'error': error.message}), status=error.status, mimetype=JSON_MIMETYPE)
 
 @app.route('/Public/Images/<path:filename>')
 def serve_images(filename):
     """Serve images from Public/Images directory"""
-    try:
-        return send_from_directory(BASE_DIR / 'Public' / 'Images', filename)
-    except FileNotFoundError:
-        return Response("Image not found", status=404)
+    return serve_asset(['Public/Images', filename], "Image not found")
+
+@app.route('/metrics')
+def serve_metrics():
+    """Prometheus text exposition of the metrics written by the app's processes (needs METRICS_TOKEN)"""
+    if not metrics.scrape_allowed(request.headers.get('Authorization')):
+        return Response("Not found", status=404)
+    return Response(
+        metrics.render_prometheus(metrics.collect()),
+        mimetype='text/plain; version=0.0.4',
+        headers={'Cache-Control': 'no-store'}
+    )
 
 @app.route('/')
 def root():
     """Redirect to Streamlit app or serve PWA page"""
-    return send_file(BASE_DIR / 'pwa.html', mimetype='text/html')
+    return serve_asset(['pwa.html'], "PWA page not found", mimetype='text/html')
+
+def run_production(host, port, workers):
+    """Serve with gunicorn, preloading the app so compressed assets are shared by all workers"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("⚠️  gunicorn is not installed - falling back to a threaded single-process server")
+        from werkzeug.serving import run_simple
+        run_simple(host, port, app, threaded=True)
+        return
+
+    class PWAApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', 4)
+            self.cfg.set('preload_app', True)
+            self.cfg.set('accesslog', '-')
+
+        def load(self):
+            return app
+
+    PWAApplication().run()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="WisdomWeaver PWA file server")
+    parser.add_argument('--production', action='store_true',
+                        help="run under gunicorn with multiple workers instead of the debug server")
+    parser.add_argument('--debug', action='store_true',
+                        help="enable Flask's debugger and reloader; never on a reachable host")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
     print("🕉️  WisdomWeaver PWA File Server")
     print("=" * 40)
-    print("Starting PWA file server on port 5000...")
-    print("Manifest: http://localhost:5000/manifest.json")
-    print("Service Worker: http://localhost:5000/sw.js")
-    print("PWA Page: http://localhost:5000/pwa.html")
-    print("Static Files: http://localhost:5000/static/")
+    mode = 'production' if args.production else 'debug' if args.debug else 'development'
+    print(f"Starting PWA file server on port {args.port} ({mode} mode)...")
+    print(f"Manifest: http://localhost:{args.port}/manifest.json")
+    print(f"Service Worker: http://localhost:{args.port}/sw.js")
+    print(f"PWA Page: http://localhost:{args.port}/pwa.html")
+    print(f"Static Files: http://localhost:{args.port}/static/")
+    print(f"Header Image: http://localhost:{args.port}/images/header?w=640")
+    print(f"Verse Shards: http://localhost:{args.port}/verses/index.json")
+    print(f"Verse API: http://localhost:{args.port}/api/chapters")
+    if metrics.METRICS_TOKEN:
+        print(f"Metrics: http://localhost:{args.port}/metrics (bearer token from METRICS_TOKEN)")
     print("\nRun your Streamlit app on port 8501:")
     print("streamlit run app.py")
     print("=" * 40)
-    
-    app.run(host='0.0.0.0', port=5000, debug=True)
+
+    if args.production:
+        logging.basicConfig(level=logging.INFO)
+        assets.preload(PRELOAD_ASSETS)
+        get_verse_index()
+        run_production(args.host, args.port, args.workers)
+    else:
+        app.run(host=args.host, port=args.port, debug=args.debug)
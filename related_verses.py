@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Precomputed related-verses graph.
+
+An offline build step scores every pair of verses by TF-IDF cosine
+similarity of their translations blended with the cosine similarity of
+their concept tags (keyword_tagger.py), and keeps each verse's K best
+neighbours. Immediate neighbours in the same chapter are left out; the
+verse browser already shows them side by side. The graph is written to
+static/build/related_verses.bin as flat arrays:
+
+    header      magic, format version, byte order, K, verse count, base count, slot count, build hash
+    bases       u32[chapters + 2]   first slot of each chapter (indexed by chapter number)
+    offsets     u32[count + 1]      start of each verse key in the text area
+    slots       u16[slots]          entry covering (chapter, verse number), 0xFFFF if none
+    neighbours  u16[count * K]      related entries, best first, 0xFFFF padded
+    scores      u16[count * K]      similarity * 65535
+    chapters    u8[count]           chapter of each entry
+    text        UTF-8 verse keys ("2.47", "1.4 – 1.6")
+
+A lookup is two array reads, so related verses cost the same for any verse
+and any number of verses. When the file is missing or was built from a
+different CSV or vocabulary, the graph is built in memory on first use.
+
+    python related_verses.py          # build (skips work when the inputs are unchanged)
+    python related_verses.py --force  # rebuild
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import struct
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple, Union
+
+from asset_pipeline import BASE_DIR, BUILD_DIR, VERSES_CSV, content_hash
+from keyword_tagger import get_keyword_tagger, load_vocabulary
+from offline_answer import tfidf_vectors
+from verse_refs import verse_numbers
+
+logger = logging.getLogger(__name__)
+
+RELATED_VERSES_FILE = BUILD_DIR / 'related_verses.bin'
+K = 8                   # neighbours stored per verse
+CONCEPT_WEIGHT = 0.35   # share of the score from shared concepts, the rest from shared words
+
+MAGIC = b"WWRV"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBBxIII16s")
+NONE = 0xFFFF
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+# (chapter, verse key, similarity)
+Related = Tuple[int, str, float]
+
+
+def _load_verses(source_bytes: bytes) -> List[Tuple[int, str, str]]:
+    """(chapter, verse key, translation) in chapter and verse order."""
+    rows = csv.DictReader(io.StringIO(source_bytes.decode('utf-8')))
+    verses = [(int(row['chapter_number'].split()[-1]), row['chapter_verse'], row['translation']) for row in rows]
+    return sorted(verses, key=lambda v: (v[0], verse_numbers(v[1])[0]))
+
+
+def build_hash(source_bytes: bytes) -> str:
+    """Fingerprint of everything the graph depends on."""
+    settings = json.dumps([K, CONCEPT_WEIGHT, FORMAT_VERSION, load_vocabulary()], sort_keys=True)
+    return content_hash(source_bytes + settings.encode('utf-8'), 16)
+
+
+def build_graph(source_bytes: bytes) -> bytes:
+    """Score every pair of verses and return the serialized K-nearest-neighbour graph."""
+    import numpy as np
+
+    verses = _load_verses(source_bytes)
+    count = len(verses)
+    tagger = get_keyword_tagger()
+
+    def unit_rows(rows: List[dict]) -> 'np.ndarray':
+        columns = {key: i for i, key in enumerate(sorted({key for row in rows for key in row}))}
+        matrix = np.zeros((len(rows), max(1, len(columns))), dtype=np.float32)
+        for i, row in enumerate(rows):
+            for key, value in row.items():
+                matrix[i, columns[key]] = value
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    # Lexical: the offline engine's TF-IDF weighting of its stemmed, stopword-free terms
+    lexical = unit_rows(tfidf_vectors([translation for _, _, translation in verses])[0])
+    concepts = unit_rows([tagger.scores(translation) for _, _, translation in verses])
+    similarity = (1 - CONCEPT_WEIGHT) * (lexical @ lexical.T) + CONCEPT_WEIGHT * (concepts @ concepts.T)
+
+    # Not the verse itself, nor the verses right before and after it
+    np.fill_diagonal(similarity, -1)
+    chapters = np.array([v[0] for v in verses])
+    adjacent = np.flatnonzero(chapters[1:] == chapters[:-1])
+    similarity[adjacent, adjacent + 1] = -1
+    similarity[adjacent + 1, adjacent] = -1
+
+    k = min(K, count - 1)
+    best = np.argpartition(-similarity, k, axis=1)[:, :k]
+    best_scores = np.take_along_axis(similarity, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.clip(np.take_along_axis(best_scores, order, axis=1), 0, 1)
+
+    neighbours = np.full((count, K), NONE, dtype=np.uint16)
+    scores = np.zeros((count, K), dtype=np.uint16)
+    neighbours[:, :k] = np.where(best_scores > 0, best, NONE)
+    scores[:, :k] = np.round(best_scores * 65535)
+
+    # Dense slot table: bases[chapter] + verse number -> entry
+    last_chapter = int(chapters.max())
+    spans = [0] * (last_chapter + 2)
+    for chapter, verse, _ in verses:
+        spans[chapter] = max(spans[chapter], verse_numbers(verse)[1] + 1)
+    bases = np.zeros(last_chapter + 2, dtype=np.uint32)
+    bases[1:] = np.cumsum(spans[:-1])
+    slots = np.full(int(bases[-1]) + spans[-1], NONE, dtype=np.uint16)
+    for i, (chapter, verse, _) in enumerate(verses):
+        first, last = verse_numbers(verse)
+        slots[bases[chapter] + first:bases[chapter] + last + 1] = i
+
+    keys = [verse.encode('utf-8') for _, verse, _ in verses]
+    offsets = np.zeros(count + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(key) for key in keys])
+    return b"".join([
+        HEADER.pack(MAGIC, FORMAT_VERSION, int(LITTLE_ENDIAN), K, count, len(bases), len(slots),
+                    build_hash(source_bytes).encode('ascii')),
+        bases.tobytes(),
+        offsets.tobytes(),
+        slots.tobytes(),
+        neighbours.tobytes(),
+        scores.tobytes(),
+        chapters.astype(np.uint8).tobytes(),
+        b"".join(keys),
+    ])
+
+
+class RelatedVerses:
+    """The K-nearest-neighbour graph, read from its serialized form without copying."""
+
+    def __init__(self, data: bytes):
+        magic, version, little_endian, k, count, base_count, slot_count, graph_hash = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"not a version {FORMAT_VERSION} related-verses graph")
+        if bool(little_endian) != LITTLE_ENDIAN:
+            raise ValueError("graph was built on a machine with the other byte order; rebuild it")
+        self.k = k
+        self.count = count
+        self.build_hash = graph_hash.decode('ascii')
+
+        view = memoryview(data)
+        position = HEADER.size
+        sections = []
+        for fmt, length in (("I", base_count), ("I", count + 1), ("H", slot_count), ("H", count * k),
+                            ("H", count * k), ("B", count)):
+            size = struct.calcsize(fmt) * length
+            sections.append(view[position:position + size].cast(fmt))
+            position += size
+        self.bases, self.offsets, self.slots, self.neighbours, self.scores, self.chapters = sections
+        self.text = view[position:]
+
+    def index(self, chapter: int, number: int) -> int:
+        """Entry covering chapter.number, or -1."""
+        if not 0 < chapter < len(self.bases) - 1 or number < 0:
+            return -1
+        slot = self.bases[chapter] + number
+        if slot >= self.bases[chapter + 1]:
+            return -1
+        entry = self.slots[slot]
+        return -1 if entry == NONE else entry
+
+    def reference(self, entry: int) -> str:
+        return str(self.text[self.offsets[entry]:self.offsets[entry + 1]], 'utf-8')
+
+    def related(self, chapter: int, verse: Union[int, str], limit: Optional[int] = None) -> List[Related]:
+        """(chapter, verse key, similarity) of the verses most related to a verse, best first."""
+        entry = self.index(chapter, verse_numbers(verse)[0])
+        if entry < 0:
+            return []
+        start = entry * self.k
+        related = []
+        for i in range(start, start + min(limit or self.k, self.k)):
+            neighbour = self.neighbours[i]
+            if neighbour == NONE:
+                break
+            related.append((self.chapters[neighbour], self.reference(neighbour), self.scores[i] / 65535))
+        return related
+
+
+def build_related_verses(source: str = VERSES_CSV, force: bool = False) -> RelatedVerses:
+    """Write the graph file unless it is up to date; returns the graph."""
+    source_bytes = (BASE_DIR / source).read_bytes()
+    expected = build_hash(source_bytes)
+    if not force and RELATED_VERSES_FILE.exists():
+        try:
+            graph = RelatedVerses(RELATED_VERSES_FILE.read_bytes())
+            if graph.build_hash == expected:
+                print("✅ related verses: up to date")
+                return graph
+        except ValueError:
+            pass
+
+    started = time.perf_counter()
+    data = build_graph(source_bytes)
+    RELATED_VERSES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    RELATED_VERSES_FILE.write_bytes(data)
+    graph = RelatedVerses(data)
+    print(f"✅ related verses: {graph.count} verses x {graph.k} neighbours, {len(data) / 1024:.1f} KB "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return graph
+
+
+def load_related_verses(source: str = VERSES_CSV) -> RelatedVerses:
+    """The built graph, or one built in memory when the file is missing or stale."""
+    source_bytes = (BASE_DIR / source).read_bytes()
+    expected = build_hash(source_bytes)
+    try:
+        graph = RelatedVerses(RELATED_VERSES_FILE.read_bytes())
+        if graph.build_hash == expected:
+            return graph
+        logger.warning("%s is stale; building the related-verses graph in memory "
+                       "(run `python related_verses.py` to refresh it)", RELATED_VERSES_FILE)
+    except FileNotFoundError:
+        logger.info("%s not built; building the related-verses graph in memory", RELATED_VERSES_FILE)
+    except ValueError as e:
+        logger.warning("Ignoring %s: %s", RELATED_VERSES_FILE, e)
+    return RelatedVerses(build_graph(source_bytes))
+
+
+_graph: Optional[RelatedVerses] = None
+_graph_lock = threading.Lock()
+
+
+def get_related_verses() -> RelatedVerses:
+    """Process-wide graph, loaded on first use."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = load_related_verses()
+        return _graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the related-verses graph")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the inputs are unchanged")
+    args = parser.parse_args()
+    build_related_verses(force=args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Single-flight coalescing of identical model requests.
+
+When several sessions ask the same question at once (typically the same
+quick action clicked at the same moment), only the first caller, the leader,
+calls the model. Requests are keyed by the question and the context it is
+asked in (theme, mood, emotional state), not by the whole prompt, which
+also carries each session's conversation; callers only coalesce questions
+whose answer does not depend on that conversation. Callers that arrive while it is in flight wait on the leader's
+concurrent.futures.Future and get the same result or the same exception.
+Futures work across threads and event loops alike, so this covers the job
+queue's workers and the answer warmer.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+COALESCE_TIMEOUT_SEC = float(os.getenv("COALESCE_TIMEOUT_SEC", "60"))
+
+
+def request_key(question: str, *context: Optional[str]) -> str:
+    """Key for a question asked in a context (theme, mood, ...), ignoring differences in whitespace and case."""
+    normalized = [re.sub(r"\s+", " ", part or "").strip().casefold() for part in (question, *context)]
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+
+class RequestCoalescer:
+    def __init__(self, timeout: float = COALESCE_TIMEOUT_SEC):
+        self.timeout = timeout
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {"leaders": 0, "coalesced": 0, "errors": 0, "timeouts": 0}
+
+    def run(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Return fn(*args, **kwargs), sharing one call among concurrent callers with the same key."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.counters["leaders"] += 1
+            else:
+                self.counters["coalesced"] += 1
+        metrics.inc("wisdom_coalesced_requests_total", role="leader" if leader else "follower")
+
+        if not leader:
+            logger.debug("Waiting on in-flight request %s", key[:12])
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                with self._lock:
+                    self.counters["timeouts"] += 1
+                raise
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self.counters["errors"] += 1
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self.counters, "in_flight": len(self._in_flight)}
+
+
+_coalescer: Optional[RequestCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Process-wide coalescer shared by every session's bot."""
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = RequestCoalescer()
+        return _coalescer
@@ -0,0 +1,435 @@
+"""
+Durable chat history, question history and favorites.
+
+Messages are persisted to SQLite (WAL mode) by a background writer that
+batches appends into one transaction, so the Streamlit script does not wait
+on disk unless the writer falls far behind. Pending writes are counted per
+user: a read waits only for the reader's own queued messages, and asks the
+writer to write its batch now instead of at the end of the flush interval.
+The wait is bounded, and a writer that dies is restarted, so a failure
+costs messages rather than hanging every session. Sessions keep only a
+recent window of messages in memory; older turns are paged back from the
+store when the archive is opened. An unguessable user id kept in a
+first-party cookie lets history survive reloads; it never appears in the
+URL, so shared links do not share history.
+
+Each message's concept tags (keyword_tagger.py) are written to an inverted
+index in the same transaction, so filtering history by concept is an index
+range scan rather than a pass over every payload. The same transaction adds
+the message's text to an FTS5 full-text index, which answers word, prefix
+and phrase searches ranked by BM25 with highlighted snippets. Both indexes
+live in the database file, so memory stays bounded however long the history.
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from keyword_tagger import get_keyword_tagger, message_text
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_PATH = os.getenv(
+    "SESSION_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db")
+)
+FLUSH_INTERVAL_SEC = 0.5    # longest an appended message waits before it is written
+FLUSH_BATCH_SIZE = 500      # write as soon as this many messages are waiting
+MAX_PENDING_WRITES = 5000   # appends block beyond this, bounding memory if the disk falls behind
+FLUSH_TIMEOUT_SEC = 10.0    # longest a read waits for queued messages before reading what is on disk
+KEYWORD_INDEX_VERSION = 1   # PRAGMA user_version once stored messages have been tagged
+SEARCH_INDEX_VERSION = 2    # ... and added to the full-text index
+SNIPPET_WORDS = 16          # words of context around a search hit
+USER_COOKIE = "wisdom_weaver_uid"
+USER_COOKIE_MAX_AGE = 365 * 24 * 3600
+_WRITE_NOW = None           # queued by a reader waiting on its own messages: end the batch early
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS messages ("
+    " id INTEGER PRIMARY KEY,"
+    " user_id TEXT NOT NULL,"
+    " session_id TEXT NOT NULL,"
+    " role TEXT NOT NULL,"
+    " payload TEXT NOT NULL,"
+    " created_at REAL NOT NULL"
+    ")",
+    "CREATE INDEX IF NOT EXISTS messages_user_time ON messages (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS messages_session_time ON messages (session_id, created_at)",
+    "CREATE TABLE IF NOT EXISTS message_keywords ("
+    " user_id TEXT NOT NULL,"
+    " keyword TEXT NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " message_id INTEGER NOT NULL,"
+    " PRIMARY KEY (user_id, keyword, created_at, message_id)"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS favorites ("
+    " user_id TEXT NOT NULL,"
+    " verse TEXT NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " PRIMARY KEY (user_id, verse)"
+    ") WITHOUT ROWID",
+    # rowid is messages.id; user_id is indexed so a search only reads that user's postings
+    # prefix: extra index entries for 2- and 3-character prefixes, so short prefix queries do not expand every term
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    " user_id, text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+    ")",
+)
+_SEARCH_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+_USER_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _stored_fields(message: Dict) -> Dict:
+    # Render caches and job bookkeeping stay in memory
+    return {k: v for k, v in message.items() if not k.startswith("_") and k != "pending_job"}
+
+
+def _message_keywords(message: Dict) -> List[str]:
+    # Answers carry their tags; questions are tagged here
+    return message.get("keywords") or get_keyword_tagger().tag(message_text(message))
+
+
+def _search_text(message: Dict) -> str:
+    return " ".join(filter(None, (message.get("verse_reference"), message_text(message))))
+
+
+def _fts_string(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def search_expression(query: str) -> Optional[str]:
+    """FTS5 expression for a search box query: words are ANDed, "quoted words" are a phrase, word* is a prefix.
+
+    Every term is quoted, so FTS5 operators typed by the user are searched as words. None if nothing is searchable.
+    """
+    terms = []
+    for phrase, word in _SEARCH_TERM.findall(query):
+        text = (phrase or word).strip()
+        prefix = text.endswith("*")
+        text = text.rstrip("*").strip()
+        if not re.search(r"\w", text):
+            continue
+        terms.append(_fts_string(text) + (" *" if prefix else ""))
+    return " AND ".join(terms) or None
+
+
+class SessionStore:
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._pending = queue.Queue(maxsize=MAX_PENDING_WRITES)
+        self._pending_by_user: Dict[str, int] = {}
+        self._written_cond = threading.Condition()
+        self._writer_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        conn = self._connect()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < KEYWORD_INDEX_VERSION:
+            self._reindex_keywords(conn)
+        if version < SEARCH_INDEX_VERSION:
+            self._index_search(conn)
+        self._start_writer()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _start_writer(self):
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    def _check_writer(self):
+        """Restart the writer if it has died, so queued messages are still written and waiters are woken."""
+        if self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if not self._writer.is_alive():
+                logger.error("Session store writer stopped; restarting it")
+                self._start_writer()
+
+    # Messages
+
+    def append(self, user_id: str, session_id: str, message: Dict):
+        """Queue a message for the background writer."""
+        created_at = message.setdefault("created_at", time.time())
+        payload = json.dumps(_stored_fields(message), ensure_ascii=False, separators=(",", ":"))
+        self._check_writer()
+        with self._written_cond:
+            self._pending_by_user[user_id] = self._pending_by_user.get(user_id, 0) + 1
+        self._pending.put((user_id, session_id, message["role"], payload, created_at,
+                           _message_keywords(message), _search_text(message)))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL_SEC
+            while len(batch) < FLUSH_BATCH_SIZE and batch[-1] is not _WRITE_NOW:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not _WRITE_NOW]
+            try:
+                with conn:
+                    for user_id, session_id, role, payload, created_at, keywords, text in rows:
+                        message_id = conn.execute(
+                            "INSERT INTO messages (user_id, session_id, role, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                            (user_id, session_id, role, payload, created_at)
+                        ).lastrowid
+                        conn.executemany(
+                            "INSERT OR IGNORE INTO message_keywords (user_id, keyword, created_at, message_id)"
+                            " VALUES (?, ?, ?, ?)",
+                            [(user_id, keyword, created_at, message_id) for keyword in keywords]
+                        )
+                        conn.execute("INSERT INTO messages_fts (rowid, user_id, text) VALUES (?, ?, ?)",
+                                     (message_id, user_id, text))
+                if rows:
+                    self.written += len(rows)
+                    self.batches += 1
+            except Exception:
+                # The batch is lost but the writer keeps going; readers and appenders depend on it
+                logger.exception("Failed to persist %d messages", len(rows))
+            finally:
+                with self._written_cond:
+                    for row in rows:
+                        remaining = self._pending_by_user.get(row[0], 0) - 1
+                        if remaining > 0:
+                            self._pending_by_user[row[0]] = remaining
+                        else:
+                            self._pending_by_user.pop(row[0], None)
+                    self._written_cond.notify_all()
+
+    def flush(self, user_id: Optional[str] = None, timeout: float = FLUSH_TIMEOUT_SEC) -> bool:
+        """Wait until the user's queued messages (every user's without one) have been written.
+
+        Gives up after `timeout` seconds, so a stalled writer slows reads down instead of blocking
+        them; they then return what is already on disk. Returns whether everything was written.
+        """
+        self._check_writer()
+
+        def written() -> bool:
+            return not (self._pending_by_user if user_id is None else self._pending_by_user.get(user_id))
+
+        with self._written_cond:
+            if written():
+                return True
+        try:
+            self._pending.put_nowait(_WRITE_NOW)
+        except queue.Full:
+            pass    # a full queue is written in full batches anyway
+        with self._written_cond:
+            if self._written_cond.wait_for(written, timeout):
+                return True
+        logger.warning("Session store writer is %.0f s behind; reading what is on disk", timeout)
+        return False
+
+    def recent(self, user_id: str, limit: int) -> List[Dict]:
+        """The user's latest messages, oldest first."""
+        self.flush(user_id)
+        rows = self._connect().execute(
+            "SELECT payload FROM messages WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+        return [json.loads(payload) for payload, in reversed(rows)]
+
+    def before(self, user_id: str, created_at: float, limit: Optional[int] = None) -> List[Dict]:
+        """Up to `limit` messages older than created_at (all of them without a limit), oldest first."""
+        self.flush(user_id)
+        rows = self._connect().execute(
+            "SELECT payload FROM messages WHERE user_id = ? AND created_at < ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, created_at, -1 if limit is None else limit)
+        ).fetchall()
+        return [json.loads(payload) for payload, in reversed(rows)]
+
+    def count(self, user_id: str, role: Optional[str] = None) -> int:
+        self.flush(user_id)
+        if role is None:
+            sql, args = "SELECT COUNT(*) FROM messages WHERE user_id = ?", (user_id,)
+        else:
+            sql, args = "SELECT COUNT(*) FROM messages WHERE user_id = ? AND role = ?", (user_id, role)
+        return self._connect().execute(sql, args).fetchone()[0]
+
+    def recent_questions(self, user_id: str, limit: int) -> List[str]:
+        """The user's latest questions, oldest first."""
+        self.flush(user_id)
+        rows = self._connect().execute(
+            "SELECT payload FROM messages WHERE user_id = ? AND role = 'user' ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+        return [json.loads(payload)["content"] for payload, in reversed(rows)]
+
+    def clear_messages(self, user_id: str):
+        self.flush(user_id)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages_fts WHERE rowid IN (SELECT id FROM messages WHERE user_id = ?)", (user_id,))
+            conn.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM message_keywords WHERE user_id = ?", (user_id,))
+
+    # Concepts
+
+    def _reindex_keywords(self, conn: sqlite3.Connection):
+        """Tag every stored message with the current tagger; runs once when the index is created."""
+        started = time.monotonic()
+        tagger = get_keyword_tagger()
+        rows = conn.execute("SELECT id, user_id, payload, created_at FROM messages").fetchall()
+        with conn:
+            conn.execute("DELETE FROM message_keywords")
+            for message_id, user_id, payload, created_at in rows:
+                message = json.loads(payload)
+                keywords = tagger.tag(message_text(message))
+                if "keywords" in message and message["keywords"] != keywords:
+                    message["keywords"] = keywords
+                    conn.execute("UPDATE messages SET payload = ? WHERE id = ?",
+                                 (json.dumps(message, ensure_ascii=False, separators=(",", ":")), message_id))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO message_keywords (user_id, keyword, created_at, message_id) VALUES (?, ?, ?, ?)",
+                    [(user_id, keyword, created_at, message_id) for keyword in keywords]
+                )
+            conn.execute(f"PRAGMA user_version = {KEYWORD_INDEX_VERSION}")
+        logger.info("Tagged %d stored messages in %.1f s", len(rows), time.monotonic() - started)
+
+    def keyword_counts(self, user_id: str) -> List[Tuple[str, int]]:
+        """(concept, number of messages) for the user's history, most frequent first."""
+        self.flush(user_id)
+        return self._connect().execute(
+            "SELECT keyword, COUNT(*) FROM message_keywords WHERE user_id = ? GROUP BY keyword ORDER BY 2 DESC, 1",
+            (user_id,)
+        ).fetchall()
+
+    def with_keyword(self, user_id: str, keyword: str, limit: int) -> List[Dict]:
+        """The user's latest messages tagged with a concept, newest first."""
+        self.flush(user_id)
+        rows = self._connect().execute(
+            "SELECT m.payload FROM message_keywords k JOIN messages m ON m.id = k.message_id"
+            " WHERE k.user_id = ? AND k.keyword = ? ORDER BY k.created_at DESC, k.message_id DESC LIMIT ?",
+            (user_id, keyword, limit)
+        ).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    # Full-text search
+
+    def _index_search(self, conn: sqlite3.Connection):
+        """Add every stored message to the full-text index; runs once when the index is created."""
+        started = time.monotonic()
+        rows = conn.execute("SELECT id, user_id, payload FROM messages").fetchall()
+        with conn:
+            conn.execute("DELETE FROM messages_fts")
+            conn.executemany(
+                "INSERT INTO messages_fts (rowid, user_id, text) VALUES (?, ?, ?)",
+                ((message_id, user_id, _search_text(json.loads(payload))) for message_id, user_id, payload in rows)
+            )
+            conn.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+        logger.info("Indexed %d stored messages for search in %.1f s", len(rows), time.monotonic() - started)
+
+    def search(self, user_id: str, query: str, limit: int = 10,
+               marks: Tuple[str, str] = ("**", "**")) -> List[Tuple[Dict, str]]:
+        """The user's messages matching a search box query, best first, each with a highlighted snippet."""
+        expression = search_expression(query)
+        if expression is None:
+            return []
+        self.flush(user_id)
+        # ORDER BY rank lets FTS5 sort by BM25 (the user_id column weighted 0) and build snippets for the top rows only
+        rows = self._connect().execute(
+            "SELECT m.payload, hits.snippet FROM ("
+            "  SELECT rowid, rank, snippet(messages_fts, 1, ?, ?, '…', ?) AS snippet FROM messages_fts"
+            "  WHERE messages_fts MATCH ? AND rank MATCH 'bm25(0.0, 1.0)' ORDER BY rank LIMIT ?"
+            ") AS hits JOIN messages m ON m.id = hits.rowid ORDER BY hits.rank",
+            (marks[0], marks[1], SNIPPET_WORDS, f"user_id : {_fts_string(user_id)} AND text : ({expression})", limit)
+        ).fetchall()
+        return [(json.loads(payload), snippet) for payload, snippet in rows]
+
+    # Favorites
+
+    def favorites(self, user_id: str) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT verse FROM favorites WHERE user_id = ? ORDER BY created_at", (user_id,)
+        ).fetchall()
+        return [verse for verse, in rows]
+
+    def add_favorite(self, user_id: str, verse: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO favorites (user_id, verse, created_at) VALUES (?, ?, ?)",
+                (user_id, verse, time.time())
+            )
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide store shared by all sessions."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(SESSION_STORE_PATH)
+        return _store
+
+
+def get_session_id() -> str:
+    """Return the id of the current Streamlit browser session."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+def get_user_id() -> str:
+    """Unguessable id for this browser, read from its cookie so reloads find the same history.
+
+    Whoever holds the id can read the history, so it is never put in the URL, and a ?uid= in
+    the URL is removed rather than read.
+    """
+    import streamlit as st
+
+    user_id = st.session_state.get("user_id")
+    if user_id is None:
+        cookie = st.context.cookies.get(USER_COOKIE)
+        if cookie and _USER_ID.fullmatch(cookie):
+            user_id = cookie
+        else:
+            user_id = secrets.token_hex(16)
+            st.session_state.user_cookie_pending = True
+        st.session_state.user_id = user_id
+    if "uid" in st.query_params:
+        del st.query_params["uid"]
+    return user_id
+
+
+def remember_user():
+    """Write a newly issued user id to the browser's cookie; call from the main script on every run.
+
+    The cookie is only read when a session starts, so it is written on every run of the session
+    that issued the id.
+    """
+    import streamlit as st
+    import streamlit.components.v1 as components
+
+    if not st.session_state.get("user_cookie_pending"):
+        return
+    cookie = f"{USER_COOKIE}={get_user_id()}; path=/; max-age={USER_COOKIE_MAX_AGE}; SameSite=Strict"
+    components.html(
+        "<script>var page = window.parent;"
+        f"page.document.cookie = '{cookie}' + (page.location.protocol === 'https:' ? '; Secure' : '');</script>",
+        height=0
+    )
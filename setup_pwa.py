@@ -2,12 +2,37 @@
 """
 PWA Setup Script for WisdomWeaver
 This script helps configure and deploy the PWA components
+
+    python setup_pwa.py          # check the PWA files and configuration
+    python setup_pwa.py build    # fingerprint precached assets and write static/build/sw.js with their precache list
+    python setup_pwa.py verify   # check the precache manifest against the files on disk
 """
 
 import os
+import re
 import shutil
+import sys
 import json
 from pathlib import Path
+from urllib.parse import quote
+
+from asset_pipeline import BUILD_DIR, HEADER_IMAGE, SERVICE_WORKER, VERSE_INDEX, content_hash
+
+BASE_DIR = Path(__file__).parent
+ASSETS_DIR = BUILD_DIR / 'assets'
+PRECACHE_MANIFEST = BUILD_DIR / 'precache-manifest.json'
+# Checked in with an empty precache block, since the fingerprinted files it lists are build output
+SERVICE_WORKER_TEMPLATE = BASE_DIR / 'sw.js'
+
+# URL -> file the service worker precaches on install
+PRECACHE_FILES = {
+    '/': 'pwa.html',
+    '/manifest.json': 'manifest.json',
+    **{f'/static/icon-{size}.png': f'static/icon-{size}.png' for size in (72, 96, 128, 144, 152, 192, 384, 512)},
+    '/verses/index.json': os.path.relpath(VERSE_INDEX, BASE_DIR),
+    '/' + quote(HEADER_IMAGE): HEADER_IMAGE,
+}
+PRECACHE_BLOCK = re.compile(r'// @precache-start.*?// @precache-end', re.DOTALL)
 
 def check_files():
     """Check if all required PWA files exist"""
@@ -102,6 +127,133 @@ def generate_deployment_commands():
     print("\n3. For local testing:")
     print("   streamlit run app.py --server.enableStaticServing=true")
 
+def _fingerprinted_name(path: Path, digest: str) -> str:
+    stem = re.sub(r'[^A-Za-z0-9_-]+', '-', path.stem).strip('-')
+    return f"{stem}.{digest}{path.suffix}"
+
+
+def build_precache(base_dir: Path = BASE_DIR, assets_dir: Path = ASSETS_DIR) -> dict:
+    """Copy each precached file to a content-hashed name and return the precache manifest"""
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for url, relative_path in PRECACHE_FILES.items():
+        source = base_dir / relative_path
+        if not source.exists():
+            print(f"⚠️  Not precached, file missing: {relative_path}")
+            continue
+        data = source.read_bytes()
+        digest = content_hash(data)
+        asset = assets_dir / _fingerprinted_name(source, digest)
+        if not asset.exists():
+            asset.write_bytes(data)
+        entries.append({
+            'url': url,
+            'revision': digest,
+            'asset': '/' + asset.relative_to(base_dir).as_posix(),
+            'file': relative_path,
+            'bytes': len(data),
+        })
+
+    # Remove copies from previous builds
+    current = {Path(entry['asset']).name for entry in entries}
+    for old in assets_dir.iterdir():
+        if old.name not in current:
+            old.unlink()
+
+    return {
+        'version': content_hash(''.join(e['url'] + e['revision'] for e in entries).encode('utf-8')),
+        'entries': entries,
+    }
+
+
+def render_precache_block(manifest: dict) -> str:
+    entries = [{k: e[k] for k in ('url', 'revision', 'asset', 'bytes')} for e in manifest['entries']]
+    return (
+        "// @precache-start (generated by `python setup_pwa.py build` - do not edit by hand)\n"
+        f"const PRECACHE_VERSION = '{manifest['version']}';\n"
+        f"const PRECACHE_ENTRIES = {json.dumps(entries, indent=2)};\n"
+        "// @precache-end"
+    )
+
+
+def write_service_worker(manifest: dict, template: Path = SERVICE_WORKER_TEMPLATE,
+                         service_worker: Path = SERVICE_WORKER) -> bool:
+    """Write the service worker with the manifest's precache block; returns whether the file changed"""
+    source = template.read_text(encoding='utf-8')
+    if not PRECACHE_BLOCK.search(source):
+        raise ValueError(f"{template} has no // @precache-start ... // @precache-end block")
+    updated = PRECACHE_BLOCK.sub(lambda _: render_precache_block(manifest), source, count=1)
+    if service_worker.exists() and service_worker.read_text(encoding='utf-8') == updated:
+        return False
+    service_worker.parent.mkdir(parents=True, exist_ok=True)
+    service_worker.write_text(updated, encoding='utf-8')
+    return True
+
+
+def verify_precache(base_dir: Path = BASE_DIR, manifest_path: Path = PRECACHE_MANIFEST,
+                    service_worker: Path = SERVICE_WORKER) -> list:
+    """Problems found between the precache manifest, the files on disk and the built sw.js (empty when consistent)"""
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        return [f"cannot read {manifest_path}: {e}"]
+
+    problems = []
+    for entry in manifest['entries']:
+        source = base_dir / entry['file']
+        if not source.exists():
+            problems.append(f"{entry['url']}: {entry['file']} is missing")
+        elif content_hash(source.read_bytes()) != entry['revision']:
+            problems.append(f"{entry['url']}: {entry['file']} changed since the build")
+        asset = base_dir / entry['asset'].lstrip('/')
+        if not asset.exists() or content_hash(asset.read_bytes()) != entry['revision']:
+            problems.append(f"{entry['url']}: fingerprinted copy {entry['asset']} is missing or altered")
+
+    try:
+        match = PRECACHE_BLOCK.search(service_worker.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        match = None
+    if match is None or match.group(0) != render_precache_block(manifest):
+        problems.append(f"{service_worker.name}: precache list does not match the manifest")
+    return problems
+
+
+def build():
+    """Fingerprint precached assets, write the precache manifest and the built sw.js"""
+    print("🕉️  WisdomWeaver PWA Build")
+    print("=" * 40)
+    previous = {}
+    if PRECACHE_MANIFEST.exists():
+        previous = {e['url']: e['revision'] for e in json.loads(PRECACHE_MANIFEST.read_text())['entries']}
+
+    manifest = build_precache()
+    with open(PRECACHE_MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    changed = [e for e in manifest['entries'] if previous.get(e['url']) != e['revision']]
+    print(f"✅ {len(manifest['entries'])} precache entries, {sum(e['bytes'] for e in manifest['entries']) / 1024:.1f} KB")
+    for entry in changed:
+        print(f"   changed: {entry['url']} ({entry['bytes']} B)")
+    if write_service_worker(manifest):
+        print(f"✅ {SERVICE_WORKER.relative_to(BASE_DIR)} updated (precache version {manifest['version']}): "
+              f"clients re-download {sum(e['bytes'] for e in changed)} B")
+    else:
+        print(f"✅ {SERVICE_WORKER.relative_to(BASE_DIR)} up to date")
+
+    problems = verify_precache()
+    for problem in problems:
+        print(f"❌ {problem}")
+    return not problems
+
+
+def verify():
+    problems = verify_precache()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Precache manifest matches the files on disk and the built sw.js")
+    return not problems
+
+
 def main():
     """Main setup function"""
     print("🕉️  WisdomWeaver PWA Setup Check")
@@ -137,4 +289,9 @@ def main():
     return True
 
 if __name__ == "__main__":
-    main()
+    commands = {'build': build, 'verify': verify, 'check': main}
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command not in commands:
+        print(f"Usage: python setup_pwa.py [{'|'.join(commands)}]")
+        sys.exit(2)
+    sys.exit(0 if commands[command]() else 1)
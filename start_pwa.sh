@@ -30,6 +30,13 @@ echo "✅ Streamlit configured for PWA support"
 echo "🔍 Checking PWA files..."
 python3 setup_pwa.py
 
+# Build responsive image derivatives (skipped when sources are unchanged)
+echo "🖼️  Building static assets..."
+python3 asset_pipeline.py
+
+# Fingerprint precached files and refresh the service worker's precache list
+python3 setup_pwa.py build
+
 echo ""
 echo "🚀 Starting WisdomWeaver..."
 echo "📱 The app will be installable as a PWA!"
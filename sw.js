@@ -1,54 +1,129 @@
-const CACHE_NAME = 'wisdom-weaver-v1.0.0';
-const urlsToCache = [
-  '/',
-  '/manifest.json',
-  '/static/icon-72.png',
-  '/static/icon-96.png',
-  '/static/icon-128.png',
-  '/static/icon-144.png',
-  '/static/icon-152.png',
-  '/static/icon-192.png',
-  '/static/icon-384.png',
-  '/static/icon-512.png',
-  '/bhagavad_gita_verses.csv',
-  '/Public/Images/WhatsApp Image 2024-11-18 at 11.40.34_076eab8e.jpg'
-];
-
-// Install event - cache resources
+// @precache-start (generated by `python setup_pwa.py build` - do not edit by hand)
+const PRECACHE_VERSION = '';
+const PRECACHE_ENTRIES = [];
+// @precache-end
+
+// The checked-in sw.js precaches nothing; `setup_pwa.py build` writes static/build/sw.js, served at /sw.js,
+// with the list of content-hashed build files.
+// Precached files are kept by URL with the revision (content hash) they were fetched at,
+// so an update only downloads entries whose revision changed
+const PRECACHE = 'wisdom-weaver-precache';
+const PRECACHE_STAGING = 'wisdom-weaver-precache-staging';
+const REVISIONS_KEY = '/__precache-revisions';
+// Renamed when runtime caching was limited to hashed files, so activate drops cached API responses
+const RUNTIME_CACHE = 'wisdom-weaver-runtime-hashed';
+// Chapter shards are content-hashed and survive app shell updates
+const VERSE_CACHE = 'wisdom-weaver-verses';
+const VERSE_INDEX_URL = '/verses/index.json';
+// Only files whose URL carries their content hash are cached at runtime
+const HASHED_PREFIX = '/static/build/';
+const API_PREFIX = '/api/';
+const METRICS_URL = '/metrics';
+
+function cachedRevisions(cache) {
+  return cache.match(REVISIONS_KEY).then(function(response) {
+    return response ? response.json() : {};
+  });
+}
+
+// Install event - fetch new and changed precache entries into a staging cache
 self.addEventListener('install', function(event) {
-  console.log('[ServiceWorker] Install');
+  console.log('[ServiceWorker] Install', PRECACHE_VERSION);
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(function(cache) {
-        console.log('[ServiceWorker] Caching app shell');
-        return cache.addAll(urlsToCache);
-      })
+    caches.delete(PRECACHE_STAGING)
       .then(function() {
-        console.log('[ServiceWorker] Skip waiting');
+        return Promise.all([caches.open(PRECACHE), caches.open(PRECACHE_STAGING)]);
+      })
+      .then(function(opened) {
+        var precache = opened[0];
+        var staging = opened[1];
+        return cachedRevisions(precache).then(function(revisions) {
+          return Promise.all(PRECACHE_ENTRIES.map(function(entry) {
+            return precache.match(entry.url).then(function(cached) {
+              if (cached && revisions[entry.url] === entry.revision) {
+                return 0;
+              }
+              // Fingerprinted URL: never answered from a stale HTTP cache
+              return fetch(entry.asset).then(function(response) {
+                if (!response.ok) {
+                  throw new Error('Precache failed for ' + entry.url);
+                }
+                return staging.put(entry.url, response).then(function() {
+                  return entry.bytes;
+                });
+              });
+            });
+          }));
+        });
+      })
+      .then(function(fetched) {
+        var bytes = fetched.reduce(function(sum, n) { return sum + n; }, 0);
+        console.log('[ServiceWorker] Fetched', fetched.filter(Boolean).length, 'of',
+                    PRECACHE_ENTRIES.length, 'precache entries,', bytes, 'bytes');
         return self.skipWaiting();
       })
   );
 });
 
-// Activate event - clean up old caches
+// Activate event - move staged entries into place and clean up old caches
 self.addEventListener('activate', function(event) {
   console.log('[ServiceWorker] Activate');
+  var current = new Set(PRECACHE_ENTRIES.map(function(entry) {
+    return new URL(entry.url, self.location.origin).href;
+  }));
   event.waitUntil(
-    caches.keys().then(function(keyList) {
-      return Promise.all(keyList.map(function(key) {
-        if (key !== CACHE_NAME) {
-          console.log('[ServiceWorker] Removing old cache', key);
-          return caches.delete(key);
-        }
-      }));
-    }).then(function() {
-      console.log('[ServiceWorker] Claiming clients');
-      return self.clients.claim();
-    })
+    Promise.all([caches.open(PRECACHE), caches.open(PRECACHE_STAGING)])
+      .then(function(opened) {
+        var precache = opened[0];
+        var staging = opened[1];
+        return staging.keys()
+          .then(function(requests) {
+            return Promise.all(requests.map(function(request) {
+              return staging.match(request).then(function(response) {
+                return precache.put(request, response);
+              });
+            }));
+          })
+          .then(function() {
+            return precache.keys();
+          })
+          .then(function(requests) {
+            return Promise.all(requests.map(function(request) {
+              if (!current.has(request.url) && new URL(request.url).pathname !== REVISIONS_KEY) {
+                console.log('[ServiceWorker] Removing precache entry', request.url);
+                return precache.delete(request);
+              }
+            }));
+          })
+          .then(function() {
+            var revisions = {};
+            PRECACHE_ENTRIES.forEach(function(entry) {
+              revisions[entry.url] = entry.revision;
+            });
+            return precache.put(REVISIONS_KEY, new Response(JSON.stringify(revisions), {
+              headers: {'Content-Type': 'application/json'}
+            }));
+          });
+      })
+      .then(function() {
+        return caches.keys();
+      })
+      .then(function(keyList) {
+        return Promise.all(keyList.map(function(key) {
+          if (key !== PRECACHE && key !== RUNTIME_CACHE && key !== VERSE_CACHE) {
+            console.log('[ServiceWorker] Removing old cache', key);
+            return caches.delete(key);
+          }
+        }));
+      })
+      .then(function() {
+        console.log('[ServiceWorker] Claiming clients');
+        return self.clients.claim();
+      })
   );
 });
 
-// Fetch event - serve from cache, fallback to network
+// Fetch event - precached and content-hashed files from cache, everything else from the network
 self.addEventListener('fetch', function(event) {
   console.log('[ServiceWorker] Fetch', event.request.url);
   
@@ -57,43 +132,116 @@ self.addEventListener('fetch', function(event) {
     return;
   }
 
+  var path = new URL(event.request.url).pathname;
+  // Live data: never answered from a cache
+  if (path.startsWith(API_PREFIX) || path === METRICS_URL) {
+    return;
+  }
+  if (path === VERSE_INDEX_URL) {
+    event.respondWith(fetchVerseIndex(event.request));
+    return;
+  }
+  if (path.startsWith('/verses/chapter-')) {
+    event.respondWith(fetchVerseShard(event.request));
+    return;
+  }
+  if (path.startsWith(HASHED_PREFIX)) {
+    event.respondWith(fetchHashed(event.request));
+    return;
+  }
+
+  // Precached app shell (kept current by revision), else network, else whatever was cached when offline
   event.respondWith(
-    caches.match(event.request)
+    caches.open(PRECACHE)
+      .then(function(cache) {
+        return cache.match(event.request);
+      })
       .then(function(response) {
-        // Cache hit - return response
         if (response) {
           console.log('[ServiceWorker] Found in cache', event.request.url);
           return response;
         }
-
-        // Clone the request
-        var fetchRequest = event.request.clone();
-
-        return fetch(fetchRequest).then(
-          function(response) {
-            // Check if we received a valid response
-            if(!response || response.status !== 200 || response.type !== 'basic') {
-              return response;
-            }
-
-            // Clone the response
-            var responseToCache = response.clone();
-
-            caches.open(CACHE_NAME)
-              .then(function(cache) {
-                cache.put(event.request, responseToCache);
-              });
-
-            return response;
-          }
-        ).catch(function() {
-          // Network failed, try to get from cache
+        return fetch(event.request).catch(function() {
           return caches.match(event.request);
         });
       })
   );
 });
 
+// Content-hashed build output - a changed file has a new URL, so a cached copy never goes stale
+function fetchHashed(request) {
+  return caches.open(RUNTIME_CACHE).then(function(cache) {
+    return cache.match(request).then(function(cached) {
+      if (cached) {
+        return cached;
+      }
+      return fetch(request).then(function(response) {
+        if (response && response.status === 200 && response.type === 'basic') {
+          cache.put(request, response.clone());
+        }
+        return response;
+      });
+    });
+  });
+}
+
+// Verse index - network first so changed shards are noticed, cache when offline
+function fetchVerseIndex(request) {
+  return fetch(request).then(function(response) {
+    if (!response || response.status !== 200) {
+      return response;
+    }
+    var responseToCache = response.clone();
+    response.clone().json().then(function(index) {
+      return pruneVerseShards(index);
+    });
+    caches.open(VERSE_CACHE).then(function(cache) {
+      cache.put(VERSE_INDEX_URL, responseToCache);
+    });
+    return response;
+  }).catch(function() {
+    // The latest fetched copy, else the one precached at install
+    return caches.open(VERSE_CACHE).then(function(cache) {
+      return cache.match(VERSE_INDEX_URL);
+    }).then(function(cached) {
+      return cached || caches.match(VERSE_INDEX_URL);
+    });
+  });
+}
+
+// Chapter shards - fetched on first open, then served from cache (a changed chapter has a new URL)
+function fetchVerseShard(request) {
+  return caches.open(VERSE_CACHE).then(function(cache) {
+    return cache.match(request).then(function(cached) {
+      if (cached) {
+        return cached;
+      }
+      return fetch(request).then(function(response) {
+        if (response && response.status === 200) {
+          cache.put(request, response.clone());
+        }
+        return response;
+      });
+    });
+  });
+}
+
+// Drop cached shards that the current index no longer lists
+function pruneVerseShards(index) {
+  var current = new Set(index.chapters.map(function(chapter) { return chapter.url; }));
+  return caches.open(VERSE_CACHE).then(function(cache) {
+    return cache.keys().then(function(requests) {
+      return Promise.all(requests.map(function(request) {
+        var path = new URL(request.url).pathname;
+        if (path.startsWith('/verses/chapter-') && !current.has(path)) {
+          console.log('[ServiceWorker] Removing stale verse shard', path);
+          return cache.delete(request);
+        }
+      }));
+    });
+  });
+}
+
 // Background sync for offline actions
 self.addEventListener('sync', function(event) {
   console.log('[ServiceWorker] Background sync', event.tag);
@@ -0,0 +1,234 @@
+"""
+Precomputed verse translations, one memory-mapped pack file per language.
+
+batch_translate.py asks the model once per (verse, language) and writes the
+results into TRANSLATION_STORE_DIR/<code>.wwts. At runtime the packs are
+memory-mapped read-only: the operating system pages in the parts that are
+read and shares them between processes, and a lookup is a binary search
+over the mapped key array plus one UTF-8 decode, with no model call.
+
+Pack layout (native byte order, recorded in the header):
+
+    header    magic, format version, byte order, verse count, source hash
+    keys      u32[count]      chapter << 16 | first verse number, sorted
+    offsets   u32[count + 1]  start of each text in the text area
+    sources   u32[count]      CRC-32 of the English text each one translates
+    lasts     u16[count]      last verse number of ranged entries ("1.4 – 1.6")
+    text      UTF-8 translations, back to back
+
+Ranged entries are found by any verse they cover, like the verse browser's
+jump box. The source CRCs let the batch job retranslate only verses whose
+English text changed.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import metrics
+from explanation_store import parse_verse_question
+from verse_refs import verse_numbers
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_STORE_DIR = os.getenv(
+    "TRANSLATION_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations")
+)
+DEFAULT_LANGUAGE = "English"
+# Display name -> file code; English is the verses CSV itself
+LANGUAGES = {
+    "English": "en",
+    "Hindi": "hi",
+    "Bengali": "bn",
+    "Marathi": "mr",
+    "Gujarati": "gu",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Spanish": "es",
+    "French": "fr",
+    "German": "de",
+}
+PACK_SUFFIX = ".wwts"
+RELOAD_CHECK_SEC = 5.0      # how often a language's pack file is checked for a rebuild
+
+TRANSLATION_PROMPT = (
+    "Translate this English rendering of Bhagavad Gita verse {verse} into {language}. "
+    "Keep proper names and Sanskrit terms, and reply with the translation only.\n\n{text}"
+)
+
+MAGIC = b"WWTS"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBxxI16s")
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+# (chapter, first, last, source crc, text)
+PackEntry = Tuple[int, int, int, int, str]
+
+
+def translation_prompt(verse: str, language: str, text: str) -> str:
+    return TRANSLATION_PROMPT.format(verse=verse, language=language, text=text)
+
+
+def source_crc(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def write_pack(path: Union[str, Path], entries: List[PackEntry], source_hash: str = ""):
+    """Write a pack atomically; readers that have the old file mapped keep reading it."""
+    entries = sorted(entries, key=lambda e: (e[0], e[1]))
+    texts = [e[4].encode("utf-8") for e in entries]
+    offsets = array("I", [0])
+    for text in texts:
+        offsets.append(offsets[-1] + len(text))
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, int(LITTLE_ENDIAN), len(entries), source_hash.encode("ascii")[:16]),
+        array("I", [e[0] << 16 | e[1] for e in entries]).tobytes(),
+        offsets.tobytes(),
+        array("I", [e[3] for e in entries]).tobytes(),
+        array("H", [e[2] for e in entries]).tobytes(),
+        b"".join(texts),
+    ]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        for part in parts:
+            f.write(part)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+class TranslationPack:
+    """One language's translations, memory-mapped read-only."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, little_endian, count, source_hash = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} translation pack")
+        if bool(little_endian) != LITTLE_ENDIAN:
+            raise ValueError(f"{self.path} was built on a machine with the other byte order; rebuild it")
+        self.count = count
+        self.source_hash = source_hash.rstrip(b"\0").decode("ascii")
+
+        # Zero-copy views into the mapping
+        view = memoryview(self._map)
+        position = HEADER.size
+        self.keys = view[position:position + 4 * count].cast("I")
+        position += 4 * count
+        self.offsets = view[position:position + 4 * (count + 1)].cast("I")
+        position += 4 * (count + 1)
+        self.sources = view[position:position + 4 * count].cast("I")
+        position += 4 * count
+        self.lasts = view[position:position + 2 * count].cast("H")
+        position += 2 * count
+        self.text = view[position:]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def find(self, chapter: int, number: int) -> int:
+        """Index of the entry covering chapter.number, or -1."""
+        i = bisect_right(self.keys, chapter << 16 | number) - 1
+        if i >= 0 and self.keys[i] >> 16 == chapter and self.lasts[i] >= number:
+            return i
+        return -1
+
+    def text_at(self, i: int) -> str:
+        return str(self.text[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def get(self, chapter: int, verse: Union[int, str]) -> Optional[str]:
+        i = self.find(chapter, verse_numbers(verse)[0])
+        return self.text_at(i) if i >= 0 else None
+
+    def entries(self) -> Iterator[PackEntry]:
+        for i in range(self.count):
+            key = self.keys[i]
+            yield key >> 16, key & 0xFFFF, self.lasts[i], self.sources[i], self.text_at(i)
+
+
+class TranslationStore:
+    def __init__(self, directory: str = TRANSLATION_STORE_DIR):
+        self.directory = Path(directory)
+        # language -> (stat key, pack, next check time)
+        self._packs: Dict[str, Tuple[Optional[Tuple[int, int]], Optional[TranslationPack], float]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, language: str) -> Path:
+        return self.directory / f"{LANGUAGES[language]}{PACK_SUFFIX}"
+
+    def pack(self, language: str) -> Optional[TranslationPack]:
+        """The language's pack, reopened when the batch job has replaced the file."""
+        if language not in LANGUAGES or language == DEFAULT_LANGUAGE:
+            return None
+        now = time.monotonic()
+        cached = self._packs.get(language)
+        if cached is not None and now < cached[2]:
+            return cached[1]
+        with self._lock:
+            try:
+                stat = self.path(language).stat()
+                stat_key = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stat_key = None
+            pack = cached[1] if cached is not None and cached[0] == stat_key else None
+            if pack is None and stat_key is not None:
+                try:
+                    pack = TranslationPack(self.path(language))
+                except (OSError, ValueError) as e:
+                    logger.warning("Ignoring translation pack for %s: %s", language, e)
+            self._packs[language] = (stat_key, pack, now + RELOAD_CHECK_SEC)
+            return pack
+
+    def get(self, chapter: int, verse: Union[int, str], language: str) -> Optional[str]:
+        """The stored translation of a verse, or None (English, unknown language, or not translated yet)."""
+        pack = self.pack(language)
+        if pack is None:
+            return None
+        text = pack.get(chapter, verse)
+        metrics.inc("wisdom_translation_lookups_total", outcome="hit" if text is not None else "miss")
+        return text
+
+    def languages(self) -> List[str]:
+        """English plus every language that has a pack."""
+        return [name for name in LANGUAGES if name == DEFAULT_LANGUAGE or self.path(name).exists()]
+
+
+_store: Optional[TranslationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_translation_store() -> TranslationStore:
+    """Process-wide store; packs are opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TranslationStore()
+        return _store
+
+
+def localize_response(response: Dict, language: Optional[str]) -> Dict:
+    """A copy of a structured response with the verse text in `language`, when it has been translated."""
+    if not language or language == DEFAULT_LANGUAGE:
+        return response
+    parsed = parse_verse_question(response.get("verse_reference") or "")
+    if parsed is None:
+        return response
+    text = get_translation_store().get(parsed[0], parsed[1], language)
+    if text is None:
+        return response
+    return {**response, "translation": text, "translation_english": response.get("translation", ""),
+            "language": language}
@@ -0,0 +1,167 @@
+"""
+Paginated verse browser for the sidebar.
+
+Only one page of verse labels is rendered per run and the translation is
+loaded for the selected verse alone, with its related verses from the
+precomputed graph. The browser runs as a Streamlit fragment, so paging,
+selecting and jumping between verses rerun just this block instead of the
+whole app.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from related_verses import get_related_verses
+from session_store import get_session_store, get_user_id
+from translation_store import DEFAULT_LANGUAGE, get_translation_store
+from verse_refs import chapter_number, verse_numbers
+
+VERSES_PER_PAGE = 10
+RELATED_IN_BROWSER = 4
+
+
+def find_verse(verse_nums: List[str], query: str) -> Optional[str]:
+    """Find the verse key matching a query like '47', '2.47' or 'Verse 47' (ranged verses included)."""
+    match = re.search(r'(\d+)\s*$', query.strip())
+    if not match:
+        return None
+    wanted = int(match.group(1))
+    for verse_num in verse_nums:
+        first, last = verse_numbers(verse_num)
+        if first <= wanted <= last:
+            return verse_num
+    return None
+
+
+def _parse_jump(query: str) -> Tuple[Optional[int], str]:
+    """Split a jump query into an optional chapter number and the verse part."""
+    match = re.match(r'^\s*(?:ch(?:apter)?\.?\s*)?(\d+)\s*[.:,]\s*(\d+)\s*$', query, flags=re.IGNORECASE)
+    if match:
+        return int(match.group(1)), match.group(2)
+    return None, query
+
+
+def _verse_key(chapter: str, page: int) -> str:
+    return f"browser_verse_{chapter}_{page}"
+
+
+def _reset_page():
+    st.session_state.browser_page = 1
+
+
+def _jump_to_verse(verses_db: Dict):
+    """on_change callback: move the browser to the chapter, page and verse typed by the user."""
+    query = st.session_state.get("browser_jump", "")
+    if not query.strip():
+        return
+
+    chapter_num, verse_query = _parse_jump(query)
+    if chapter_num:
+        chapter = next((key for key in verses_db if chapter_number(key) == chapter_num), None)
+    else:
+        chapter = st.session_state.get("browser_chapter")
+    if chapter not in verses_db:
+        st.session_state.browser_jump_error = f"Chapter {chapter_num} not found"
+        return
+
+    verse_nums = list(verses_db[chapter]["verses"].keys())
+    target = find_verse(verse_nums, verse_query)
+    if target is None:
+        st.session_state.browser_jump_error = f"Verse '{query}' not found"
+        return
+    _show_verse(verses_db, chapter, target)
+
+
+def _show_verse(verses_db: Dict, chapter: str, verse: str):
+    """Move the browser to a verse of a verses_db chapter key."""
+    page = list(verses_db[chapter]["verses"]).index(verse) // VERSES_PER_PAGE + 1
+    st.session_state.browser_chapter = chapter
+    st.session_state.browser_page = page
+    st.session_state[_verse_key(chapter, page)] = verse
+    st.session_state.browser_jump_error = None
+
+
+def _open_related(verses_db: Dict, chapter_num: int, verse: str):
+    """on_click callback of a related-verse button."""
+    chapter = next((key for key in verses_db if chapter_number(key) == chapter_num), None)
+    if chapter is not None and verse in verses_db[chapter]["verses"]:
+        _show_verse(verses_db, chapter, verse)
+
+
+@st.fragment
+def render_verse_browser(verses_db: Dict):
+    """Render the chapter selector, jump box and the current page of verses."""
+    chapters = list(verses_db.keys())
+    selected_chapter = st.selectbox(
+        "Select Chapter",
+        chapters,
+        key="browser_chapter",
+        format_func=lambda x: f"Ch. {x.split('_')[1]}: {verses_db[x]['title']}",
+        on_change=_reset_page
+    )
+    if not selected_chapter:
+        return
+
+    chapter_data = verses_db[selected_chapter]
+    st.markdown(f"### {chapter_data['title']}")
+    st.markdown(f"*{chapter_data.get('summary', '')}*")
+
+    verse_nums = list(chapter_data['verses'].keys())
+    st.info(f"📊 {len(verse_nums)} verses in this chapter")
+
+    st.text_input(
+        "🔎 Jump to verse",
+        key="browser_jump",
+        placeholder="e.g. 47 or 2.47",
+        on_change=_jump_to_verse,
+        args=(verses_db,)
+    )
+    if st.session_state.get("browser_jump_error"):
+        st.caption(f"⚠️ {st.session_state.browser_jump_error}")
+
+    page_count = max(1, math.ceil(len(verse_nums) / VERSES_PER_PAGE))
+    if st.session_state.get("browser_page", 1) > page_count:
+        st.session_state.browser_page = 1
+    page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="browser_page")
+    st.caption(f"Page {page} of {page_count}")
+
+    start = (page - 1) * VERSES_PER_PAGE
+    page_verses = verse_nums[start:start + VERSES_PER_PAGE]
+    selected_verse = st.radio(
+        "Verses",
+        page_verses,
+        key=_verse_key(selected_chapter, page),
+        format_func=lambda v: f"Verse {v}",
+        label_visibility="collapsed"
+    )
+
+    # Only the selected verse's text is sent to the browser
+    if selected_verse:
+        chapter_num = chapter_number(selected_chapter)
+        language = st.session_state.get("language_preference", DEFAULT_LANGUAGE)
+        translated = get_translation_store().get(chapter_num, selected_verse, language)
+        st.markdown(f"**Verse {selected_verse}**")
+        st.markdown(translated or chapter_data['verses'][selected_verse]['translation'])
+        if language != DEFAULT_LANGUAGE and translated is None:
+            st.caption(f"🌐 Not yet translated into {language}")
+        related = get_related_verses().related(chapter_num, selected_verse, RELATED_IN_BROWSER)
+        if related:
+            st.caption("🔗 Related verses")
+            columns = st.columns(len(related))
+            for column, (chapter, verse, score) in zip(columns, related):
+                column.button(verse, key=f"browser_related_{verse}", help=f"Chapter {chapter} · similarity {score:.2f}",
+                              on_click=_open_related, args=(verses_db, chapter, verse))
+        if st.button("Ask about this verse", key="browser_ask"):
+            st.session_state.auto_question = f"Please explain Chapter {chapter_num}, Verse {selected_verse} and its practical application in modern life."
+            st.rerun()
+
+        favorite = f"Chapter {chapter_num}, Verse {selected_verse}"
+        favorites = st.session_state.setdefault("favorite_verses", [])
+        if favorite not in favorites and st.button("⭐ Save to favorites", key="browser_favorite"):
+            favorites.append(favorite)
+            get_session_store().add_favorite(get_user_id(), favorite)
+            # Full rerun so the sidebar's favorites list picks it up
+            st.rerun()
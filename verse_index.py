@@ -0,0 +1,217 @@
+"""
+Process-wide, read-only index of the verse data for the JSON API in pwa_server.py.
+
+The verses CSV is parsed once into per-chapter lists, a (chapter, verse
+number) lookup table that also covers ranged entries such as '1.4 – 1.6',
+and an inverted index for keyword search. Response bodies are serialized as
+compact UTF-8 JSON and precompressed; the chapter list and single verses
+up front, chapter pages, verse ranges and searches on first request (kept
+in bounded LRU caches). ETags are content hashes, so they are identical
+across workers and restarts as long as the data does not change.
+"""
+
+import csv
+import io
+import json
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from asset_cache import encode_variants
+from asset_pipeline import BASE_DIR, VERSES_CSV, content_hash
+from verse_refs import verse_numbers
+
+logger = logging.getLogger(__name__)
+
+API_URL = '/api'
+JSON_MIMETYPE = 'application/json'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_SEARCH_SIZE = 10
+MAX_QUERY_TERMS = 8
+DYNAMIC_COMPRESSLEVEL = 5       # pages and searches are compressed per cache miss
+
+_WORD = re.compile(r"[a-z0-9]+")
+_REFERENCE = re.compile(r'^\s*(\d+)\s*[.:]\s*(\d+)(?:\s*[-–—]\s*(?:(\d+)\s*[.:]\s*)?(\d+))?\s*$')
+
+Variants = Dict[str, Tuple[bytes, str]]
+
+
+class APIError(Exception):
+    """A request the API answers with an error status and a JSON message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def dumps(data) -> bytes:
+    """Compact JSON as UTF-8 bytes."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def terms(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def parse_reference(reference: str) -> Tuple[int, int, int]:
+    """(chapter, first, last) for '2.47', '2:47', '1.4-1.6' or '1.4 – 1.6'."""
+    match = _REFERENCE.match(reference)
+    if not match:
+        raise APIError(400, f"Invalid verse reference {reference!r}; expected e.g. 2.47 or 1.4-1.6")
+    chapter, first = int(match.group(1)), int(match.group(2))
+    if match.group(3) is not None and int(match.group(3)) != chapter:
+        raise APIError(400, "Verse ranges cannot span chapters")
+    last = int(match.group(4)) if match.group(4) is not None else first
+    if last < first:
+        raise APIError(400, "Verse range ends before it starts")
+    if last - first >= MAX_PAGE_SIZE:
+        raise APIError(400, f"Verse ranges are limited to {MAX_PAGE_SIZE} verses")
+    return chapter, first, last
+
+
+def page_args(page: Optional[str], per_page: Optional[str], default: int) -> Tuple[int, int]:
+    """(page, per_page) from the raw query parameters; only a missing parameter takes its default."""
+    try:
+        page = 1 if page is None else int(page)
+        per_page = default if per_page is None else int(per_page)
+    except ValueError:
+        page = per_page = 0
+    if page < 1 or not 1 <= per_page <= MAX_PAGE_SIZE:
+        raise APIError(400, f"page must be >= 1 and per_page between 1 and {MAX_PAGE_SIZE}")
+    return page, per_page
+
+
+class VerseIndex:
+    def __init__(self, source: str = VERSES_CSV):
+        source_bytes = (BASE_DIR / source).read_bytes()
+        self.version = content_hash(source_bytes)
+
+        self.chapters: Dict[int, Dict] = {}
+        self.verses: List[Dict] = []                        # verse objects as served
+        self.by_number: Dict[Tuple[int, int], int] = {}     # (chapter, verse number) -> position in verses
+        for row in csv.DictReader(io.StringIO(source_bytes.decode('utf-8'))):
+            chapter = int(row['chapter_number'].split()[-1])
+            try:
+                first, last = verse_numbers(row['chapter_verse'])
+            except ValueError as e:
+                # Served as verse 0 it would answer for a reference that does not exist
+                raise ValueError(f"{source}, chapter {chapter}: {e}") from None
+            verse = {
+                'chapter': chapter,
+                'verse': row['chapter_verse'],
+                'first': first,
+                'last': last,
+                'translation': row['translation'],
+            }
+            position = len(self.verses)
+            self.verses.append(verse)
+            self.chapters.setdefault(chapter, {'title': row['chapter_title'], 'positions': []})['positions'].append(position)
+            for number in range(first, last + 1):
+                self.by_number[(chapter, number)] = position
+
+        # Inverted index: term -> [(position, term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for position, verse in enumerate(self.verses):
+            for term, tf in Counter(terms(verse['translation'])).items():
+                self.postings[term].append((position, tf))
+        self.idf = {t: math.log(1 + len(self.verses) / len(p)) for t, p in self.postings.items()}
+
+        self.chapter_list = encode_variants(dumps({
+            'version': self.version,
+            'chapters': [
+                {'chapter': number, 'title': data['title'], 'verses': len(data['positions']),
+                 'url': f"{API_URL}/chapters/{number}"}
+                for number, data in sorted(self.chapters.items())
+            ],
+        }), JSON_MIMETYPE)
+        self._verse_bodies = [encode_variants(dumps({'reference': v['verse'], 'verses': [v]}), JSON_MIMETYPE)
+                              for v in self.verses]
+        self.chapter_page = lru_cache(maxsize=512)(self._chapter_page)
+        self.verse_range = lru_cache(maxsize=1024)(self._verse_range)
+        self._search = lru_cache(maxsize=2048)(self._search_terms)
+        logger.info("Verse index %s: %d chapters, %d verses, %d terms",
+                    self.version, len(self.chapters), len(self.verses), len(self.postings))
+
+    def _chapter_page(self, chapter: int, page: int, per_page: int) -> Variants:
+        data = self.chapters.get(chapter)
+        if data is None:
+            raise APIError(404, f"Chapter {chapter} not found")
+        positions = data['positions']
+        pages = max(1, math.ceil(len(positions) / per_page))
+        if page > pages:
+            raise APIError(404, f"Chapter {chapter} has {pages} pages of {per_page}")
+        url = f"{API_URL}/chapters/{chapter}?per_page={per_page}&page="
+        return encode_variants(dumps({
+            'chapter': chapter,
+            'title': data['title'],
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'total': len(positions),
+            'next': f"{url}{page + 1}" if page < pages else None,
+            'verses': [self.verses[p] for p in positions[(page - 1) * per_page:page * per_page]],
+        }), JSON_MIMETYPE, DYNAMIC_COMPRESSLEVEL)
+
+    def verse(self, reference: str) -> Variants:
+        """The verse or verses covering a reference; a number inside a ranged entry returns that entry."""
+        chapter, first, last = parse_reference(reference)
+        if first == last:
+            position = self.by_number.get((chapter, first))
+            if position is None:
+                raise APIError(404, f"Verse {chapter}.{first} not found")
+            return self._verse_bodies[position]
+        return self.verse_range(chapter, first, last)
+
+    def _verse_range(self, chapter: int, first: int, last: int) -> Variants:
+        positions = sorted({self.by_number[(chapter, n)] for n in range(first, last + 1) if (chapter, n) in self.by_number})
+        if not positions:
+            raise APIError(404, f"Verses {chapter}.{first}-{chapter}.{last} not found")
+        return encode_variants(dumps({
+            'reference': f"{chapter}.{first}-{chapter}.{last}",
+            'verses': [self.verses[p] for p in positions],
+        }), JSON_MIMETYPE, DYNAMIC_COMPRESSLEVEL)
+
+    def search(self, query: str, page: int, per_page: int) -> Variants:
+        """Verses containing every query word, ranked by TF-IDF."""
+        query_terms = tuple(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+        if not query_terms:
+            raise APIError(400, "Missing search query")
+        return self._search(query_terms, page, per_page)
+
+    def _search_terms(self, query_terms: Tuple[str, ...], page: int, per_page: int) -> Variants:
+        scores: Optional[Dict[int, float]] = None
+        for term in sorted(query_terms, key=lambda t: len(self.postings.get(t, ()))):     # rarest first
+            idf = self.idf.get(term, 0.0)
+            matches = {p: (1 + math.log(tf)) * idf for p, tf in self.postings.get(term, ())
+                       if scores is None or p in scores}
+            scores = matches if scores is None else {p: scores[p] + s for p, s in matches.items()}
+            if not scores:
+                break
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        results = ranked[(page - 1) * per_page:page * per_page]
+        return encode_variants(dumps({
+            'query': ' '.join(query_terms),
+            'page': page,
+            'per_page': per_page,
+            'total': len(ranked),
+            'results': [{**self.verses[p], 'score': round(score, 3)} for p, score in results],
+        }), JSON_MIMETYPE, DYNAMIC_COMPRESSLEVEL)
+
+
+_index: Optional[VerseIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_verse_index() -> VerseIndex:
+    """Process-wide index, loaded on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VerseIndex()
+        return _index
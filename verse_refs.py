@@ -0,0 +1,27 @@
+"""
+Chapter and verse numbers from the keys used across the app.
+
+verses_db chapters are keyed 'chapter_Chapter 2' and verses '2.47', with a
+few ranged entries such as '1.4 – 1.6'. The UI, the stores and the build
+scripts all parse these keys here, so they agree on which entry covers a
+verse.
+"""
+
+import re
+from typing import Optional, Tuple, Union
+
+
+def chapter_number(chapter: str) -> Optional[int]:
+    """Return the number of a verses_db chapter key such as 'chapter_Chapter 2'."""
+    match = re.search(r'(\d+)$', chapter)
+    return int(match.group(1)) if match else None
+
+
+def verse_numbers(verse: Union[int, str]) -> Tuple[int, int]:
+    """First and last verse number of 47, '47', '2.47' or '1.4 – 1.6'."""
+    if isinstance(verse, int):
+        return verse, verse
+    numbers = [int(n) for n in re.findall(r"\d+\.(\d+)", verse)] or [int(n) for n in re.findall(r"\d+", verse)[:1]]
+    if not numbers:
+        raise ValueError(f"Not a verse reference: {verse!r}")
+    return numbers[0], numbers[-1]